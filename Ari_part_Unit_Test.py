@@ -64,7 +64,7 @@ class TestTaskManager(unittest.TestCase):
     @patch("builtins.input", side_effect=["yes"])
     def test_progress_tracker_complete(self, mock_input):
         self.manager.tasks = [{"description": "Test Task", "status": "incomplete", "due_date": "N/A"}]
-        with patch.object(self.manager, 'save_tasks') as mock_save:
+        with patch.object(self.manager, 'mark_dirty') as mock_save:
             self.manager.progress_tracker(0)
             self.assertEqual(self.manager.tasks[0]["status"], "complete")
             mock_save.assert_called_once()
@@ -72,7 +72,7 @@ class TestTaskManager(unittest.TestCase):
     @patch("builtins.input", side_effect=["no"])
     def test_progress_tracker_incomplete(self, mock_input):
         self.manager.tasks = [{"description": "Test Task", "status": "incomplete", "due_date": "N/A"}]
-        with patch.object(self.manager, 'save_tasks') as mock_save:
+        with patch.object(self.manager, 'mark_dirty') as mock_save:
             self.manager.progress_tracker(0)
             self.assertEqual(self.manager.tasks[0]["status"], "incomplete")
             mock_save.assert_called_once()
@@ -5,12 +5,13 @@ import re
 from datetime import datetime,timedelta
 import json
 import argparse
-import os
+from autosave import AutosaveMixin
 
-class TaskManager:
+class TaskManager(AutosaveMixin):
 
     TASKS_FILE = 'tasks.json'
     def __init__(self):
+        super().__init__()
         self.tasks = []
 
 
@@ -19,8 +20,7 @@ class TaskManager:
         try:
             with open(self.TASKS_FILE, 'r') as file:
                 self.tasks = json.load(file)
-                print("✅ Tasks loaded from file:")
-                print(json.dumps(self.tasks, indent=4))
+                print(f"✅ {len(self.tasks)} tasks loaded from file")
         except FileNotFoundError:
             print(f"⚠️ File not found: {self.TASKS_FILE}")
         except json.JSONDecodeError:
@@ -47,17 +47,6 @@ class TaskManager:
             # 🔄 Save tasks immediately
             self.save_tasks()
 
-
-    def save_tasks(self):
-        try:
-            with open(self.TASKS_FILE, 'w') as file:
-                json.dump(self.tasks, file, indent=4)
-            print("💾 Tasks saved successfully.")
-        except Exception as e:
-            print(f"❌ Failed to save tasks: {e}")
-
-
-
     """Adds task to current list of tasks displayed in terminal
     Needs to be adjusted to perhaps display in tuple form or a list of tasks
     """
@@ -68,6 +57,7 @@ class TaskManager:
             "due_date": due_date if due_date else "N/A"
         }
         self.tasks.append(task)
+        self.mark_dirty()
 
     """Sets the criteria for tasks to be grouped in and moves each tasks to said criteria
     then returns the organized tasks under established categories in cetrian format
@@ -148,7 +138,8 @@ class TaskManager:
                 print("Invalid input")
                 return None
             
-            return self.save_tasks()
+            # Saved by the autosave thread, so answering does not wait on the disk.
+            return self.mark_dirty()
 
 
     def deadline_manager(self, idx):
@@ -177,7 +168,16 @@ class TaskManager:
 def main():
     manager = TaskManager()
     manager.load_tasks()
+    manager.start_autosave()
+    try:
+        run_loop(manager)
+    except (KeyboardInterrupt, EOFError):
+        print("\n👋 Goodbye!")
+    finally:
+        manager.close()
+
 
+def run_loop(manager):
     while True:
         cmd = input("\nChoose an action - add/show/organize/progress/deadline/exit: ").strip().lower()
         
@@ -209,7 +209,7 @@ def main():
                 print("❌ Invalid selection.")
         
         elif cmd == 'exit':
-            manager.save_tasks()
+            # main() closes the manager, which writes anything autosave has not.
             print("👋 Goodbye!")
             break
         
@@ -0,0 +1,88 @@
+"""Background saving shared by the interactive prototypes (eyobs_part.py and
+ari's_part.py): changes are marked dirty and a writer thread saves tasks.json."""
+
+import json
+import os
+import threading
+import time
+
+AUTOSAVE_DELAY = 0.5    # seconds a change may wait before it is written
+AUTOSAVE_CHANGES = 20   # write straight away once this many changes are waiting
+
+
+class AutosaveMixin:
+    """Saves self.tasks to self.TASKS_FILE. Call mark_dirty after every change,
+    start_autosave once the tasks are loaded, and close when the session ends."""
+
+    def __init__(self):
+        self.dirty = 0
+        self.changed = threading.Condition()
+        self.writer = None
+        self.stopping = False
+        # Held while tasks.json is written, so two writers never share the temp file.
+        self.write_lock = threading.Lock()
+
+    def save_tasks(self):
+        try:
+            with self.changed:
+                data = json.dumps(self.tasks, indent=4)
+                self.dirty = 0
+            self.write_tasks(data)
+            print("💾 Tasks saved successfully.")
+        except Exception as e:
+            print(f"❌ Failed to save tasks: {e}")
+
+    def write_tasks(self, data):
+        # Written next to the file and renamed over it, so a crash mid-write
+        # leaves the old file instead of a truncated one.
+        temp_path = self.TASKS_FILE + ".tmp"
+        with self.write_lock:
+            with open(temp_path, 'w') as file:
+                file.write(data)
+            os.replace(temp_path, self.TASKS_FILE)
+
+    def mark_dirty(self):
+        # Called after every change; the autosave thread writes it out.
+        with self.changed:
+            self.dirty += 1
+            self.changed.notify()
+
+    def start_autosave(self):
+        self.writer = threading.Thread(target=self.autosave_loop, daemon=True)
+        self.writer.start()
+
+    def autosave_loop(self):
+        # Waits for a change, then up to AUTOSAVE_DELAY for more to pile up, so a
+        # burst of edits costs one write. The tasks are copied under the lock and
+        # written outside it, so the prompt never waits on the disk.
+        while True:
+            with self.changed:
+                while not self.dirty and not self.stopping:
+                    self.changed.wait()
+                deadline = time.monotonic() + AUTOSAVE_DELAY
+                while self.dirty < AUTOSAVE_CHANGES and not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.changed.wait(remaining)
+                if not self.dirty:
+                    return
+                data = json.dumps(self.tasks, indent=4)
+                self.dirty = 0
+            try:
+                self.write_tasks(data)
+            except OSError as e:
+                print(f"❌ Autosave failed: {e}")
+                self.mark_dirty()
+                if self.stopping:
+                    return
+
+    def close(self):
+        # Stops the autosave thread and writes whatever it had not written yet.
+        with self.changed:
+            self.stopping = True
+            self.changed.notify()
+        if self.writer is not None:
+            self.writer.join()
+        if self.dirty:
+            self.save_tasks()
@@ -0,0 +1,64 @@
+"""Measures write throughput when several processes add tasks to the same files at
+once, and checks that none of the adds were lost.
+
+python -m benchmarks.bench_concurrency --processes 1,4,8 --adds 50 --storage json,journal,sqlite"""
+
+import argparse
+import multiprocessing
+import time
+
+from benchmarks.common import emit, quiet_stdout, scratch_directory
+from tasktrackr_final import create_manager
+
+
+def add_tasks(storage, adds, start):
+    start.wait()
+    with quiet_stdout():
+        for i in range(adds):
+            # A new manager per add, like separate CLI invocations.
+            manager = create_manager(storage)
+            manager.add_task(f"Concurrent task {i}", "2025-05-01", "Medium")
+            if storage == "sqlite":
+                manager.conn.close()
+
+
+def run(storage, processes, adds):
+    """Returns (seconds, tasks stored) for processes writers making adds each."""
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    workers = [context.Process(target=add_tasks, args=(storage, adds, start)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    began = time.perf_counter()
+    start.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    return elapsed, len(create_manager(storage).tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writer benchmark")
+    parser.add_argument("--processes", default="1,4,8", help="comma-separated writer counts")
+    parser.add_argument("--adds", type=int, default=50, help="adds per process")
+    parser.add_argument("--storage", default="json,journal,sqlite")
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args()
+
+    for storage in args.storage.split(","):
+        for processes in [int(p) for p in args.processes.split(",")]:
+            with scratch_directory():
+                seconds, stored = run(storage, processes, args.adds)
+            emit({
+                "benchmark": "concurrency",
+                "storage": storage,
+                "processes": processes,
+                "adds": processes * args.adds,
+                "stored": stored,
+                "seconds": round(seconds, 4),
+                "adds_per_second": round(processes * args.adds / seconds, 1)
+            }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measures what each journal fsync policy costs in write throughput, for single
+changes (one write each, like separate CLI commands) and for batches.
+
+python -m benchmarks.bench_durability --adds 500 --batch 100 --policies always,batch,none
+
+"always" survives a power cut losing nothing, "batch" loses at most the write in flight
+and "none" whatever the OS had not yet written back. Every policy recovers to a
+consistent task list after a crash."""
+
+import argparse
+import time
+
+from benchmarks.common import emit, scratch_directory
+from tasktrackr_final import FSYNC_POLICIES, TaskManager
+
+
+def journal_manager(policy):
+    manager = TaskManager(storage="journal")
+    manager.quiet = True
+    manager.fsync = policy
+    return manager
+
+
+def run(policy, adds, batch_size):
+    """Returns the seconds taken for adds single-change writes, then for the same
+    number of adds written batch_size at a time."""
+    manager = journal_manager(policy)
+    began = time.perf_counter()
+    for i in range(adds):
+        manager.add_task(f"Durable task {i}", "2025-05-01", "Medium")
+    single = time.perf_counter() - began
+
+    manager = journal_manager(policy)
+    began = time.perf_counter()
+    for start in range(0, adds, batch_size):
+        with manager.batch():
+            for i in range(start, min(start + batch_size, adds)):
+                manager.add_task(f"Durable task {i}", "2025-05-01", "Medium")
+    batched = time.perf_counter() - began
+    return single, batched
+
+
+def recovery_seconds():
+    """Time to load the journal written above, which is replayed on top of tasks.json."""
+    began = time.perf_counter()
+    TaskManager(storage="journal").ensure_loaded()
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Journal fsync policy benchmark")
+    parser.add_argument("--adds", type=int, default=500, help="adds per run")
+    parser.add_argument("--batch", type=int, default=100, help="adds per batch in the batched run")
+    parser.add_argument("--policies", default=",".join(FSYNC_POLICIES))
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    args = parser.parse_args()
+
+    for policy in args.policies.split(","):
+        with scratch_directory():
+            single, batched = run(policy, args.adds, args.batch)
+            recovery = recovery_seconds()
+        emit({
+            "benchmark": "durability",
+            "policy": policy,
+            "adds": args.adds,
+            "batch": args.batch,
+            "single_seconds": round(single, 4),
+            "single_adds_per_second": round(args.adds / single, 1),
+            "batched_seconds": round(batched, 4),
+            "batched_adds_per_second": round(args.adds / batched, 1),
+            "recovery_seconds": round(recovery, 4)
+        }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measures how many bytes each loaded task costs, comparing the original plain Task
+class against the slotted, interned Task in tasktrackr_final.
+
+python -m benchmarks.bench_memory --count 100000"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.common import emit
+from benchmarks.generator import generate_tasks
+from tasktrackr_final import Task
+
+
+class LegacyTask:
+    """The Task class as it was before __slots__ and interning."""
+    def __init__(self, task_id, title, due_date, priority, completed=False):
+        self.id = task_id
+        self.title = title
+        self.due_date = due_date
+        self.priority = priority
+        self.completed = completed
+
+    @staticmethod
+    def from_dict(data):
+        return LegacyTask(data['id'], data['title'], data['due_date'], data['priority'], data['completed'])
+
+
+def make_tasks_json(count):
+    return json.dumps(list(generate_tasks(count, invalid_ratio=0, undated_ratio=0)))
+
+
+def bytes_per_task(task_class, text, count):
+    gc.collect()
+    tracemalloc.start()
+    # Decode inside the measurement so strings that survive only through the tasks count.
+    tasks = [task_class.from_dict(d) for d in json.loads(text)]
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskTrackr memory benchmark")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--output", help="also append the JSON line to this file")
+    args = parser.parse_args()
+
+    text = make_tasks_json(args.count)
+    before = bytes_per_task(LegacyTask, text, args.count)
+    after = bytes_per_task(Task, text, args.count)
+    emit({
+        "benchmark": "memory",
+        "count": args.count,
+        "bytes_per_task_before": round(before, 1),
+        "bytes_per_task_after": round(after, 1),
+        "saved_percent": round(100 * (before - after) / before, 1)
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Times TaskManager operations on generated task lists of several sizes.
+
+python -m benchmarks.bench_operations --sizes 1000,10000,100000 --output results.jsonl
+
+Each result is one JSON line: commit, storage, size, operation and the best time in
+seconds over --repeat runs. Compare two result files with benchmarks.compare."""
+
+import argparse
+import os
+import random
+import shutil
+
+from benchmarks.common import emit, quiet_stdout, quietly, scratch_directory, time_call
+from benchmarks.generator import add_options, options_from, write_tasks_file
+from tasktrackr_final import (BINARY_FILE, SHARD_DIR, TASKS_FILE, ShardedTaskManager, SqliteTaskManager,
+                              convert_tasks, create_manager)
+
+DEFAULT_SIZES = "1000,10000,100000"
+SNAPSHOT_COPY = "generated.json"
+SHARDS_COPY = "generated.d"
+BINARY_COPY = "generated.bin"
+
+
+def fresh_manager(storage):
+    """A manager over a pristine copy of the generated task file."""
+    shutil.copyfile(SNAPSHOT_COPY, TASKS_FILE)
+    manager = create_manager(storage)
+    if storage == "sqlite":
+        manager.conn.execute("DELETE FROM tasks")
+        manager.conn.execute("DELETE FROM meta")
+        manager.conn.execute("DELETE FROM search_words")
+        manager.conn.commit()
+        with quiet_stdout():
+            manager.import_json(TASKS_FILE)
+    elif storage == "sharded":
+        if not os.path.exists(SHARDS_COPY):
+            with quiet_stdout():
+                ShardedTaskManager(SHARDS_COPY).import_json(SNAPSHOT_COPY)
+        shutil.rmtree(SHARD_DIR, ignore_errors=True)
+        shutil.copytree(SHARDS_COPY, SHARD_DIR)
+        manager = create_manager(storage)
+    elif storage == "binary":
+        if not os.path.exists(BINARY_COPY):
+            with quiet_stdout():
+                convert_tasks("binary")
+            shutil.copyfile(BINARY_FILE, BINARY_COPY)
+        shutil.copyfile(BINARY_COPY, BINARY_FILE)
+    return manager
+
+
+def loaded_manager(storage):
+    manager = fresh_manager(storage)
+    manager.ensure_loaded()
+    return manager
+
+
+def searched_manager(storage):
+    manager = loaded_manager(storage)
+    list(manager.search("budget"))
+    return manager
+
+
+def run_size(storage, size, repeat, rng):
+    """Yields (operation, seconds) pairs for one storage mode and task list size."""
+    fresh = lambda: fresh_manager(storage)
+    loaded = lambda: loaded_manager(storage)
+
+    yield "load_tasks", time_call(lambda m: m.load_tasks(), repeat, setup=fresh)
+    yield "save_tasks", time_call(lambda m: m.save_tasks(), repeat, setup=loaded)
+    yield "add_task", time_call(
+        quietly(lambda m: m.add_task("Benchmark task", "2025-05-01", "High")), repeat, setup=loaded)
+    yield "complete_task", time_call(quietly(lambda m: m.complete_task(rng.randint(1, size))), repeat, setup=loaded)
+    yield "delete_task", time_call(quietly(lambda m: m.delete_task(rng.randint(1, size))), repeat, setup=loaded)
+    # Cold runs start from a fresh manager, like a CLI process; warm runs reuse a loaded
+    # one, like the daemon or the HTTP API.
+    yield "list_tasks_cold", time_call(quietly(lambda m: m.list_tasks()), repeat, setup=fresh)
+    yield "list_tasks_pending_limit_20", time_call(
+        quietly(lambda m: m.list_tasks("pending", limit=20)), repeat, setup=fresh)
+    yield "lookup_task_cold", time_call(lambda m: m.lookup_task(rng.randint(1, size)), repeat, setup=fresh)
+    yield "count_tasks_cold", time_call(lambda m: m.count_tasks(), repeat, setup=fresh)
+    yield "organize_tasks_cold", time_call(lambda m: m.organize_tasks(), repeat, setup=fresh)
+    yield "organize_tasks_warm", time_call(lambda m: m.organize_tasks(), repeat, setup=loaded)
+    yield "search_two_words_warm", time_call(
+        lambda m: list(m.search("plan budget")), repeat, setup=lambda: searched_manager(storage))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskManager operation benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="comma separated task counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--storage", default="json", help="comma separated storage modes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    add_options(parser)
+    args = parser.parse_args()
+
+    options = options_from(args)
+    rng = random.Random(args.seed)
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with scratch_directory():
+            write_tasks_file(SNAPSHOT_COPY, size, **options)
+            for storage in args.storage.split(","):
+                for operation, seconds in run_size(storage, size, args.repeat, rng):
+                    emit({
+                        "benchmark": "operations",
+                        "storage": storage,
+                        "size": size,
+                        "operation": operation,
+                        "seconds": round(seconds, 6),
+                        **options
+                    }, args.output)
+                if storage == "sqlite":
+                    SqliteTaskManager().conn.close()
+
+
+if __name__ == "__main__":
+    main()
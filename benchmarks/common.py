@@ -0,0 +1,73 @@
+"""Helpers shared by the benchmark scripts: timing, and JSON-lines output tagged with
+the commit being measured so runs from different commits can be compared."""
+
+import contextlib
+import functools
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@functools.lru_cache(maxsize=None)
+def git_commit():
+    # Benchmarks chdir into scratch directories, so ask git about this checkout.
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=REPO_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def emit(record, output=None):
+    """Prints one result as a JSON line, and appends it to output if given."""
+    record = {"commit": git_commit(), "python": platform.python_version(), **record}
+    line = json.dumps(record)
+    print(line)
+    if output:
+        with open(output, 'a') as f:
+            f.write(line + "\n")
+
+
+def time_call(function, repeat=3, setup=None):
+    """Returns the best wall time in seconds over repeat runs. setup runs before each
+    run and is not timed; its return value is passed to function."""
+    best = None
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Runs the block inside an empty temporary directory, since TaskManager works
+    on tasks.json in the current directory."""
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(old_cwd)
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def quietly(function):
+    """Wraps function so whatever it prints is thrown away."""
+    def run(*args):
+        with quiet_stdout():
+            return function(*args)
+    return run
@@ -0,0 +1,59 @@
+"""Compares two benchmark result files and flags operations that got slower.
+
+python -m benchmarks.compare before.jsonl after.jsonl --threshold 0.2
+
+Exits with status 1 when any operation is slower than the threshold allows."""
+
+import argparse
+import json
+import sys
+
+
+def read_results(path):
+    """Returns {(benchmark, storage, size, operation): seconds}, keeping the last
+    result when a file holds several runs of the same measurement. Concurrency runs
+    have no operation and are told apart by their writer count; records with neither
+    are skipped."""
+    results = {}
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "seconds" not in record:
+                continue
+            operation = record.get("operation")
+            if operation is None and "processes" in record:
+                operation = f"add with {record['processes']} writers"
+            if operation is None:
+                continue
+            key = (record["benchmark"], record.get("storage"), record.get("size"), operation)
+            results[key] = record["seconds"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown as a fraction, 0.2 means 20%%")
+    args = parser.parse_args()
+
+    before, after = read_results(args.before), read_results(args.after)
+    regressions = 0
+    for key in sorted(before.keys() & after.keys(), key=str):
+        old, new = before[key], after[key]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  ⚠️ slower"
+            regressions += 1
+        benchmark, storage, size, operation = key
+        print(f"{operation:<30} {storage or '':<8} {size or '':>8}  {old:>10.6f}s -> {new:>10.6f}s  {change:+.0%}{flag}")
+    print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Synthetic task lists for the benchmarks.
+
+python -m benchmarks.generator --count 100000 --output tasks.json"""
+
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+# The ways people type due dates; the manager accepts all of them.
+DATE_STYLES = ["%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y"]
+INVALID_DATES = ["32/13/9999", "tomorrow", "2025-02-30", "next week"]
+PRIORITIES = ["High", "Medium", "Low"]
+
+
+def generate_tasks(count, completed_ratio=0.3, invalid_ratio=0.01, undated_ratio=0.05,
+                   distribution="uniform", spread_days=365, seed=0):
+    """Yields task dicts in the tasks.json layout.
+
+    distribution is "uniform" (due dates spread evenly from spread_days/4 in the past to
+    spread_days ahead) or "near" (most tasks due within a couple of weeks of today)."""
+    rng = random.Random(seed)
+    today = date.today()
+    for task_id in range(1, count + 1):
+        roll = rng.random()
+        if roll < invalid_ratio:
+            due = rng.choice(INVALID_DATES)
+        elif roll < invalid_ratio + undated_ratio:
+            due = "N/A"
+        else:
+            if distribution == "near":
+                offset = int(rng.gauss(3, 7))
+            else:
+                offset = rng.randint(-spread_days // 4, spread_days)
+            due = (today + timedelta(days=offset)).strftime(rng.choice(DATE_STYLES))
+        yield {
+            "id": task_id,
+            "title": f"Task {task_id}: {rng.choice(['review', 'write', 'email', 'plan', 'fix'])} "
+                     f"{rng.choice(['report', 'notes', 'budget', 'slides', 'schedule'])}",
+            "due_date": due,
+            "priority": rng.choice(PRIORITIES),
+            "completed": rng.random() < completed_ratio
+        }
+
+
+def write_tasks_file(path, count, **options):
+    """Writes a tasks.json snapshot with count generated tasks."""
+    tasks = list(generate_tasks(count, **options))
+    with open(path, 'w') as f:
+        json.dump({"next_id": count + 1, "tasks": tasks}, f, indent=4)
+
+
+def add_options(parser):
+    parser.add_argument("--completed-ratio", type=float, default=0.3)
+    parser.add_argument("--invalid-ratio", type=float, default=0.01)
+    parser.add_argument("--undated-ratio", type=float, default=0.05)
+    parser.add_argument("--distribution", choices=["uniform", "near"], default="uniform")
+    parser.add_argument("--spread-days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def options_from(args):
+    return {
+        "completed_ratio": args.completed_ratio,
+        "invalid_ratio": args.invalid_ratio,
+        "undated_ratio": args.undated_ratio,
+        "distribution": args.distribution,
+        "spread_days": args.spread_days,
+        "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic tasks.json")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--output", default="tasks.json")
+    add_options(parser)
+    args = parser.parse_args()
+    write_tasks_file(args.output, args.count, **options_from(args))
+    print(f"✅ Wrote {args.count} tasks to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,9 @@ class TaskManager:
     """This class handles the loading, saving, and managing tasks part."""
 
     def __init__(self):
+        # The id counter is saved with the tasks, so deleting the newest task and
+        # restarting never hands its id out again.
+        self.next_id = 1
         self.tasks = self.load_tasks()
 
     def load_tasks(self):
@@ -46,14 +49,21 @@ class TaskManager:
             return []
         with open(TASKS_FILE, 'r') as f:
             data = json.load(f)
-            return [Task.from_dict(d) for d in data]
+        if isinstance(data, dict):
+            self.next_id = data["next_id"]
+            data = data["tasks"]
+        else:
+            # A bare list, saved before the counter was: the best guess is the highest id.
+            self.next_id = max((d['id'] for d in data), default=0) + 1
+        return [Task.from_dict(d) for d in data]
 
     def save_tasks(self):
         with open(TASKS_FILE, 'w') as f:
-            json.dump([t.to_dict() for t in self.tasks], f, indent=4)
+            json.dump({"next_id": self.next_id, "tasks": [t.to_dict() for t in self.tasks]}, f, indent=4)
 
     def add_task(self, title, due_date, priority):
-        task_id = len(self.tasks) + 1
+        task_id = self.next_id
+        self.next_id += 1
         task = Task(task_id, title, due_date, priority)
         self.tasks.append(task)
         self.save_tasks()
@@ -1,11 +1,13 @@
 import re
 from datetime import datetime, timedelta
 import json
+from autosave import AutosaveMixin
 
-class TaskManager:
+class TaskManager(AutosaveMixin):
     TASKS_FILE = 'tasks.json'
 
     def __init__(self):
+        super().__init__()
         self.tasks = []
 
     def load_tasks(self):
@@ -13,9 +15,8 @@ class TaskManager:
             with open(self.TASKS_FILE, 'r') as file:
                 self.tasks = json.load(file)
                 if self.tasks:
-                    print(f"✅ {len(self.tasks)} tasks loaded from {self.TASKS_FILE}:")
-                    print(json.dumps(self.tasks, indent=4))
-                    return  
+                    print(f"✅ {len(self.tasks)} tasks loaded from {self.TASKS_FILE}")
+                    return
         except FileNotFoundError:
             print(f"⚠️ File not found: {self.TASKS_FILE}")
         except json.JSONDecodeError:
@@ -36,15 +37,6 @@ class TaskManager:
                 "due_date": due_date if due_date else "N/A"
             })
         self.save_tasks()
-        
-
-    def save_tasks(self):
-        try:
-            with open(self.TASKS_FILE, 'w') as file:
-                json.dump(self.tasks, file, indent=4)
-            print("💾 Tasks saved successfully.")
-        except Exception as e:
-            print(f"❌ Failed to save tasks: {e}")
 
     def add_task(self, description, due_date=None):
         task = {
@@ -53,6 +45,7 @@ class TaskManager:
             "due_date": due_date if due_date else "N/A"
         }
         self.tasks.append(task)
+        self.mark_dirty()
 
     def organize_tasks(self):
         categorized_tasks = {
@@ -106,6 +99,7 @@ class TaskManager:
         else:
             print("Invalid input")
             return None
+        self.mark_dirty()
         return task['status']
 
     def deadline_manager(self, idx):
@@ -120,6 +114,7 @@ class TaskManager:
             try:
                 parsed_date = datetime.strptime(deadline_prompt.replace("-", "/"), "%m/%d/%Y")
                 task['due_date'] = parsed_date.strftime("%m/%d/%Y")
+                self.mark_dirty()
                 print(f"📅 Deadline set for '{task['description']}' on {task['due_date']}")
             except ValueError:
                 print("❌ Could not parse the date. Please try again.")
@@ -130,7 +125,16 @@ class TaskManager:
 def main():
     manager = TaskManager()
     manager.load_tasks()
+    manager.start_autosave()
+    try:
+        run_loop(manager)
+    except (KeyboardInterrupt, EOFError):
+        print("\n👋 Goodbye!")
+    finally:
+        manager.close()
+
 
+def run_loop(manager):
     while True:
         cmd = input("\nChoose an action - add/show/organize/progress/deadline/summary/exit: ").strip().lower()
 
@@ -176,7 +180,7 @@ def main():
                     print(f"{icon} - {task['description']}")
 
         elif cmd == 'exit':
-            manager.save_tasks()
+            # main() closes the manager, which writes anything autosave has not.
             print("👋 Goodbye!")
             break
 
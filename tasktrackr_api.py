@@ -0,0 +1,266 @@
+"""TaskTrackr HTTP API – serves the task list as JSON for dashboards and scripts.
+
+python tasktrackr_api.py --port 8326
+
+GET    /tasks?status=pending&limit=20   list tasks
+GET    /tasks/<id>                      one task
+POST   /tasks                           add a task: {"title", "due", "priority", "repeat"}
+POST   /tasks/<id>/complete?on=DATE     mark a task, or one occurrence of a recurring task, as completed
+PATCH  /tasks/<id>                      change title / due / priority, or one occurrence's with "on"
+DELETE /tasks/<id>                      delete a task
+GET    /organize                        tasks grouped by due date
+
+Reads are answered from an immutable snapshot of the task list, so any number of them
+run at once. Writes go through a single worker thread one at a time. Every GET sends an
+ETag and answers 304 Not Modified when the client's If-None-Match still matches."""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlsplit, parse_qs
+
+from tasktrackr_final import DB_FILE, STORAGE_MODES, check_text_fields, create_manager, read_disk_version
+
+REASONS = {200: "OK", 201: "Created", 304: "Not Modified", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Snapshot:
+    """A read-only copy of the task list as of one data version."""
+    def __init__(self, version, disk_version, day, tasks, organized):
+        self.version = version
+        self.disk_version = disk_version
+        self.day = day
+        self.tasks = tasks
+        self.by_id = {task["id"]: task for task in tasks}
+        self.organized = organized
+
+
+class TaskApi:
+    def __init__(self, storage=None):
+        # One worker thread owns the TaskManager, which serializes every write and
+        # keeps SQLite connections on the thread that created them.
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        # Checks for writes by other processes on a thread of its own, so reads never
+        # wait behind the writer queue.
+        self.prober = ThreadPoolExecutor(max_workers=1)
+        self.probe_conn = None
+        self.manager = None
+        # A server restart resets nothing on disk but does restart the version count,
+        # so the ETag also names this server run.
+        self.run_id = uuid.uuid4().hex[:8]
+        self.snapshot = None
+        self.refreshing = None
+        self.storage = storage
+
+    async def run_in_writer(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, function, *args)
+
+    def open_manager(self):
+        self.manager = create_manager(self.storage)
+        self.manager.quiet = True
+        self.manager.ensure_loaded()
+
+    def probe_disk_version(self):
+        """The write counter of the task files (SQLite's data_version for tasks.db),
+        which changes whenever any process writes them. Runs on the prober thread."""
+        if self.manager.storage != "sqlite":
+            return read_disk_version()
+        if self.probe_conn is None:
+            self.probe_conn = sqlite3.connect(DB_FILE)
+        return self.probe_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def build_snapshot(self, disk_version):
+        manager = self.manager
+        manager.reload_if_changed()
+        tasks = [task.to_dict() for task in manager.iter_tasks()]
+        # Buckets hold ids, except for the occurrences of recurring tasks, which
+        # share their task's id and are only generated for organize.
+        recurring = {task["id"] for task in tasks if "repeat" in task}
+        organized = {
+            category: [task.to_dict() if task.id in recurring else task.id for task in tasks]
+            for category, tasks in manager.organize_tasks().items()
+        }
+        return Snapshot(manager.version, disk_version, date.today(), tasks, organized)
+
+    async def current_snapshot(self):
+        """Returns a snapshot for the latest version, rebuilding it at most once no
+        matter how many readers ask at the same time. Writes made by other processes,
+        such as the command line, are picked up through the disk version."""
+        disk_version = await asyncio.get_running_loop().run_in_executor(self.prober, self.probe_disk_version)
+        snapshot = self.snapshot
+        if (snapshot is not None and snapshot.version == self.manager.version
+                and snapshot.disk_version == disk_version and snapshot.day == date.today()):
+            return snapshot
+        if self.refreshing is None:
+            self.refreshing = asyncio.ensure_future(self.run_in_writer(self.build_snapshot, disk_version))
+        refreshing = self.refreshing
+        try:
+            snapshot = await refreshing
+        finally:
+            if self.refreshing is refreshing:
+                self.refreshing = None
+        self.snapshot = snapshot
+        return snapshot
+
+    def etag(self, snapshot, suffix=""):
+        return f'"{self.run_id}-{snapshot.disk_version}-{snapshot.version}{suffix}"'
+
+    # Write operations; these run on the writer thread.
+
+    def add(self, body):
+        check_text_fields(body)
+        if not body.get("title"):
+            raise HttpError(400, "title is required")
+        try:
+            task = self.manager.add_task(body["title"], body.get("due", "N/A"), body.get("priority", "Medium"),
+                                         body.get("repeat"))
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return task.to_dict()
+
+    def complete(self, task_id, on=None):
+        return self.found(self.manager.complete_task(task_id, on)).to_dict()
+
+    def update(self, task_id, body):
+        check_text_fields(body)
+        task = self.manager.update_task(task_id, body.get("title"), body.get("due"), body.get("priority"),
+                                        body.get("on"))
+        return self.found(task).to_dict()
+
+    def delete(self, task_id):
+        return self.found(self.manager.delete_task(task_id)).to_dict()
+
+    @staticmethod
+    def found(task):
+        if task is None:
+            raise HttpError(404, "task not found")
+        return task
+
+    async def route(self, method, path, query, body):
+        """Returns (status, payload, etag)."""
+        parts = [part for part in path.split("/") if part]
+        if method == "GET":
+            snapshot = await self.current_snapshot()
+            if parts == ["tasks"]:
+                status_filter = query.get("status", [None])[0]
+                tasks = snapshot.tasks
+                if status_filter == "pending":
+                    tasks = [t for t in tasks if not t["completed"]]
+                elif status_filter == "completed":
+                    tasks = [t for t in tasks if t["completed"]]
+                if "limit" in query:
+                    tasks = tasks[:int(query["limit"][0])]
+                return 200, tasks, self.etag(snapshot)
+            if len(parts) == 2 and parts[0] == "tasks":
+                task = snapshot.by_id.get(int(parts[1]))
+                if task is None:
+                    raise HttpError(404, "task not found")
+                return 200, task, self.etag(snapshot)
+            if parts == ["organize"]:
+                organized = {
+                    category: [snapshot.by_id[entry] if isinstance(entry, int) else entry for entry in entries]
+                    for category, entries in snapshot.organized.items()
+                }
+                # Buckets move when the day changes even if no task did.
+                return 200, organized, self.etag(snapshot, f"-{snapshot.day.isoformat()}")
+            raise HttpError(404, "no such resource")
+
+        if method == "POST" and parts == ["tasks"]:
+            return 201, await self.run_in_writer(self.add, body), None
+        if method == "POST" and len(parts) == 3 and parts[0] == "tasks" and parts[2] == "complete":
+            return 200, await self.run_in_writer(self.complete, int(parts[1]), query.get("on", [None])[0]), None
+        if method == "PATCH" and len(parts) == 2 and parts[0] == "tasks":
+            return 200, await self.run_in_writer(self.update, int(parts[1]), body), None
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "tasks":
+            return 200, await self.run_in_writer(self.delete, int(parts[1])), None
+        raise HttpError(405, "method not allowed")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1")
+                    if line in ("\r\n", "\n", ""):
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                raw_body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload, etag = await self.respond(method, target, raw_body)
+                response_headers = {"Content-Type": "application/json"}
+                if etag:
+                    response_headers["ETag"] = etag
+                if etag and headers.get("if-none-match") == etag:
+                    status, body = 304, b""
+                else:
+                    body = json.dumps(payload).encode("utf-8")
+                response_headers["Content-Length"] = str(len(body))
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if not keep_alive:
+                    response_headers["Connection"] = "close"
+                head = f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                head += "".join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+                writer.write(head.encode("latin-1") + b"\r\n" + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target, raw_body):
+        url = urlsplit(target)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            return await self.route(method, url.path, parse_qs(url.query), body)
+        except HttpError as e:
+            return e.status, {"error": str(e)}, None
+        except ValueError as e:
+            return 400, {"error": str(e)}, None
+        except Exception as e:
+            return 500, {"error": str(e)}, None
+
+    async def start(self, host, port):
+        await self.run_in_writer(self.open_manager)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(host, port, storage):
+    api = TaskApi(storage)
+    server = await api.start(host, port)
+    print(f"🌐 Serving tasks on http://{host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TaskTrackr HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8326)
+    parser.add_argument("--storage", choices=STORAGE_MODES)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.storage))
+    except KeyboardInterrupt:
+        print("👋 Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,177 +1,2936 @@
+import time
+# Taken before the other imports so --metrics can report how long importing took.
+IMPORT_STARTED = time.perf_counter()
+
 import json
 import os
-import argparse
 import re
-from datetime import datetime, timedelta
+import argparse
+import bisect
+import calendar
+import collections
+import contextlib
+import cProfile
+import csv
+import fcntl
+import functools
+import gzip
+import heapq
+import io
+import itertools
+import mmap
+import signal
+import socket
+import socketserver
+import sqlite3
+import struct
+import subprocess
+import sys
+import threading
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from operator import attrgetter
+
+TASKS_FILE = 'tasks.json'
+JOURNAL_FILE = 'tasks.journal'
+DB_FILE = 'tasks.db'
+SEARCH_INDEX_FILE = 'tasks.index'
+BINARY_FILE = 'tasks.bin'
+SHARD_DIR = 'tasks.d'
+ARCHIVE_FILE = 'tasks.archive.gz'
+# Ids per tasks.d/ids-N.json file, which records the shard of each of those ids.
+IDS_PER_LOCATOR = 4096
+LOCK_FILE = 'tasks.lock'
+# Seconds to wait for another process to finish writing before giving up.
+LOCK_TIMEOUT = 10.0
+SOCKET_FILE = 'tasks.sock'
+FLUSH_INTERVAL = 1.0
+# Time of day the remind daemon reminds about tasks due that day, and the longest it
+# sleeps between looks at the clock, so a suspended or re-set clock is caught up with.
+REMIND_AT = "09:00"
+REMIND_MAX_SLEEP = 3600.0
+# When the journal is synced to disk: after every record, once per write (a command,
+# batch or daemon flush), or never, leaving it to the OS.
+FSYNC_POLICIES = ["always", "batch", "none"]
+# A journal larger than this is folded into a fresh tasks.json on the next write.
+JOURNAL_SNAPSHOT_BYTES = 4 << 20
+STORAGE_MODES = ["json", "journal", "sqlite", "sharded", "binary"]
+NO_DUE_DATE = 'N/A'
+# Accepted ways of typing a due date. They are all stored as YYYY-MM-DD.
+DUE_DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%Y/%m/%d"]
+OUTPUT_FORMATS = ["text", "table", "ndjson", "csv"]
+IMPORT_FORMATS = ["csv", "ndjson"]
+# Rows handed to an import worker at a time. Files with fewer rows are checked in
+# this process, since starting workers would take longer than the rows themselves.
+IMPORT_CHUNK_ROWS = 20000
+SORT_FIELDS = ["id", "due", "priority", "title"]
+# Recurring tasks show their occurrences from this many days back, so missed ones
+# stay visible, to this many days ahead, unless a query asks for another window.
+RECURRENCE_WINDOW_DAYS = 7
+DUE_CATEGORIES = ['Overdue', 'Due Today', 'Due This Week', 'Due Later', 'No Due Date', 'Invalid Dates']
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_due_date(value):
+    """Returns (due_date, ordinal) for a typed due date: the canonical YYYY-MM-DD string
+    and its date ordinal. Missing dates become ("N/A", None); unparseable ones are kept
+    as typed with a None ordinal so they show up under Invalid Dates.
+
+    Task lists share a small set of dates, so the cache means each distinct string is
+    parsed once and every task due that day shares one string and one int."""
+    if value is None or not value.strip() or value.strip().upper() == NO_DUE_DATE:
+        return NO_DUE_DATE, None
+    for date_format in DUE_DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+        return parsed.isoformat(), parsed.toordinal()
+    return value, None
+
+
+class Priority(str, Enum):
+    """Task priorities, most urgent first. Members are strings, so they are saved
+    and shown as "High", "Medium" and "Low" exactly as before."""
+    HIGH = "High"
+    MEDIUM = "Medium"
+    LOW = "Low"
+
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+    @property
+    def rank(self):
+        return PRIORITY_RANKS[self]
+
+
+PRIORITY_RANKS = {priority: rank for rank, priority in enumerate(Priority)}
+PRIORITY_ALIASES = {
+    "high": Priority.HIGH, "h": Priority.HIGH,
+    "medium": Priority.MEDIUM, "med": Priority.MEDIUM, "m": Priority.MEDIUM,
+    "low": Priority.LOW, "l": Priority.LOW,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def normalize_priority(value):
+    """Returns the Priority for a typed priority, ignoring case ("high", "H", "med").
+    Anything else is kept as typed, like an unparseable due date, and ranks after
+    Low."""
+    priority = PRIORITY_ALIASES.get(value.strip().casefold())
+    return priority if priority is not None else sys.intern(value)
+
+
+def priority_rank(priority):
+    return PRIORITY_RANKS.get(priority, len(PRIORITY_RANKS))
+
+
+def urgency(task):
+    """Sort key for the next command: priority, then due date with undated and
+    unparseable dates last, then id."""
+    return (priority_rank(task.priority), task.due_ordinal is None, task.due_ordinal or 0, task.id)
+
+
+class Recurrence:
+    """How often a recurring task comes round: every `every` days, weeks or months
+    from its due date, optionally until an end date. Shared between tasks, so it is
+    never changed in place."""
+    __slots__ = ("every", "unit", "until", "until_ordinal")
+
+    UNITS = ("day", "week", "month")
+    NAMES = {("day", 1): "daily", ("week", 1): "weekly", ("month", 1): "monthly"}
+    PATTERN = re.compile(r"(daily|weekly|monthly|every\s+(\d+)\s+(day|week|month)s?)(?:\s+until\s+(\S+))?$")
+
+    def __init__(self, every=1, unit="day", until=None):
+        if every < 1 or unit not in self.UNITS:
+            raise ValueError(f"invalid recurrence: every {every} {unit}")
+        self.every = every
+        self.unit = unit
+        self.until, self.until_ordinal = (None, None) if until is None else normalize_due_date(until)
+        if until is not None and self.until_ordinal is None:
+            raise ValueError(f"invalid end date: {until}")
+
+    def __str__(self):
+        text = self.NAMES.get((self.unit, self.every)) or f"every {self.every} {self.unit}s"
+        return f"{text} until {self.until}" if self.until else text
+
+    def __eq__(self, other):
+        return isinstance(other, Recurrence) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def ordinals(self, anchor, start, end):
+        """Yields the date ordinals of the occurrences between start and end,
+        inclusive, for a task first due on anchor."""
+        if self.until_ordinal is not None:
+            end = min(end, self.until_ordinal)
+        start = max(start, anchor)
+        if start > end:
+            return
+        if self.unit != "month":
+            step = self.every * (7 if self.unit == "week" else 1)
+            yield from range(anchor - (anchor - start) // step * step, end + 1, step)
+            return
+        # Monthly occurrences keep the day of the month, or the month's last day when
+        # it is shorter (a task due on the 31st comes round on the 30th in April).
+        first = date.fromordinal(anchor)
+        skipped = (date.fromordinal(start).year - first.year) * 12 + date.fromordinal(start).month - first.month
+        step = max(0, skipped // self.every - 1)
+        while True:
+            months = first.month - 1 + step * self.every
+            year, month = first.year + months // 12, months % 12 + 1
+            ordinal = date(year, month, min(first.day, calendar.monthrange(year, month)[1])).toordinal()
+            if ordinal > end:
+                return
+            if ordinal >= start:
+                yield ordinal
+            step += 1
+
+
+@functools.lru_cache(maxsize=256)
+def parse_recurrence(text):
+    """Returns the Recurrence for a rule such as "daily", "weekly until 2025-06-30"
+    or "every 3 days"; raises ValueError for anything else."""
+    match = Recurrence.PATTERN.match(text.strip().lower())
+    if match is None:
+        raise ValueError(f"invalid recurrence: {text} (use daily, weekly, monthly or every N days/weeks/months)")
+    name, every, unit, until = match.groups()
+    if every is None:
+        every, unit = 1, {"daily": "day", "weekly": "week", "monthly": "month"}[name]
+    return Recurrence(int(every), unit, until)
+
+
+def recurrence_window(start=None, end=None):
+    """(first, last) date ordinals to show occurrences of recurring tasks for: the
+    given due dates, or RECURRENCE_WINDOW_DAYS either side of today."""
+    today = date.today().toordinal()
+    first = normalize_due_date(start)[1] if start else None
+    last = normalize_due_date(end)[1] if end else None
+    return (today - RECURRENCE_WINDOW_DAYS if first is None else first,
+            today + RECURRENCE_WINDOW_DAYS if last is None else last)
+
+
+class Metrics:
+    """Wall time and net memory allocated per phase of one CLI run, for --metrics.
+    Phases can nest; each one reports only what was not spent in the phases inside
+    it, so the phases add up to the whole run. Net allocation can be negative for a
+    phase that frees what an inner phase allocated."""
+
+    def __init__(self):
+        tracemalloc.start()
+        self.phases = {}
+        # [seconds, bytes] taken by nested phases, one entry per open phase.
+        self.stack = []
+
+    def phase(self, name):
+        return MetricsPhase(self, name)
+
+    def record(self, name, seconds, allocated):
+        totals = self.phases.setdefault(name, {"seconds": 0.0, "net_alloc_bytes": 0, "calls": 0})
+        totals["seconds"] += seconds
+        if allocated is not None:
+            totals["net_alloc_bytes"] += allocated
+        totals["calls"] += 1
+
+    def timed_iter(self, name, iterable):
+        """Yields from iterable, counting the time spent producing items as a phase."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self, record, path=None):
+        """Writes one JSON line: appended to path if given, else to stderr."""
+        record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        record["total_seconds"] = round(sum(p["seconds"] for p in self.phases.values()), 6)
+        record["phases"] = {
+            name: {**totals, "seconds": round(totals["seconds"], 6)}
+            for name, totals in self.phases.items()
+        }
+        line = json.dumps(record)
+        if path is None:
+            print(line, file=sys.stderr)
+        else:
+            with open(path, 'a') as f:
+                f.write(line + "\n")
+
+
+class MetricsPhase:
+    # A plain class rather than @contextmanager: output writes open one per print call.
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.allocated = tracemalloc.get_traced_memory()[0]
+        self.metrics.stack.append([0.0, 0])
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        allocated = tracemalloc.get_traced_memory()[0] - self.allocated
+        nested_seconds, nested_allocated = self.metrics.stack.pop()
+        if self.metrics.stack:
+            self.metrics.stack[-1][0] += seconds
+            self.metrics.stack[-1][1] += allocated
+        self.metrics.record(self.name, seconds - nested_seconds, allocated - nested_allocated)
+
+
+class MeteredOutput:
+    """Stands in for sys.stdout and counts the time spent writing as the output phase."""
+    def __init__(self, metrics, stream):
+        self.metrics = metrics
+        self.stream = stream
+
+    def write(self, text):
+        with self.metrics.phase("output"):
+            return self.stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def measure(metrics, name):
+    return metrics.phase(name) if metrics is not None else contextlib.nullcontext()
+
+
+def measured(name):
+    """Records the decorated TaskManager method as a phase when the manager has metrics."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return method(self, *args, **kwargs)
+            with self.metrics.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Task:
+    # No per-instance __dict__; this matters once a task list reaches the millions.
+    __slots__ = ("id", "title", "_due_date", "due_ordinal", "_priority", "completed", "completed_at",
+                 "_repeat", "exceptions")
+
+    def __init__(self, task_id, title, due_date, priority, completed=False, completed_at=None,
+                 repeat=None, exceptions=None):
+        self.id = task_id
+        self.title = title
+        self.due_date = due_date
+        self.priority = priority
+        self.completed = completed
+        # ISO date the task was completed on; None for tasks completed before this
+        # was recorded, and for pending tasks.
+        self.completed_at = completed_at
+        # Recurring tasks: the Recurrence, counted from due_date, and the occurrences
+        # that differ from the task, as {ISO date: {field: value}}. Only these are
+        # stored; every other occurrence is generated when it is asked for.
+        self.repeat = repeat
+        self.exceptions = exceptions
+
+    @property
+    def due_date(self):
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, value):
+        self._due_date, self.due_ordinal = normalize_due_date(value)
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, value):
+        # Every task shares the Priority members, and custom priorities are interned.
+        self._priority = normalize_priority(value) if isinstance(value, str) else value
+
+    @property
+    def repeat(self):
+        return self._repeat
+
+    @repeat.setter
+    def repeat(self, value):
+        self._repeat = parse_recurrence(value) if isinstance(value, str) else value
+
+    def occurrences(self, start, end):
+        """Yields the occurrences of a recurring task due between the start and end
+        date ordinals, as Tasks with this task's id. Once the task itself is completed
+        the series has ended, and only its completed occurrences are left."""
+        if self.repeat is None or self.due_ordinal is None:
+            return
+        exceptions = self.exceptions or {}
+        for ordinal in self.repeat.ordinals(self.due_ordinal, start, end):
+            occurrence = Task(self.id, self.title, date.fromordinal(ordinal).isoformat(), self.priority)
+            for field, value in exceptions.get(occurrence.due_date, {}).items():
+                setattr(occurrence, field, value)
+            if occurrence.completed or not self.completed:
+                yield occurrence
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "title": self.title,
+            "due_date": self.due_date,
+            "priority": self.priority,
+            "completed": self.completed
+        }
+        if self.completed_at is not None:
+            data["completed_at"] = self.completed_at
+        if self.repeat is not None:
+            data["repeat"] = str(self.repeat)
+        if self.exceptions:
+            data["exceptions"] = self.exceptions
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        return Task(
+            data['id'],
+            data['title'],
+            data['due_date'],
+            data['priority'],
+            data['completed'],
+            data.get('completed_at'),
+            data.get('repeat'),
+            data.get('exceptions')
+        )
+
+# Status strings of the legacy task format that mean the task is done.
+DONE_STATUSES = {"complete", "completed", "done"}
+
+
+def task_from_record(data, next_id):
+    """Builds a Task from a saved record in either format: the current one, or the
+    legacy {"description", "status", "due_date"} dicts of the first prototypes
+    (eyobs_part.py, ari's_part.py). Legacy records usually have no id, so they get
+    next_id, and no priority, so they get Medium."""
+    if "title" in data:
+        return Task.from_dict(data)
+    return Task(
+        data.get("id", next_id),
+        data.get("description", ""),
+        data.get("due_date") or NO_DUE_DATE,
+        data.get("priority") or "Medium",
+        str(data.get("status", "")).strip().lower() in DONE_STATUSES
+    )
+
+
+class LockTimeout(Exception):
+    pass
+
+
+def open_lock_file(exclusive=True):
+    """Opens tasks.lock and takes the advisory lock on it, waiting at most
+    LOCK_TIMEOUT for other processes."""
+    f = open(LOCK_FILE, 'a+')
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+            return f
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                f.close()
+                raise LockTimeout(f"{LOCK_FILE} is still locked after {LOCK_TIMEOUT:g}s")
+            time.sleep(0.01)
+
+
+def read_lock_counter(f):
+    """The write counter kept in tasks.lock, bumped by every write of the task files."""
+    f.seek(0)
+    text = f.read().strip()
+    return int(text) if text.isdigit() else 0
+
+
+def read_disk_version():
+    """Reads the write counter under a shared lock of its own, so any thread can
+    check for changes without going through a TaskManager."""
+    with open_lock_file(exclusive=False) as f:
+        return read_lock_counter(f)
+
+
+def replace_file(path, write, mode='w'):
+    """Calls write(f) on a temporary file next to path, then renames it over path, so
+    readers and crashes only ever see the old file or the whole new one."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    # The rename itself is only durable once the directory entry is on disk.
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def search_terms(text):
+    """Splits text into lowercase words. A trailing * is kept, so that query terms
+    can ask for a prefix match."""
+    return re.findall(r"\w+\*?", text.casefold())
+
+
+def title_matches(title, terms):
+    """Whether a title contains every search term, matching a term ending in * as a
+    prefix."""
+    words = [word.rstrip("*") for word in search_terms(title)]
+    return all(
+        any(word.startswith(term[:-1]) for word in words) if term.endswith("*") else term in words
+        for term in terms
+    )
+
+
+def create_search_words(conn):
+    # One row per word of each title. The primary key keeps the words sorted, so a
+    # prefix is a range scan.
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS search_words ("
+        "word TEXT NOT NULL, task_id INTEGER NOT NULL, PRIMARY KEY (word, task_id)) WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS search_words_task ON search_words (task_id)")
+
+
+def index_title(conn, task_id, title):
+    conn.execute("DELETE FROM search_words WHERE task_id = ?", (task_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO search_words (word, task_id) VALUES (?, ?)",
+        [(word.rstrip("*"), task_id) for word in search_terms(title)],
+    )
+
+
+def search_words_query(terms):
+    """Returns the SQL selecting the ids of the tasks whose titles contain every term,
+    and its parameters: one range or equality lookup per term, intersected inside
+    SQLite."""
+    lookups, params = [], []
+    for term in terms:
+        if term.endswith("*"):
+            lookups.append("SELECT task_id FROM search_words WHERE word >= ? AND word < ?")
+            params += [term[:-1], term[:-1] + "\U0010ffff"]
+        else:
+            lookups.append("SELECT task_id FROM search_words WHERE word = ?")
+            params.append(term)
+    return " INTERSECT ".join(lookups), params
+
+
+class SearchIndex:
+    """tasks.index: the word index over task titles for the file-based storage modes,
+    a SQLite file with the same search_words table as SqliteTaskManager. Each task's
+    record is kept next to its words, so a search reads only the tasks it finds, and
+    a write of the task files only updates the tasks it changed. The index is only
+    trusted while its stamp matches the task files."""
+
+    def __init__(self, path=None):
+        self.conn = sqlite3.connect(path or SEARCH_INDEX_FILE, timeout=LOCK_TIMEOUT)
+        # Rebuilt whenever it is stale, so WAL's cheaper syncing is plenty.
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            create_search_words(self.conn)
+
+    @staticmethod
+    def open_current(stamp, path=None):
+        """The index if there is one and it matches stamp, otherwise None."""
+        path = path or SEARCH_INDEX_FILE
+        if not os.path.exists(path):
+            return None
+        index = SearchIndex(path)
+        if index.stamp() == stamp:
+            return index
+        index.close()
+        return None
+
+    def stamp(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, task_id, task):
+        """Stores a task and its words, or forgets the id when task is None."""
+        if task is None:
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.conn.execute("DELETE FROM search_words WHERE task_id = ?", (task_id,))
+            return
+        self.conn.execute("INSERT OR REPLACE INTO tasks (id, data) VALUES (?, ?)",
+                          (task_id, json.dumps(task.to_dict())))
+        index_title(self.conn, task_id, task.title)
+
+    def update(self, tasks, stamp):
+        """Stores {id: Task, or None for a task that is gone} and the stamp of the task
+        files they were written to, in one transaction."""
+        with self.conn:
+            for task_id, task in tasks.items():
+                self.put(task_id, task)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stamp', ?)", (json.dumps(stamp),))
+
+    def rebuild(self, tasks, stamp):
+        with self.conn:
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM search_words")
+        self.update({task.id: task for task in tasks}, stamp)
+
+    def query(self, terms):
+        """Returns (id, record) for the tasks whose titles contain every term, in id order."""
+        sql, params = search_words_query(terms)
+        return self.conn.execute(f"SELECT id, data FROM tasks WHERE id IN ({sql}) ORDER BY id", params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+class TaskCounters:
+    """Task counts for the stats command, kept up to date by add and remove as tasks
+    change, so reporting them never looks at a task: completed and pending tasks per
+    priority, and pending tasks per due date. The due dates are only summed into the
+    DUE_CATEGORIES buckets once a day; after that each change moves one count."""
+
+    def __init__(self, priorities=None, due=None):
+        # Priority -> [pending, completed].
+        self.priorities = priorities or {}
+        # Pending tasks by ISO due date, or by NO_DUE_DATE, "invalid" or "recurring".
+        self.due = due or {}
+        # The day the buckets were summed for, its end of week, and the sums.
+        self.day = None
+        self.end_of_week = None
+        self.buckets = None
+
+    @staticmethod
+    def due_key(task):
+        return TaskCounters.key_for(task.due_date, task.due_ordinal, task.repeat is not None)
+
+    @staticmethod
+    def key_for(due_date, due_ordinal, recurring):
+        if recurring:
+            return "recurring"
+        if due_ordinal is not None:
+            return due_date
+        return NO_DUE_DATE if due_date == NO_DUE_DATE else "invalid"
+
+    def bucket(self, key):
+        if key == "recurring":
+            return "Recurring"
+        if key == NO_DUE_DATE:
+            return "No Due Date"
+        if key == "invalid":
+            return "Invalid Dates"
+        ordinal = date.fromisoformat(key).toordinal()
+        if ordinal < self.day:
+            return "Overdue"
+        if ordinal == self.day:
+            return "Due Today"
+        return "Due This Week" if ordinal <= self.end_of_week else "Due Later"
+
+    def add(self, task, count=1):
+        """Counts a task in; a count of -1 counts it out again."""
+        counts = self.priorities.setdefault(task.priority, [0, 0])
+        counts[task.completed] += count
+        if not counts[0] and not counts[1]:
+            del self.priorities[task.priority]
+        if task.completed:
+            return
+        key = self.due_key(task)
+        self.due[key] = self.due.get(key, 0) + count
+        if not self.due[key]:
+            del self.due[key]
+        if self.buckets is not None:
+            self.buckets[self.bucket(key)] += count
+
+    def remove(self, task):
+        self.add(task, -1)
+
+    def due_buckets(self):
+        """Pending tasks per due bucket, summed afresh only when the day has changed."""
+        today = date.today()
+        if self.day != today.toordinal():
+            self.day = today.toordinal()
+            self.end_of_week = self.day + (6 - today.weekday())
+            self.buckets = {category: 0 for category in DUE_CATEGORIES + ["Recurring"]}
+            for key, count in self.due.items():
+                self.buckets[self.bucket(key)] += count
+        return self.buckets
+
+    def report(self):
+        pending = sum(counts[0] for counts in self.priorities.values())
+        completed = sum(counts[1] for counts in self.priorities.values())
+        return {
+            "pending": pending,
+            "completed": completed,
+            "completion_rate": round(completed / (pending + completed), 4) if pending + completed else 0.0,
+            "priorities": {
+                priority: {"pending": counts[0], "completed": counts[1]}
+                for priority, counts in sorted(self.priorities.items(), key=lambda item: priority_rank(item[0]))
+            },
+            "due": dict(self.due_buckets()),
+        }
+
+    def to_dict(self):
+        return {"priorities": self.priorities, "due": self.due}
+
+    @staticmethod
+    def from_dict(data):
+        return TaskCounters({normalize_priority(priority): counts for priority, counts in data["priorities"].items()},
+                            data["due"])
+
+    @staticmethod
+    def of(tasks):
+        counters = TaskCounters()
+        for task in tasks:
+            counters.add(task)
+        return counters
+
+
+def read_tasks_file(path):
+    """Returns (tasks, next_id) from a tasks.json snapshot. Older snapshots are a bare
+    list of tasks without the id counter."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    next_id = 1
+    if isinstance(data, dict):
+        next_id = data.get("next_id", 1)
+        data = data["tasks"]
+    tasks, legacy_id = [], max_record_id(data) + 1
+    for record in data:
+        tasks.append(task_from_record(record, legacy_id))
+        if "id" not in record:
+            legacy_id += 1
+    return tasks, next_id
+
+
+def max_record_id(records):
+    """The highest id among saved task records. Legacy records without an id are
+    numbered on from it, in file order, so they never take an id used later on."""
+    return max((record["id"] for record in records if "id" in record), default=0)
+
+
+def write_tasks_snapshot(f, tasks, next_id=None, journal_seq=0, counters=None):
+    """Writes a tasks.json envelope, header first and then one task per line, and
+    returns how many tasks it wrote. json.dump with indent runs the pure-Python
+    encoder; encoding each task on its own keeps the C encoder and is several times
+    faster on large task lists. Without a next_id, tasks may be a one-pass stream:
+    next_id is worked out from the ids and written after the list. TaskCounters go
+    on the last line, where read_snapshot_counters finds them without the tasks."""
+    header = "" if next_id is None else f'\n    "next_id": {next_id},'
+    f.write(f'{{{header}\n    "journal_seq": {journal_seq},\n    "tasks": [')
+    max_id = 0
+
+    def lines():
+        nonlocal max_id
+        separator = "\n        "
+        for task in tasks:
+            max_id = max(max_id, task.id)
+            yield separator + json.dumps(task.to_dict())
+            separator = ",\n        "
+
+    written = write_lines(lines(), f)
+    f.write("\n    ]" if written else "]")
+    if next_id is None:
+        f.write(f',\n    "next_id": {max_id + 1}')
+    if counters is not None:
+        f.write(f',\n    "counters": {json.dumps(counters.to_dict())}')
+    f.write("\n}")
+    return written
+
+
+def read_snapshot_header(path, chunk_size=1 << 12):
+    """Returns the numeric fields written ahead of the task list in a tasks.json
+    envelope, such as next_id and journal_seq, without reading any tasks."""
+    with open(path, 'r') as f:
+        head = f.read(chunk_size)
+    if not head.lstrip().startswith("{"):
+        return {}
+    head = head.split('"tasks"', 1)[0]
+    return {key: int(value) for key, value in re.findall(r'"(\w+)":\s*(-?\d+)', head)}
+
+
+def read_snapshot_counters(path, chunk_size=1 << 14):
+    """Returns the TaskCounters saved at the end of a tasks.json envelope, reading
+    only the end of the file, or None if it has none."""
+    marker = b'\n    "counters": '
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            f.seek(max(0, size - chunk_size))
+            tail = f.read()
+            start = tail.rfind(marker)
+            if start != -1 or chunk_size >= size:
+                break
+            chunk_size *= 4
+    if start == -1:
+        return None
+    line = tail[start + len(marker):].rstrip().removesuffix(b"}").rstrip()
+    try:
+        return TaskCounters.from_dict(json.loads(line))
+    except ValueError:
+        return None
+
+
+def journal_line(seq, record):
+    """Formats a journal record as "crc32 seq json". The checksum covers the rest of
+    the line, so a record damaged on disk is caught instead of replayed."""
+    body = f"{seq} {json.dumps(record)}".encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(body), body)
+
+
+def iter_journal(f):
+    """Yields (seq, record, end offset) for each line of a journal opened in binary
+    mode, stopping at the first torn or damaged one."""
+    end = 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            return
+        try:
+            crc, _, body = line[:-1].partition(b" ")
+            if int(crc, 16) != zlib.crc32(body):
+                return
+            seq, _, data = body.partition(b" ")
+            seq, record = int(seq), json.loads(data)
+        except ValueError:
+            return
+        end += len(line)
+        yield seq, record, end
+
+
+def iter_tasks_file(path, chunk_size=1 << 16):
+    """Yields the tasks of a tasks.json snapshot one at a time, reading the file in
+    chunks so memory stays bounded no matter how large the file is."""
+    legacy_id = None
+    for record in iter_task_records(path, chunk_size):
+        if "id" in record:
+            yield task_from_record(record, None)
+            continue
+        if legacy_id is None:
+            # Only files with id-less legacy records pay for a second pass over the ids.
+            legacy_id = max_record_id(iter_task_records(path, chunk_size)) + 1
+        yield task_from_record(record, legacy_id)
+        legacy_id += 1
+
+
+def iter_task_records(path, chunk_size=1 << 16):
+    """Yields the raw task records of a tasks.json snapshot one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(chunk_size)
+        pos = 0
+
+        def skip(chars):
+            nonlocal buffer, pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    return ""
+
+        if skip(" \t\r\n") == "{":
+            # Envelope snapshot: the small header keys come first, the task list last.
+            while '"tasks"' not in buffer[pos:]:
+                more = f.read(chunk_size)
+                if not more:
+                    return
+                buffer += more
+            pos = buffer.index('"tasks"', pos) + len('"tasks"')
+            skip(" \t\r\n:")
+        if skip(" \t\r\n") != "[":
+            return
+        pos += 1
+        while skip(" \t\r\n,") not in ("]", ""):
+            try:
+                data, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The task object runs past the end of the buffer; read more of it.
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            pos = end
+            yield data
+
+
+def append_archive(tasks, path=None):
+    """Appends tasks to the archive as one more gzip member of NDJSON lines. gzip
+    readers treat the members as one stream, so what is already archived is never
+    read or rewritten."""
+    data = gzip.compress("".join(json.dumps(task.to_dict()) + "\n" for task in tasks).encode("utf-8"))
+    with open(path or ARCHIVE_FILE, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def iter_archive(path=None):
+    """Yields the archived tasks, oldest archive run first."""
+    path = path or ARCHIVE_FILE
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, 'rt', encoding="utf-8") as f:
+        try:
+            for line in f:
+                yield Task.from_dict(json.loads(line))
+        except (EOFError, gzip.BadGzipFile, ValueError):
+            # A member cut short by a crash mid-append; everything before it is intact.
+            return
+
+
+def int_from_env(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+# tasks.bin layout, all little-endian:
+#   header   magic, format version, task count, next id, completed count, length
+#            of the counters section, and the offsets of the three sections below
+#   ids      one uint32 per task, sorted; the record of ids[i] is records[i]
+#   records  fixed-width: id, completed, priority code, due ordinal (0 = no due
+#            date, -1 = unparseable), then offset and length of the title and of
+#            the "extra" text in the heap, then the completion date ordinal (0 =
+#            none)
+#   heap     UTF-8 strings. Extra text is "priority\0due date" and only holds the
+#            values that have no code: priorities other than Low/Medium/High, and
+#            unparseable due dates. Recurring tasks add "\0" and a JSON object with
+#            their "repeat" rule and "exceptions".
+#   counters the TaskCounters for stats as JSON, at the end of the file
+BINARY_MAGIC = b"TTRK"
+BINARY_VERSION = 3
+BINARY_HEADER = struct.Struct("<4sH2xIIIIQQQ")
+BINARY_RECORD = struct.Struct("<IBB2xiIIIII")
+BINARY_ID = struct.Struct("<I")
+PRIORITY_CODES = {"Low": 0, "Medium": 1, "High": 2}
+PRIORITY_NAMES = {code: name for name, code in PRIORITY_CODES.items()}
+OTHER_PRIORITY = 255
+
+
+def write_binary_tasks(f, tasks, next_id, counters=None):
+    """Writes tasks to a binary file opened with mode 'wb', with their TaskCounters
+    (counted here unless given)."""
+    tasks = sorted(tasks, key=attrgetter("id"))
+    counters = json.dumps((counters or TaskCounters.of(tasks)).to_dict()).encode("utf-8")
+    count = len(tasks)
+    ids_offset = BINARY_HEADER.size
+    records_offset = ids_offset + count * BINARY_ID.size
+    heap_offset = records_offset + count * BINARY_RECORD.size
+    ids = bytearray(records_offset - ids_offset)
+    records = bytearray(heap_offset - records_offset)
+    heap = bytearray()
+    completed = 0
+    for i, task in enumerate(tasks):
+        title = task.title.encode("utf-8")
+        title_at = len(heap)
+        heap += title
+        priority = PRIORITY_CODES.get(task.priority, OTHER_PRIORITY)
+        if task.due_ordinal is not None:
+            due = task.due_ordinal
+        else:
+            due = 0 if task.due_date == NO_DUE_DATE else -1
+        extra_at, extra_length = len(heap), 0
+        if priority == OTHER_PRIORITY or due == -1 or task.repeat is not None:
+            extra = f"{task.priority if priority == OTHER_PRIORITY else ''}\0{task.due_date if due == -1 else ''}"
+            if task.repeat is not None:
+                extra += "\0" + json.dumps({"repeat": str(task.repeat), "exceptions": task.exceptions})
+            extra = extra.encode("utf-8")
+            heap += extra
+            extra_length = len(extra)
+        completed_on = date.fromisoformat(task.completed_at).toordinal() if task.completed_at else 0
+        BINARY_ID.pack_into(ids, i * BINARY_ID.size, task.id)
+        BINARY_RECORD.pack_into(records, i * BINARY_RECORD.size, task.id, task.completed, priority, due,
+                                title_at, len(title), extra_at, extra_length, completed_on)
+        completed += task.completed
+    f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, count, next_id, completed, len(counters),
+                               ids_offset, records_offset, heap_offset))
+    f.write(ids)
+    f.write(records)
+    f.write(heap)
+    f.write(counters)
+
+
+class BinaryIdTable:
+    """The sorted id section of a binary file as a sequence, for bisect."""
+    def __init__(self, data, offset, count):
+        self.data = data
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return BINARY_ID.unpack_from(self.data, self.offset + index * BINARY_ID.size)[0]
+
+
+class BinaryTaskFile:
+    """Read-only view of a tasks.bin file through mmap. Looking up one task reads a
+    few pages of the id table plus its record and title; counts come from the
+    header and stats from the counters section. Nothing else is read from disk."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.count, self.next_id, self.completed, self.counters_length,
+         ids_offset, self.records_offset, self.heap_offset) = BINARY_HEADER.unpack_from(self.data)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            self.data.close()
+            raise ValueError(f"{path} is not a TaskTrackr binary file")
+        self.ids = BinaryIdTable(self.data, ids_offset, self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def counters(self):
+        """The TaskCounters saved with the tasks."""
+        return TaskCounters.from_dict(json.loads(self.data[len(self.data) - self.counters_length:]))
+
+    def text(self, offset, length):
+        start = self.heap_offset + offset
+        return self.data[start:start + length].decode("utf-8")
+
+    def task_at(self, index):
+        (task_id, completed, priority, due, title_at, title_length, extra_at, extra_length,
+         completed_on) = BINARY_RECORD.unpack_from(self.data, self.records_offset + index * BINARY_RECORD.size)
+        extra_priority, _, extra_due = self.text(extra_at, extra_length).partition("\0")
+        extra_due, _, recurring = extra_due.partition("\0")
+        recurring = json.loads(recurring) if recurring else {}
+        if due > 0:
+            due_date = date.fromordinal(due).isoformat()
+        else:
+            due_date = extra_due if due == -1 else NO_DUE_DATE
+        priority = PRIORITY_NAMES.get(priority, extra_priority)
+        completed_at = date.fromordinal(completed_on).isoformat() if completed_on else None
+        return Task(task_id, self.text(title_at, title_length), due_date, priority, bool(completed), completed_at,
+                    recurring.get("repeat"), recurring.get("exceptions"))
+
+    def find(self, task_id):
+        index = bisect.bisect_left(self.ids, task_id)
+        if index < self.count and self.ids[index] == task_id:
+            return self.task_at(index)
+        return None
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.task_at(index)
+
+
+# Sort keys for list --sort. Undated and unparseable due dates sort after real ones,
+# and priorities run High, Medium, Low, then custom ones.
+SORT_KEYS = {
+    "id": attrgetter("id"),
+    "due": lambda task: (task.due_ordinal is None, task.due_ordinal or 0, task.id),
+    "priority": lambda task: (priority_rank(task.priority), task.id),
+    "title": lambda task: (task.title.casefold(), task.id),
+}
+
+
+class CsvLine:
+    """File-like object whose write returns the line, so csv.writer can format one
+    row at a time for a generator."""
+    def write(self, line):
+        return line
+
+
+def format_tasks(tasks, output_format="text"):
+    """Yields the output lines for tasks, one task at a time."""
+    if output_format == "ndjson":
+        for task in tasks:
+            yield json.dumps(task.to_dict()) + "\n"
+    elif output_format == "csv":
+        writer = csv.writer(CsvLine(), lineterminator="\n")
+        yield writer.writerow(["id", "title", "due_date", "priority", "completed"])
+        for task in tasks:
+            yield writer.writerow([task.id, task.title, task.due_date, task.priority, task.completed])
+    elif output_format == "table":
+        yield f"{'ID':>7}  {'DONE':4}  {'DUE':10}  {'PRIORITY':8}  TITLE\n"
+        for task in tasks:
+            done = "yes" if task.completed else "no"
+            yield f"{task.id:>7}  {done:4}  {task.due_date:10}  {task.priority:8}  {task.title}\n"
+    else:
+        for task in tasks:
+            status = "✓" if task.completed else "✗"
+            repeats = f", Repeats: {task.repeat}" if task.repeat is not None else ""
+            yield f"[{task.id}] {status} {task.title} (Due: {task.due_date}, Priority: {task.priority}{repeats})\n"
+
+
+EXPORT_FIELDS = ["id", "title", "due_date", "priority", "completed", "completed_at", "repeat", "exceptions"]
+
+
+def format_export(tasks, output_format):
+    """Yields the lines of an export file: every stored field of each task, so it
+    can be imported again. In CSV the exceptions are one JSON column."""
+    if output_format != "csv":
+        yield from format_tasks(tasks, output_format)
+        return
+    writer = csv.writer(CsvLine(), lineterminator="\n")
+    yield writer.writerow(EXPORT_FIELDS)
+    for task in tasks:
+        yield writer.writerow([task.id, task.title, task.due_date, task.priority, task.completed,
+                               task.completed_at or "", task.repeat or "",
+                               json.dumps(task.exceptions) if task.exceptions else ""])
+
+
+def write_lines(lines, out=None, batch_size=1024):
+    """Writes lines in batches, so a long listing costs a few large writes instead
+    of one per task. Returns how many lines were written."""
+    out = out or sys.stdout
+    lines = iter(lines)
+    written = 0
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            return written
+        out.write("".join(batch))
+        written += len(batch)
+
+
+def file_format(path, file_format=None):
+    """The import/export format for path: as given, or else from its extension."""
+    return file_format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+
+
+def read_import_rows(f, input_format):
+    """Yields (line number, row) for an import file. CSV rows are parsed here into
+    dicts; NDJSON lines are passed on as text so the workers do the JSON parsing."""
+    if input_format == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, line
+
+
+FLAG_VALUES = {"true": True, "yes": True, "y": True, "1": True, "x": True,
+               "false": False, "no": False, "n": False, "0": False, "": False}
+
+
+EXCEPTION_FIELDS = {"title", "due_date", "priority", "completed", "completed_at"}
+
+
+def parse_import_row(row):
+    """Returns (title, due_date, priority, completed, completed_at, repeat, exceptions)
+    for one imported row, or raises ValueError saying what is wrong with it. Due dates
+    follow the same rules as the deadline prompt: a missing one is fine, an unparseable
+    one is not."""
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("not an object")
+    title = str(row.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+    due = row.get("due_date", row.get("due"))
+    due_date, ordinal = normalize_due_date(None if due is None else str(due))
+    if ordinal is None and due_date != NO_DUE_DATE:
+        raise ValueError(f"invalid due date: {due}")
+    priority = str(normalize_priority(str(row.get("priority") or "Medium")))
+    completed = row.get("completed")
+    if not isinstance(completed, bool):
+        completed = FLAG_VALUES.get(str(completed or "").strip().lower())
+        if completed is None:
+            raise ValueError(f"invalid completed value: {row.get('completed')}")
+    completed_at = row.get("completed_at") or None
+    if completed_at is not None:
+        completed_at = date.fromisoformat(str(completed_at)).isoformat()
+    repeat = str(row.get("repeat") or "").strip() or None
+    if repeat is not None:
+        parse_recurrence(repeat)
+        if ordinal is None:
+            raise ValueError(f"a recurring task needs a due date to count from, not {due_date}")
+    exceptions = row.get("exceptions") or None
+    if isinstance(exceptions, str):
+        # CSV files carry the exceptions as a JSON object in one column.
+        exceptions = json.loads(exceptions)
+    if exceptions is not None:
+        if repeat is None or not isinstance(exceptions, dict):
+            raise ValueError(f"invalid exceptions: {row.get('exceptions')}")
+        for on, fields in exceptions.items():
+            date.fromisoformat(on)
+            if not isinstance(fields, dict) or not set(fields) <= EXCEPTION_FIELDS:
+                raise ValueError(f"invalid exception for {on}: {fields}")
+    return title, due_date, priority, completed, completed_at if completed else None, repeat, exceptions
+
+
+def parse_import_chunk(chunk):
+    """Runs parse_import_row over [(line number, row)]. Returns (rows, errors), with
+    errors as (line number, message)."""
+    rows, errors = [], []
+    for number, row in chunk:
+        try:
+            rows.append(parse_import_row(row))
+        except ValueError as e:
+            errors.append((number, str(e)))
+    return rows, errors
+
+
+def map_chunks(function, items, workers=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Yields function(chunk) for consecutive chunks of items, in order. When there
+    is more than one chunk they run in worker processes, with at most two chunks per
+    worker in flight, so reading stays ahead without holding the whole file."""
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, chunk_rows)), [])
+    first = next(chunks, None)
+    if first is None:
+        return
+    workers = workers or os.cpu_count() or 1
+    if len(first) < chunk_rows or workers == 1:
+        yield function(first)
+        yield from map(function, chunks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = collections.deque()
+        for chunk in itertools.chain([first], chunks):
+            in_flight.append(pool.submit(function, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class TaskManager:
+    def __init__(self, storage=None):
+        # "json" rewrites tasks.json on every change, "journal" appends the change to
+        # tasks.journal and only rewrites tasks.json when the journal is compacted.
+        self.storage = storage or os.environ.get("TASKTRACKR_STORAGE", "json")
+        # Tasks are read lazily: read-only commands stream the file, and the full
+        # task list is only built once something needs to change it.
+        self.tasks_by_id = None
+        self.next_id = 1
+        # Set by batch(): records waiting to be written in one go.
+        self.pending = None
+        # Batch mode reports results itself instead of printing messages.
+        self.quiet = False
+        # Bumped on every change, so callers can tell whether their copy is stale.
+        self.version = 0
+        # Set by main() for --metrics.
+        self.metrics = None
+        # Ids whose entries in tasks.index need rewriting, while a write keeps it current.
+        self.index_changes = None
+        # Heap of urgency keys of pending tasks, built by the first next_tasks call on
+        # loaded tasks and then pushed to on every change. Entries go stale as tasks
+        # change and are dropped when next_tasks meets them.
+        self.next_heap = None
+        # TaskCounters for stats, read from tasks.json on load or counted when first
+        # needed, then kept current by index_task and unindex_task.
+        self.counters = None
+        # Open tasks.lock while this manager holds the lock.
+        self.lock_file = None
+        # Write count read from tasks.lock when the tasks were loaded. If it has moved
+        # on by the time we write, another process wrote in between.
+        self.disk_version = 0
+        # Auto-archive policy, applied whenever tasks.json is rewritten: completed
+        # tasks older than this many days, or beyond this many, go to the archive.
+        self.archive_days = int_from_env("TASKTRACKR_ARCHIVE_DAYS")
+        self.archive_keep = int_from_env("TASKTRACKR_ARCHIVE_KEEP")
+        # Journal mode: one of FSYNC_POLICIES, and the sequence number of the last
+        # journal record applied. tasks.json stores the number it was written at, so
+        # journal records it already contains are skipped.
+        self.fsync = os.environ.get("TASKTRACKR_FSYNC", "batch")
+        self.journal_seq = 0
+        self.snapshot_bytes = JOURNAL_SNAPSHOT_BYTES
+
+    def notify(self, message):
+        if not self.quiet:
+            print(message)
+
+    def ask(self, question):
+        # The daemon swaps this out to ask the question on the client's terminal.
+        return input(question)
+
+    def ensure_loaded(self):
+        if self.tasks_by_id is None:
+            self.load_tasks()
+
+    def rebuild_indexes(self):
+        # Dated tasks are kept sorted by due date as single ints, ordinal << 32 | id,
+        # which costs far less memory than (ordinal, id) tuples and sorts the same way.
+        # Recurring tasks stay out of the due-date index: their occurrences are
+        # generated for the dates asked about instead.
+        self.due_index = sorted(
+            task.due_ordinal << 32 | task.id
+            for task in self.tasks_by_id.values() if task.due_ordinal is not None and task.repeat is None
+        )
+        # Insertion-ordered dicts used as sets of ids.
+        self.undated_ids = {}
+        self.invalid_due_ids = {}
+        self.recurring_ids = {}
+        for task in self.tasks_by_id.values():
+            if task.repeat is not None:
+                self.recurring_ids[task.id] = None
+            elif task.due_ordinal is None:
+                self.undated_or_invalid(task)[task.id] = None
+        # Rebuilt only when next or stats asks for them, or a save needs them.
+        self.next_heap = None
+        self.counters = None
+
+    def undated_or_invalid(self, task):
+        return self.undated_ids if task.due_date == NO_DUE_DATE else self.invalid_due_ids
+
+    def index_task(self, task):
+        """Adds a task to the in-memory indexes. Call after adding or changing it."""
+        if task.repeat is not None:
+            self.recurring_ids[task.id] = None
+        elif task.due_ordinal is not None:
+            bisect.insort(self.due_index, task.due_ordinal << 32 | task.id)
+        else:
+            self.undated_or_invalid(task)[task.id] = None
+        if self.next_heap is not None and not task.completed and task.repeat is None:
+            heapq.heappush(self.next_heap, urgency(task))
+        if self.counters is not None:
+            self.counters.add(task)
+
+    def unindex_task(self, task):
+        """Removes a task from the in-memory indexes. Call before deleting or changing it."""
+        if task.repeat is not None:
+            self.recurring_ids.pop(task.id, None)
+        elif task.due_ordinal is not None:
+            key = task.due_ordinal << 32 | task.id
+            position = bisect.bisect_left(self.due_index, key)
+            if position < len(self.due_index) and self.due_index[position] == key:
+                del self.due_index[position]
+        else:
+            self.undated_or_invalid(task).pop(task.id, None)
+        if self.counters is not None:
+            self.counters.remove(task)
+
+    @property
+    def tasks(self):
+        self.ensure_loaded()
+        return list(self.tasks_by_id.values())
+
+    @tasks.setter
+    def tasks(self, tasks):
+        self.tasks_by_id = {task.id: task for task in tasks}
+        self.next_id = max(self.next_id, max(self.tasks_by_id, default=0) + 1)
+        self.rebuild_indexes()
+
+    @contextlib.contextmanager
+    def locked(self, exclusive=True):
+        """Holds the advisory lock on tasks.lock: shared while reading the task files,
+        exclusive while writing them. Re-entering while it is held is a no-op."""
+        if self.lock_file is not None:
+            yield
+            return
+        f = self.lock_file = open_lock_file(exclusive)
+        try:
+            yield
+        finally:
+            self.lock_file = None
+            f.close()
+
+    def read_disk_version(self):
+        return read_lock_counter(self.lock_file)
+
+    def bump_disk_version(self):
+        self.disk_version = self.read_disk_version() + 1
+        self.lock_file.truncate(0)
+        self.lock_file.write(str(self.disk_version))
+        self.lock_file.flush()
+
+    @measured("load_tasks")
+    def load_tasks(self):
+        with self.locked(exclusive=False):
+            self.disk_version = self.read_disk_version()
+            # tasks_by_id keeps insertion order, so it doubles as the ordered task list.
+            self.tasks_by_id = {}
+            self.next_id = 1
+            self.journal_seq = 0
+            if os.path.exists(TASKS_FILE):
+                tasks, self.next_id = read_tasks_file(TASKS_FILE)
+                self.tasks = tasks
+                self.journal_seq = read_snapshot_header(TASKS_FILE).get("journal_seq", 0)
+            if os.path.exists(JOURNAL_FILE):
+                self.replay_journal()
+            self.rebuild_indexes()
+            # Picked up before any change, so that changes keep them current. The saved
+            # counters only match tasks.json as it is without a journal on top.
+            if os.path.exists(TASKS_FILE) and not os.path.exists(JOURNAL_FILE):
+                self.counters = read_snapshot_counters(TASKS_FILE)
+        return self.tasks
+
+    def rebase(self, records):
+        """Reloads what other processes wrote since our load and re-applies our own
+        unwritten changes on top. Must be called holding the exclusive lock.
+
+        Added tasks whose ids were taken meanwhile get new ones; the records are
+        updated to match, so they can still be written to the journal."""
+        ours = self.tasks_by_id
+        self.load_tasks()
+        renumbered = {}
+        for record in records:
+            if record["op"] == "add":
+                old_id = record["task"]["id"]
+                task = ours.get(old_id) or Task.from_dict(record["task"])
+                if old_id < self.next_id:
+                    task.id = record["task"]["id"] = renumbered[old_id] = self.next_id
+                self.tasks_by_id[task.id] = task
+                self.next_id = task.id + 1
+            else:
+                record["id"] = renumbered.get(record["id"], record["id"])
+                self.apply_record(record)
+        self.rebuild_indexes()
+        self.version += 1
+
+    @measured("save_tasks")
+    def save_tasks(self):
+        self.ensure_loaded()
+        if self.archive_days is not None or self.archive_keep is not None:
+            self.archive_expired()
+        replace_file(TASKS_FILE, lambda f: write_tasks_snapshot(
+            f, self.tasks_by_id.values(), self.next_id, self.journal_seq, self.task_counters()))
+        # The snapshot now contains every journaled change and every held-back one.
+        # Should we die before the journal is gone, its records are skipped by seq.
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+        if self.pending:
+            self.pending.clear()
+
+    def replay_journal(self):
+        """Applies the journal records newer than the snapshot."""
+        snapshot_seq = self.journal_seq
+        with open(JOURNAL_FILE, 'rb+') as f:
+            good_end = 0
+            for seq, record, good_end in iter_journal(f):
+                if seq > snapshot_seq:
+                    self.apply_record(record)
+                    self.journal_seq = max(self.journal_seq, seq)
+            if good_end < os.fstat(f.fileno()).st_size:
+                # A torn or damaged line means the process died mid-append. Cut it,
+                # and anything after it, off so the next append starts on a clean line.
+                f.truncate(good_end)
+
+    def apply_record(self, record):
+        by_id = self.tasks_by_id
+        if record["op"] == "add":
+            task = Task.from_dict(record["task"])
+            by_id[task.id] = task
+            self.next_id = max(self.next_id, task.id + 1)
+        elif record["op"] == "update" and record["id"] in by_id:
+            task = by_id[record["id"]]
+            for field, value in record["fields"].items():
+                setattr(task, field, value)
+        elif record["op"] == "delete":
+            by_id.pop(record["id"], None)
+
+    @measured("save_tasks")
+    def append_journal(self, records):
+        with open(JOURNAL_FILE, 'ab') as f:
+            if self.fsync == "always":
+                for record in records:
+                    self.journal_seq += 1
+                    f.write(journal_line(self.journal_seq, record))
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                lines = []
+                for record in records:
+                    self.journal_seq += 1
+                    lines.append(journal_line(self.journal_seq, record))
+                f.write(b"".join(lines))
+                if self.fsync == "batch":
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    @staticmethod
+    def files_stamp():
+        """Size and modification time of tasks.json and the journal. tasks.index is
+        only trusted while these match what they were when it was written."""
+        stamp = []
+        for path in (TASKS_FILE, JOURNAL_FILE):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stamp += [stat.st_mtime_ns, stat.st_size]
+            else:
+                stamp += [None, None]
+        return stamp
+
+    @contextlib.contextmanager
+    def updating_search_index(self, records):
+        """Keeps tasks.index current through a write of the task files, rewriting only
+        the tasks the records (or auto-archiving) touched. An index that was stale
+        already is left for the next search to rebuild. Call holding the exclusive lock."""
+        index = SearchIndex.open_current(self.files_stamp())
+        if index is None:
+            yield
+            return
+        self.index_changes = {record["task"]["id"] if record["op"] == "add" else record["id"] for record in records}
+        try:
+            yield
+            index.update({task_id: self.find_task(task_id) for task_id in self.index_changes}, self.files_stamp())
+        finally:
+            self.index_changes = None
+            index.close()
+
+    def commit(self, record):
+        self.version += 1
+        if self.pending is not None:
+            self.pending.append(record)
+        else:
+            self.flush([record])
+
+    def flush(self, records):
+        if not records:
+            return
+        with self.locked():
+            if self.read_disk_version() != self.disk_version:
+                self.rebase(records)
+            with self.updating_search_index(records):
+                if self.storage == "journal":
+                    self.append_journal(records)
+                    if os.path.getsize(JOURNAL_FILE) > self.snapshot_bytes:
+                        # Keeps recovery short: the next load replays at most this much.
+                        self.save_tasks()
+                else:
+                    self.save_tasks()
+            self.bump_disk_version()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Holds back every change made inside the block and writes them all at once
+        when it ends. If the block raises, nothing is written and the in-memory state
+        is thrown away so it is re-read from disk.
+
+        Inside an outer deferral (the daemon), earlier changes are written first so a
+        rollback cannot lose them, and the batch's own changes are handed back to it."""
+        outer = self.pending
+        if outer:
+            self.flush(outer)
+        self.pending = []
+        try:
+            yield
+        except BaseException:
+            self.discard_pending()
+            if outer is not None:
+                self.pending = []
+            raise
+        records = self.pending
+        if outer is not None:
+            self.pending = records
+        else:
+            self.pending = None
+            self.flush(records)
+
+    def discard_pending(self):
+        self.pending = None
+        self.tasks_by_id = None
+        self.next_id = 1
+
+    def reload_if_changed(self):
+        """For long-running readers: drops the tasks read so far if another process
+        has written since, so they are read again on next use. Returns the disk
+        version, which changes with every write."""
+        with self.locked(exclusive=False):
+            disk_version = self.read_disk_version()
+        if disk_version != self.disk_version and not self.pending:
+            pending = self.pending
+            self.discard_pending()
+            # An open deferral with nothing held back yet (the daemon) carries on.
+            self.pending = pending
+        return disk_version
+
+    def compact_tasks(self):
+        self.ensure_loaded()
+        with self.locked():
+            if self.read_disk_version() != self.disk_version:
+                self.rebase([])
+            with self.updating_search_index([]):
+                self.save_tasks()
+            self.bump_disk_version()
+        print(f"🗜️ Compacted {len(self.tasks_by_id)} tasks into {TASKS_FILE}")
+
+    def generate_task_id(self):
+        # Ids are never reused, even after the newest task is deleted.
+        self.ensure_loaded()
+        task_id = self.next_id
+        self.next_id += 1
+        return task_id
+
+    @staticmethod
+    def new_task(task_id, title, due_date, priority, repeat=None):
+        """The Task for an add. Raises ValueError for a bad recurrence rule, or a
+        recurring task without a due date to count from."""
+        task = Task(task_id, title, due_date, priority, repeat=repeat)
+        if task.repeat is not None and task.due_ordinal is None:
+            raise ValueError(f"a recurring task needs a due date to count from, not {due_date}")
+        return task
+
+    def add_task(self, title, due_date, priority, repeat=None):
+        task = self.new_task(None, title, due_date, priority, repeat)
+        task.id = task_id = self.generate_task_id()
+        self.tasks_by_id[task_id] = task
+        self.index_task(task)
+        self.commit({"op": "add", "task": task.to_dict()})
+        self.notify(f"✅ Task added: {title}")
+        return task
+
+    def add_tasks(self, rows):
+        """Adds a task for each (title, due_date, priority, completed, completed_at,
+        repeat, exceptions) row as one batch: ids are handed out in a block, the indexes
+        are rebuilt once instead of per task, and everything is written in one go."""
+        added = []
+        with self.batch():
+            for row in rows:
+                task = Task(self.generate_task_id(), *row)
+                added.append(task)
+                self.commit({"op": "add", "task": task.to_dict()})
+            if self.tasks_by_id is not None:
+                self.tasks_by_id.update((task.id, task) for task in added)
+                self.rebuild_indexes()
+        return added
+
+    def import_tasks(self, path, input_format=None, workers=None):
+        """Adds the tasks in a CSV or NDJSON file. Rows are checked in worker
+        processes; bad rows are skipped and reported, the rest are added with
+        add_tasks. Ids in the file are not kept: tasks get the next free ids."""
+        input_format = file_format(path, input_format)
+        errors = []
+        skipped = 0
+
+        def valid_rows(f):
+            nonlocal skipped
+            for rows, chunk_errors in map_chunks(parse_import_chunk, read_import_rows(f, input_format), workers):
+                skipped += len(chunk_errors)
+                errors.extend(chunk_errors[:10 - len(errors)])
+                yield from rows
+
+        with open(path, 'r', newline="", encoding="utf-8") as f:
+            added = self.add_tasks(valid_rows(f))
+        for number, message in errors:
+            print(f"⚠️ Line {number}: {message}", file=sys.stderr)
+        if skipped:
+            print(f"⚠️ Skipped {skipped} invalid rows", file=sys.stderr)
+        print(f"📥 Imported {len(added)} tasks from {path}")
+        return added
+
+    def export_tasks(self, path, output_format=None, status_filter=None, include_archive=False):
+        """Writes tasks to a CSV or NDJSON file, one task at a time. Recurring tasks
+        are written as their rule and exceptions, not expanded, so importing the file
+        gives back the same tasks."""
+        output_format = file_format(path, output_format)
+        tasks = self.iter_tasks(status_filter)
+        if include_archive and status_filter != "pending":
+            tasks = self.with_archive(tasks)
+        written = []
+        replace_file(path, lambda f: written.append(write_lines(format_export(tasks, output_format), f)))
+        count = written[0] - (output_format == "csv")
+        print(f"📤 Exported {count} tasks to {path}")
+        return count
+
+    def find_task(self, task_id):
+        self.ensure_loaded()
+        return self.tasks_by_id.get(task_id)
+
+    def stream_tasks(self):
+        """Yields every task without building the task list, folding in the journal."""
+        changes = {}
+        if os.path.exists(JOURNAL_FILE):
+            snapshot_seq = read_snapshot_header(TASKS_FILE).get("journal_seq", 0) if os.path.exists(TASKS_FILE) else 0
+            changes = self.read_journal_changes(snapshot_seq)
+        if os.path.exists(TASKS_FILE):
+            for task in iter_tasks_file(TASKS_FILE):
+                change = changes.pop(task.id, None)
+                if change is None:
+                    yield task
+                elif isinstance(change, Task):
+                    yield change
+                elif change != "deleted":
+                    for field, value in change.items():
+                        setattr(task, field, value)
+                    yield task
+        for change in changes.values():
+            if isinstance(change, Task):
+                yield change
+
+    def read_journal_changes(self, snapshot_seq=0):
+        """Folds the journal records newer than snapshot_seq into {id: Task added,
+        field updates dict or "deleted"}."""
+        changes = {}
+        with open(JOURNAL_FILE, 'rb') as f:
+            for seq, record, _ in iter_journal(f):
+                if seq <= snapshot_seq:
+                    continue
+                if record["op"] == "add":
+                    changes[record["task"]["id"]] = Task.from_dict(record["task"])
+                elif record["op"] == "delete":
+                    changes[record["id"]] = "deleted"
+                elif record["op"] == "update":
+                    change = changes.setdefault(record["id"], {})
+                    if isinstance(change, Task):
+                        for field, value in record["fields"].items():
+                            setattr(change, field, value)
+                    elif isinstance(change, dict):
+                        change.update(record["fields"])
+        return changes
+
+    def iter_tasks(self, status_filter=None):
+        if self.tasks_by_id is not None:
+            tasks = self.tasks_by_id.values()
+        elif self.metrics is not None:
+            # Streaming interleaves reading with the command, so time the reads alone.
+            tasks = self.metrics.timed_iter("load_tasks", self.stream_tasks())
+        else:
+            tasks = self.stream_tasks()
+        for task in tasks:
+            if status_filter == "pending" and task.completed:
+                continue
+            if status_filter == "completed" and not task.completed:
+                continue
+            yield task
+
+    @staticmethod
+    def expand_recurring(tasks, status_filter, start, end):
+        """Yields tasks with each recurring task replaced by its occurrences due
+        between the start and end date ordinals, keeping those with status_filter."""
+        for task in tasks:
+            for task in task.occurrences(start, end) if task.repeat is not None else (task,):
+                if status_filter is None or task.completed == (status_filter == "completed"):
+                    yield task
+
+    def page_tasks(self, status_filter=None, after_id=None, sort="id", reverse=False, offset=0, limit=None,
+                   include_archive=False, window=(None, None)):
+        """Yields one page of tasks. Filtering, skipping and the limit are chained
+        generators, so the first task comes out as soon as it is read. Sorting by
+        anything but id has to see every task first, but with a limit it only keeps
+        the best offset + limit of them. Archived tasks, when included, come after
+        the active ones. Recurring tasks are listed as their occurrences due within
+        window, (first, last) due dates defaulting to recurrence_window()'s."""
+        # A pending recurring task can have completed occurrences, so it is read
+        # whatever the filter and its occurrences filtered instead.
+        tasks = self.iter_tasks("pending" if status_filter == "pending" else None)
+        tasks = self.expand_recurring(tasks, status_filter, *recurrence_window(*window))
+        if include_archive and status_filter != "pending":
+            tasks = self.with_archive(tasks)
+        if after_id is not None:
+            tasks = (task for task in tasks if task.id > after_id)
+        if sort != "id" or reverse:
+            key = SORT_KEYS[sort]
+            if limit is not None:
+                tasks = (heapq.nlargest if reverse else heapq.nsmallest)(offset + limit, tasks, key=key)
+            else:
+                tasks = sorted(tasks, key=key, reverse=reverse)
+        return itertools.islice(tasks, offset, None if limit is None else offset + limit)
+
+    def list_tasks(self, status_filter=None, limit=None, offset=0, after_id=None, sort="id", reverse=False,
+                   output_format="text", out=None, include_archive=False, window=(None, None)):
+        tasks = self.page_tasks(status_filter, after_id, sort, reverse, offset, limit, include_archive, window)
+        self.print_tasks(tasks, output_format, out)
+
+    @staticmethod
+    def with_archive(tasks):
+        """Yields tasks, then the archived tasks. An archive run that died before the
+        tasks left the active file archived them twice; those copies are skipped."""
+        seen = set()
+        for task in tasks:
+            seen.add(task.id)
+            yield task
+        for task in iter_archive():
+            if task.id not in seen:
+                yield task
+
+    def archivable(self, days=None, keep=None):
+        """Completed tasks due for the archive, longest completed first: those
+        completed at least days ago, and all but the keep most recently completed.
+        With neither, every completed task. Tasks completed before completion dates
+        were recorded count as the oldest."""
+        completed = sorted(self.iter_tasks("completed"), key=lambda task: (task.completed_at or "", task.id))
+        if days is None and keep is None:
+            return completed
+        excess = len(completed) - keep if keep is not None else 0
+        cutoff = date.fromordinal(date.today().toordinal() - days).isoformat() if days is not None else ""
+        return [
+            task for position, task in enumerate(completed)
+            if position < excess or (days is not None and (task.completed_at or "") <= cutoff)
+        ]
+
+    def archive_tasks(self, days=None, keep=None):
+        """Moves completed tasks out of the task files into the compressed archive.
+        The archive is written and synced before the tasks are deleted, so a crash
+        in between leaves a task in both places rather than in neither."""
+        with self.locked():
+            if self.tasks_by_id is not None and self.read_disk_version() != self.disk_version:
+                self.rebase([])
+            tasks = self.archivable(days, keep)
+            if tasks:
+                append_archive(tasks)
+                with self.batch():
+                    for task in tasks:
+                        self.delete_task(task.id)
+        self.notify(f"📦 Archived {len(tasks)} completed tasks to {ARCHIVE_FILE}")
+        return tasks
+
+    def archive_expired(self):
+        """Applies the auto-archive policy to the loaded tasks. Runs while tasks.json
+        is being rewritten, so the tasks are dropped from memory without change records."""
+        tasks = self.archivable(self.archive_days, self.archive_keep)
+        if not tasks:
+            return
+        with self.locked():
+            append_archive(tasks)
+        for task in tasks:
+            self.unindex_task(self.tasks_by_id.pop(task.id))
+        if self.index_changes is not None:
+            self.index_changes.update(task.id for task in tasks)
+        self.version += 1
+
+    def print_tasks(self, tasks, output_format="text", out=None):
+        written = write_lines(format_tasks(tasks, output_format), out)
+        if not written and output_format == "text":
+            print("No tasks found.", file=out)
+
+    def lookup_task(self, task_id):
+        """Finds a task to show, without loading the task list. Use find_task for a
+        task that is about to be changed."""
+        if self.tasks_by_id is not None:
+            return self.tasks_by_id.get(task_id)
+        return next((task for task in self.iter_tasks() if task.id == task_id), None)
+
+    def count_tasks(self):
+        counts = {"pending": 0, "completed": 0}
+        for task in self.iter_tasks():
+            counts["completed" if task.completed else "pending"] += 1
+        return counts
+
+    def task_counters(self):
+        """The TaskCounters of the loaded tasks, counting them if nothing has yet."""
+        if self.counters is None:
+            self.counters = TaskCounters.of(self.tasks_by_id.values())
+        return self.counters
+
+    def stats(self):
+        """Totals by status, priority and due bucket (pending tasks only) and the
+        completion rate, from TaskCounters. Unless the tasks are loaded already they
+        come from the end of tasks.json, so no task is read; a journal not yet folded
+        into tasks.json, or a file saved without counters, means loading after all."""
+        if self.tasks_by_id is None and os.path.exists(TASKS_FILE) and not os.path.exists(JOURNAL_FILE):
+            with self.locked(exclusive=False):
+                counters = read_snapshot_counters(TASKS_FILE)
+            if counters is not None:
+                return counters.report()
+        self.ensure_loaded()
+        return self.task_counters().report()
 
-TASKS_FILE = 'tasks.json'
+    def next_tasks(self, k=10):
+        """Returns the k most urgent pending tasks, by urgency(). Streamed tasks go
+        through heapq.nsmallest, which keeps only k of them; loaded tasks use
+        next_heap, so a daemon answers in O(k log n) no matter how many tasks exist.
+        Recurring tasks take part through their pending occurrences within
+        recurrence_window()."""
+        start, end = recurrence_window()
+        if self.tasks_by_id is None:
+            return heapq.nsmallest(k, self.expand_recurring(self.iter_tasks("pending"), "pending", start, end),
+                                   key=urgency)
+        by_id = self.tasks_by_id
+        if self.next_heap is None or len(self.next_heap) > 2 * len(by_id) + 64:
+            self.next_heap = [urgency(task) for task in by_id.values() if not task.completed and task.repeat is None]
+            heapq.heapify(self.next_heap)
+        heap = self.next_heap
+        found, kept = [], []
+        while heap and len(found) < k:
+            key = heapq.heappop(heap)
+            task = by_id.get(key[-1])
+            # Drop entries for tasks that are gone, done or changed since, and the
+            # duplicates left when a task was re-indexed without changing.
+            if (task is None or task.completed or task.repeat is not None or urgency(task) != key
+                    or (kept and kept[-1] == key)):
+                continue
+            found.append(task)
+            kept.append(key)
+        for key in kept:
+            heapq.heappush(heap, key)
+        if self.recurring_ids:
+            occurrences = self.expand_recurring((by_id[task_id] for task_id in self.recurring_ids), "pending",
+                                                start, end)
+            found = heapq.nsmallest(k, itertools.chain(found, occurrences), key=urgency)
+        return found
 
-class Task:
-    def __init__(self, task_id, title, due_date, priority, completed=False):
-        self.id = task_id
-        self.title = title
-        self.due_date = due_date
-        self.priority = priority
-        self.completed = completed
+    def search(self, query):
+        """Yields the tasks whose titles contain every word of query, in id order. A
+        word ending in * matches any word that starts with it. The answer comes from
+        tasks.index, which is rebuilt first if the task files changed behind its back."""
+        terms = search_terms(query)
+        if not terms:
+            return
+        with self.locked(exclusive=False):
+            self.reload_if_changed()
+            if self.pending:
+                # Changes held back by a batch or the daemon are not in the index yet.
+                found = [task for task in self.iter_tasks() if title_matches(task.title, terms)]
+            else:
+                stamp = self.files_stamp()
+                index = SearchIndex()
+                try:
+                    if index.stamp() != stamp:
+                        # No writer can change the files while the shared lock is held.
+                        index.rebuild(self.iter_tasks(), stamp)
+                    rows = index.query(terms)
+                finally:
+                    index.close()
+                if self.tasks_by_id is not None:
+                    found = [self.tasks_by_id[task_id] for task_id, _ in rows]
+                else:
+                    found = [Task.from_dict(json.loads(data)) for _, data in rows]
+        yield from found
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "title": self.title,
-            "due_date": self.due_date,
-            "priority": self.priority,
-            "completed": self.completed
-        }
+    def search_tasks(self, query, status_filter=None, limit=None, output_format="text"):
+        tasks = (
+            task for task in self.search(query)
+            if status_filter is None or task.completed == (status_filter == "completed")
+        )
+        self.print_tasks(itertools.islice(tasks, limit), output_format)
+
+    def complete_task(self, task_id, on=None):
+        """Marks a task done. For a recurring task this completes one occurrence,
+        the one due on `on` or else the earliest pending one in recurrence_window(),
+        and returns it."""
+        task = self.find_task(task_id)
+        if task is None:
+            self.notify("Task not found.")
+            return None
+        if task.repeat is not None:
+            occurrence = self.find_occurrence(task, on)
+            if occurrence is None:
+                self.notify("No pending occurrence found." if on is None else f"'{task.title}' is not due on {on}.")
+                return None
+            return self.update_occurrence(task, occurrence,
+                                          {"completed": True, "completed_at": date.today().isoformat()})
+        self.unindex_task(task)
+        if not task.completed:
+            task.completed_at = date.today().isoformat()
+        task.completed = True
+        self.index_task(task)
+        self.commit({"op": "update", "id": task_id, "fields": {"completed": True, "completed_at": task.completed_at}})
+        return task
+
+    def delete_task(self, task_id):
+        self.ensure_loaded()
+        task = self.tasks_by_id.pop(task_id, None)
+        if task is None:
+            self.notify("Task not found.")
+            return None
+        self.unindex_task(task)
+        self.commit({"op": "delete", "id": task_id})
+        return task
+
+    def update_task(self, task_id, title=None, due_date=None, priority=None, on=None):
+        """Changes a task's fields. With `on`, changes only the occurrence of a
+        recurring task due that day, and returns the occurrence."""
+        task = self.find_task(task_id)
+        if task is None:
+            self.notify("Task not found.")
+            return None
+        if on is not None:
+            occurrence = self.find_occurrence(task, on)
+            if occurrence is None:
+                self.notify(f"'{task.title}' is not due on {on}.")
+                return None
+            fields = {}
+            if title:
+                fields["title"] = title
+            if due_date:
+                fields["due_date"] = normalize_due_date(due_date)[0]
+            if priority:
+                fields["priority"] = normalize_priority(priority)
+            return self.update_occurrence(task, occurrence, fields)
+        fields = {}
+        self.unindex_task(task)
+        if title:
+            task.title = fields["title"] = title
+        if due_date:
+            task.due_date = due_date
+            fields["due_date"] = task.due_date
+        if priority:
+            task.priority = priority
+            fields["priority"] = task.priority
+        self.index_task(task)
+        self.commit({"op": "update", "id": task_id, "fields": fields})
+        return task
 
     @staticmethod
-    def from_dict(data):
-        return Task(
-            data['id'],
-            data['title'],
-            data['due_date'],
-            data['priority'],
-            data['completed']
-        )
+    def find_occurrence(task, on=None):
+        """The occurrence of a recurring task due on the date `on`, or with no date
+        the earliest pending one within recurrence_window(). None if there is none."""
+        if task.repeat is None:
+            return None
+        if on is None:
+            return next((occurrence for occurrence in task.occurrences(*recurrence_window())
+                         if not occurrence.completed), None)
+        ordinal = normalize_due_date(on)[1]
+        return next(task.occurrences(ordinal, ordinal), None) if ordinal is not None else None
 
-class TaskManager:
-    def __init__(self):
-        self.tasks = self.load_tasks()
+    def update_occurrence(self, task, occurrence, fields):
+        """Records fields as an exception for one occurrence of a recurring task;
+        only the exceptions are stored, never the occurrences themselves."""
+        exceptions = dict(task.exceptions or {})
+        # Keyed by the date the rule gives the occurrence, even if it has been moved.
+        exceptions[occurrence.due_date] = {**exceptions.get(occurrence.due_date, {}), **fields}
+        for field, value in fields.items():
+            setattr(occurrence, field, value)
+        task.exceptions = exceptions
+        self.commit({"op": "update", "id": task.id, "fields": {"exceptions": exceptions}})
+        return occurrence
+
+    @staticmethod
+    def due_category(task, today_ordinal, end_of_week):
+        if task.due_ordinal is None:
+            return 'No Due Date' if task.due_date == NO_DUE_DATE else 'Invalid Dates'
+        if task.due_ordinal < today_ordinal:
+            return 'Overdue'
+        if task.due_ordinal == today_ordinal:
+            return 'Due Today'
+        if task.due_ordinal <= end_of_week:
+            return 'Due This Week'
+        return 'Due Later'
+
+    def organize_tasks(self):
+        categorized_tasks = {category: [] for category in DUE_CATEGORIES}
+
+        today = date.today()
+        today_ordinal = today.toordinal()
+        end_of_week = today_ordinal + (6 - today.weekday())
+
+        if self.tasks_by_id is not None:
+            # Each dated bucket is a slice of the sorted due-date index, so only the
+            # boundary dates are looked up; no task's date is parsed or compared.
+            by_id = self.tasks_by_id
+            index = self.due_index
+            today_start = bisect.bisect_left(index, today_ordinal << 32)
+            today_end = bisect.bisect_left(index, (today_ordinal + 1) << 32)
+            week_end = bisect.bisect_left(index, (end_of_week + 1) << 32)
+            mask = (1 << 32) - 1
+            for category, keys in (('Overdue', index[:today_start]),
+                                   ('Due Today', index[today_start:today_end]),
+                                   ('Due This Week', index[today_end:week_end]),
+                                   ('Due Later', index[week_end:])):
+                categorized_tasks[category] = [by_id[key & mask] for key in keys]
+            categorized_tasks['No Due Date'] = [by_id[task_id] for task_id in self.undated_ids]
+            categorized_tasks['Invalid Dates'] = [by_id[task_id] for task_id in self.invalid_due_ids]
+            if self.recurring_ids:
+                # Occurrences are merged into their buckets, which stay in due order.
+                touched = set()
+                occurrences = self.expand_recurring((by_id[task_id] for task_id in self.recurring_ids), None,
+                                                    *recurrence_window())
+                for task in occurrences:
+                    category = self.due_category(task, today_ordinal, end_of_week)
+                    categorized_tasks[category].append(task)
+                    touched.add(category)
+                for category in touched:
+                    categorized_tasks[category].sort(key=SORT_KEYS["due"])
+            return categorized_tasks
+
+        for task in self.expand_recurring(self.iter_tasks(), None, *recurrence_window()):
+            categorized_tasks[self.due_category(task, today_ordinal, end_of_week)].append(task)
+
+        return categorized_tasks
+
+    def progress_tracker(self, task_id):
+        task = self.find_task(task_id)
+        if task is None:
+            print("Task not found.")
+            return
+        response = self.ask(f"Have you finished '{task.title}'? Yes/No: ").strip().lower()
+        self.unindex_task(task)
+        if response == "yes":
+            if not task.completed:
+                task.completed_at = date.today().isoformat()
+            task.completed = True
+        elif response == "no":
+            task.completed = False
+            task.completed_at = None
+        self.index_task(task)
+        self.commit({"op": "update", "id": task_id,
+                     "fields": {"completed": task.completed, "completed_at": task.completed_at}})
+
+    def deadline_manager(self, task_id):
+        task = self.find_task(task_id)
+        if task is not None:
+            deadline_prompt = self.ask(f"When is '{task.title}' due? (MM/DD/YYYY, MM-DD-YYYY or YYYY-MM-DD): ")
+            due_date, ordinal = normalize_due_date(deadline_prompt)
+            if ordinal is not None:
+                self.unindex_task(task)
+                task.due_date = due_date
+                self.index_task(task)
+                self.commit({"op": "update", "id": task_id, "fields": {"due_date": task.due_date}})
+                return
+        print("❌ Invalid input or task not found.")
+
+
+def read_json_source(path):
+    """Returns (tasks, next_id) from a tasks.json file for import-json, or None if
+    there is no such file."""
+    if path == TASKS_FILE:
+        # Goes through TaskManager so an uncompacted journal is included.
+        source = TaskManager(storage="json")
+        return source.tasks, source.next_id
+    if os.path.exists(path):
+        return read_tasks_file(path)
+    return None
+
+
+class SqliteTaskManager(TaskManager):
+    """TaskManager backed by tasks.db. Lookups by id, status and due date hit SQLite
+    indexes instead of loading every task into memory."""
+
+    COLUMNS = "id, title, due_date, priority, completed, completed_at, repeat, exceptions"
+
+    def __init__(self, db_file=None, check_same_thread=True):
+        # next_id is the highest id handed out by this manager that may not be in the
+        # database yet. tasks_by_id stays None: read-only queries go through iter_tasks.
+        super().__init__(storage="sqlite")
+        # SQLite does its own locking; writers wait up to LOCK_TIMEOUT for each other.
+        self.conn = sqlite3.connect(db_file or DB_FILE, timeout=LOCK_TIMEOUT, check_same_thread=check_same_thread)
+        with self.conn:
+            # Set up under the write lock, so two processes opening a new database
+            # take turns creating it. A recurring task's exceptions are a JSON object.
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "id INTEGER PRIMARY KEY, title TEXT NOT NULL, due_date TEXT, "
+                "priority TEXT, completed INTEGER NOT NULL DEFAULT 0, completed_at TEXT, repeat TEXT, exceptions TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_repeat ON tasks (repeat) WHERE repeat IS NOT NULL")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (due_date)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            create_search_words(self.conn)
+
+    @property
+    def tasks(self):
+        # Materializes every row; mutate tasks through the manager methods instead.
+        return self.load_tasks()
+
+    def ensure_loaded(self):
+        # Rows are read on demand; there is nothing to load up front.
+        pass
+
+    def rebuild_indexes(self):
+        pass
+
+    def index_task(self, task):
+        # SQLite maintains its own indexes.
+        pass
+
+    def unindex_task(self, task):
+        pass
+
+    @staticmethod
+    def row_to_task(row):
+        return Task(row[0], row[1], row[2], row[3], bool(row[4]), row[5], row[6],
+                    json.loads(row[7]) if row[7] else None)
+
+    @staticmethod
+    def column_value(value):
+        return json.dumps(value) if isinstance(value, dict) else value
 
     def load_tasks(self):
-        if not os.path.exists(TASKS_FILE):
-            return []
-        with open(TASKS_FILE, 'r') as f:
-            data = json.load(f)
-            return [Task.from_dict(d) for d in data]
+        return list(self.iter_tasks())
 
+    @measured("save_tasks")
     def save_tasks(self):
-        with open(TASKS_FILE, 'w') as f:
-            json.dump([t.to_dict() for t in self.tasks], f, indent=4)
+        self.conn.commit()
 
-    def generate_task_id(self):
-        if not self.tasks:
-            return 1
-        else:
-            return max(task.id for task in self.tasks) + 1
-    
-    def add_task(self, title, due_date, priority):
-        task_id = self.generate_task_id()
-        task = Task(task_id, title, due_date, priority)
-        self.tasks.append(task)
+    def compact_tasks(self):
+        self.conn.execute("VACUUM")
+        print(f"🗜️ Compacted {DB_FILE}")
+
+    def import_json(self, path=None):
+        path = path or TASKS_FILE
+        source = read_json_source(path)
+        if source is None:
+            print(f"⚠️ File not found: {path}")
+            return
+        tasks, next_id = source
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO tasks ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(t.id, t.title, t.due_date, t.priority, int(t.completed), t.completed_at,
+                  str(t.repeat) if t.repeat else None, self.column_value(t.exceptions)) for t in tasks],
+            )
+            for t in tasks:
+                index_title(self.conn, t.id, t.title)
+            self.set_next_id(max(next_id, self.peek_next_id()))
+            # Imported rows may replace existing ones, so the counters are redone once.
+            self.recount()
+        print(f"📥 Imported {len(tasks)} tasks from {path} into {DB_FILE}")
+
+    def commit(self, record):
+        # Statements run straight away so later reads in the same batch see them; the
+        # transaction is committed now, or when the batch ends.
+        self.version += 1
+        if record["op"] == "add":
+            task = record["task"]
+            self.conn.execute(
+                f"INSERT INTO tasks ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (task["id"], task["title"], task["due_date"], task["priority"], int(task["completed"]),
+                 task.get("completed_at"), task.get("repeat"), self.column_value(task.get("exceptions"))),
+            )
+            self.set_next_id(max(task["id"] + 1, self.peek_next_id()))
+            index_title(self.conn, task["id"], task["title"])
+            self.count(Task.from_dict(task), 1)
+        elif record["op"] == "update" and record["fields"]:
+            old = self.find_task(record["id"])
+            # Field names come from our own update records, never from user input.
+            columns = ", ".join(f"{field} = ?" for field in record["fields"])
+            self.conn.execute(
+                f"UPDATE tasks SET {columns} WHERE id = ?",
+                (*map(self.column_value, record["fields"].values()), record["id"]),
+            )
+            if "title" in record["fields"]:
+                index_title(self.conn, record["id"], record["fields"]["title"])
+            if old is not None:
+                self.count(old, -1)
+                self.count(self.find_task(record["id"]), 1)
+        elif record["op"] == "delete":
+            old = self.find_task(record["id"])
+            self.conn.execute("DELETE FROM tasks WHERE id = ?", (record["id"],))
+            self.conn.execute("DELETE FROM search_words WHERE task_id = ?", (record["id"],))
+            if old is not None:
+                self.count(old, -1)
+        if self.pending is None:
+            self.save_tasks()
+
+    def flush(self, records):
         self.save_tasks()
-        print(f"✅ Task added: {title}")
 
-    def list_tasks(self, status_filter=None):
-        if not self.tasks:
-            print("No tasks found.")
+    def discard_pending(self):
+        self.pending = None
+        self.next_id = 1
+        self.conn.rollback()
+
+    def reload_if_changed(self):
+        # Rows are always read fresh; data_version changes whenever another
+        # connection commits, and is remembered like the lock counter of the others.
+        self.disk_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return self.disk_version
+
+    def peek_next_id(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return row[0] if row else 1
+
+    def set_next_id(self, next_id):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (next_id,))
+
+    def generate_task_id(self):
+        # The counter in the database moves forward when the add is flushed.
+        task_id = max(self.peek_next_id(), self.next_id)
+        self.next_id = task_id + 1
+        return task_id
+
+    def find_task(self, task_id):
+        row = self.conn.execute(f"SELECT {self.COLUMNS} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self.row_to_task(row) if row else None
+
+    def page_tasks(self, status_filter=None, after_id=None, sort="id", reverse=False, offset=0, limit=None,
+                   include_archive=False, window=(None, None)):
+        if (sort != "id" or include_archive
+                or self.conn.execute("SELECT 1 FROM tasks WHERE repeat IS NOT NULL LIMIT 1").fetchone()):
+            return super().page_tasks(status_filter, after_id, sort, reverse, offset, limit, include_archive, window)
+        # In id order, with no recurring tasks to expand, the whole page is one indexed query.
+        conditions, params = [], []
+        if status_filter is not None:
+            conditions.append("completed = ?")
+            params.append(int(status_filter == "completed"))
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+        query = f"SELECT {self.COLUMNS} FROM tasks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY id {'DESC' if reverse else 'ASC'} LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        return (self.row_to_task(row) for row in self.conn.execute(query, params))
+
+    def lookup_task(self, task_id):
+        return self.find_task(task_id)
+
+    def count_tasks(self):
+        counts = {"pending": 0, "completed": 0}
+        for completed, count in self.conn.execute("SELECT completed, COUNT(*) FROM tasks GROUP BY completed"):
+            counts["completed" if completed else "pending"] = count
+        return counts
+
+    # The TaskCounters live in meta, one row per count: "count:priority:<completed>:<priority>"
+    # and "count:due:<due key>". Every add, update and delete moves them in the same
+    # transaction as the row, so stats reads a handful of meta rows and no task.
+    COUNTER_ROWS = "key > 'count:' AND key < 'count;'"
+    ADD_TO_COUNTER = ('INSERT INTO meta (key, value) VALUES (?, ?) '
+                      'ON CONFLICT (key) DO UPDATE SET value = value + excluded.value')
+
+    def count(self, task, count):
+        """Counts a task into the counters in meta; a count of -1 counts it out again."""
+        keys = [f"count:priority:{int(task.completed)}:{task.priority}"]
+        if not task.completed:
+            keys.append(f"count:due:{TaskCounters.due_key(task)}")
+        self.conn.executemany(self.ADD_TO_COUNTER, [(key, count) for key in keys])
+
+    def recount(self):
+        """Replaces the counters in meta with counts grouped from the tasks table."""
+        self.conn.execute(f"DELETE FROM meta WHERE {self.COUNTER_ROWS}")
+        self.conn.execute(
+            "INSERT INTO meta (key, value) SELECT 'count:priority:' || completed || ':' || priority, COUNT(*) "
+            "FROM tasks GROUP BY completed, priority"
+        )
+        for due_date, recurring, count in self.conn.execute(
+                "SELECT due_date, repeat IS NOT NULL, COUNT(*) FROM tasks WHERE completed = 0 GROUP BY 1, 2"
+        ).fetchall():
+            key = TaskCounters.key_for(due_date, normalize_due_date(due_date)[1], recurring)
+            self.conn.execute(self.ADD_TO_COUNTER, (f"count:due:{key}", count))
+
+    def stats(self):
+        counters = TaskCounters()
+        for key, count in self.conn.execute(f"SELECT key, value FROM meta WHERE {self.COUNTER_ROWS} AND value != 0"):
+            kind, _, rest = key[len("count:"):].partition(":")
+            if kind == "due":
+                counters.due[rest] = count
+            else:
+                completed, _, priority = rest.partition(":")
+                counters.priorities.setdefault(normalize_priority(priority), [0, 0])[int(completed)] += count
+        return counters.report()
+
+    def iter_tasks(self, status_filter=None):
+        query = f"SELECT {self.COLUMNS} FROM tasks"
+        if status_filter == "pending":
+            query += " WHERE completed = 0"
+        elif status_filter == "completed":
+            query += " WHERE completed = 1"
+        for row in self.conn.execute(query + " ORDER BY id"):
+            yield self.row_to_task(row)
+
+    def search(self, query):
+        terms = search_terms(query)
+        if not terms:
             return
-        for task in self.tasks:
-            if status_filter == "pending" and task.completed:
-                continue
-            if status_filter == "completed" and not task.completed:
-                continue
-            status = "✓" if task.completed else "✗"
-            print(f"[{task.id}] {status} {task.title} (Due: {task.due_date}, Priority: {task.priority})")
+        sql, params = search_words_query(terms)
+        for row in self.conn.execute(f"SELECT {self.COLUMNS} FROM tasks WHERE id IN ({sql}) ORDER BY id", params):
+            yield self.row_to_task(row)
 
-    def complete_task(self, task_id):
-        for task in self.tasks:
-            if task.id == task_id:
-                task.completed = True
-                self.save_tasks()
-                return
-        print("Task not found.")
+    def add_tasks(self, rows):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        return super().add_tasks(rows)
+
+    def add_task(self, title, due_date, priority, repeat=None):
+        task = self.new_task(None, title, due_date, priority, repeat)
+        if not self.conn.in_transaction:
+            # Take the write lock before picking the id, or two processes can pick the same one.
+            self.conn.execute("BEGIN IMMEDIATE")
+        task.id = self.generate_task_id()
+        self.commit({"op": "add", "task": task.to_dict()})
+        self.notify(f"✅ Task added: {title}")
+        return task
 
     def delete_task(self, task_id):
-        self.tasks = [t for t in self.tasks if t.id != task_id]
-        self.save_tasks()
+        task = self.find_task(task_id)
+        if task is None:
+            self.notify("Task not found.")
+            return None
+        self.commit({"op": "delete", "id": task_id})
+        return task
+
+
+class ShardedTaskManager(TaskManager):
+    """TaskManager that splits the tasks into one file per status and due month under
+    tasks.d, e.g. tasks.d/pending-2025-05.json. Only the shards a command needs are
+    read, and a change rewrites only the shards it touched.
+
+    tasks.d/manifest.json holds the next id and the task count of each shard, and
+    tasks.d/ids-N.json files record which shard each id is in, a block of ids per
+    file, so finding or moving one task reads and writes only small files."""
+
+    def __init__(self, directory=None):
+        # tasks_by_id stays None: commands work on the shards they need.
+        super().__init__(storage="sharded")
+        self.directory = directory or SHARD_DIR
+        self.drop_cache()
+
+    def drop_cache(self):
+        self.next_id = 1
+        # Shard name -> task count, from the manifest; None until it is read.
+        self.shard_counts = None
+        # Shard name -> {id: Task}, for the shards read so far.
+        self.shards = {}
+        # Block number -> {task id: shard name}, for the ids-N.json files read so far.
+        self.locators = {}
+        self.dirty = set()
+        self.dirty_locators = set()
+        # TaskCounters from the manifest; None for manifests written before there were
+        # counters, until the first stats call counts the tasks.
+        self.counters = None
+
+    def path(self, name):
+        return os.path.join(self.directory, name + ".json")
+
+    @staticmethod
+    def shard_name(task):
+        # Recurring tasks are due in every month, so they get a shard of their own.
+        if task.repeat is not None:
+            month = "recurring"
+        elif task.due_ordinal is not None:
+            month = task.due_date[:7]
+        else:
+            month = "undated" if task.due_date == NO_DUE_DATE else "invalid"
+        return f"{'completed' if task.completed else 'pending'}-{month}"
+
+    @property
+    def tasks(self):
+        return list(self.iter_tasks())
+
+    def ensure_loaded(self):
+        # Shards are read on demand; there is nothing to load up front.
+        pass
+
+    def rebuild_indexes(self):
+        pass
+
+    def index_task(self, task):
+        # Shards are the due-date index; only the counters need keeping current.
+        if self.counters is not None:
+            self.counters.add(task)
+
+    def unindex_task(self, task):
+        if self.counters is not None:
+            self.counters.remove(task)
+
+    def load_manifest(self):
+        if self.shard_counts is not None:
+            return
+        with self.locked(exclusive=False):
+            self.disk_version = self.read_disk_version()
+            try:
+                with open(self.path("manifest"), 'r') as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                manifest = {"next_id": 1, "shards": {}, "counters": {"priorities": {}, "due": {}}}
+        self.next_id = manifest["next_id"]
+        self.shard_counts = manifest["shards"]
+        if "counters" in manifest:
+            self.counters = TaskCounters.from_dict(manifest["counters"])
+
+    def locator(self, task_id):
+        block = task_id // IDS_PER_LOCATOR
+        if block not in self.locators:
+            self.load_manifest()
+            locations = {}
+            if os.path.exists(self.path(f"ids-{block}")):
+                with open(self.path(f"ids-{block}"), 'r') as f:
+                    locations = {int(task_id): name for task_id, name in json.load(f).items()}
+            self.locators[block] = locations
+        return self.locators[block]
+
+    def shard(self, name):
+        """The tasks of one shard by id, read from disk the first time."""
+        if name not in self.shards:
+            tasks = []
+            if os.path.exists(self.path(name)):
+                tasks, _ = read_tasks_file(self.path(name))
+            self.shards[name] = {task.id: task for task in tasks}
+        return self.shards[name]
+
+    def shard_tasks(self, name):
+        """Yields one shard's tasks in id order, streaming it if it is not cached."""
+        if name in self.shards:
+            yield from sorted(self.shards[name].values(), key=attrgetter("id"))
+        elif os.path.exists(self.path(name)):
+            yield from iter_tasks_file(self.path(name))
+
+    def shard_names(self, status_filter=None):
+        self.load_manifest()
+        return sorted(
+            name for name in self.shard_counts
+            if status_filter is None or name.startswith(status_filter + "-")
+        )
+
+    def load_tasks(self):
+        return list(self.iter_tasks())
+
+    def iter_tasks(self, status_filter=None):
+        # Each shard is in id order, so merging them gives the usual id order.
+        yield from heapq.merge(
+            *(self.shard_tasks(name) for name in self.shard_names(status_filter)),
+            key=attrgetter("id"),
+        )
+
+    def find_task(self, task_id):
+        name = self.locator(task_id).get(task_id)
+        return self.shard(name).get(task_id) if name else None
+
+    def lookup_task(self, task_id):
+        return self.find_task(task_id)
+
+    def count_tasks(self):
+        counts = {"pending": 0, "completed": 0}
+        for name in self.shard_names():
+            counts[name.split("-", 1)[0]] += self.shard_counts[name]
+        return counts
+
+    def stats(self):
+        self.load_manifest()
+        if self.counters is None:
+            self.counters = TaskCounters.of(self.iter_tasks())
+        return self.counters.report()
+
+    def generate_task_id(self):
+        self.load_manifest()
+        task_id = self.next_id
+        self.next_id += 1
+        return task_id
+
+    def add_task(self, title, due_date, priority, repeat=None):
+        task = self.new_task(None, title, due_date, priority, repeat)
+        task.id = self.generate_task_id()
+        record = {"op": "add", "task": task.to_dict()}
+        self.commit(record)
+        self.notify(f"✅ Task added: {title}")
+        # A rebase may have given the task a new id.
+        return self.find_task(record["task"]["id"])
+
+    def delete_task(self, task_id):
+        task = self.find_task(task_id)
+        if task is None:
+            self.notify("Task not found.")
+            return None
+        self.commit({"op": "delete", "id": task_id})
+        return task
 
-    def update_task(self, task_id, title=None, due_date=None, priority=None):
-        for task in self.tasks:
-            if task.id == task_id:
-                if title:
-                    task.title = title
-                if due_date:
-                    task.due_date = due_date
-                if priority:
-                    task.priority = priority
+    def place(self, task, name):
+        self.shard(name)[task.id] = task
+        self.locator(task.id)[task.id] = name
+        self.dirty_locators.add(task.id // IDS_PER_LOCATOR)
+        self.shard_counts[name] = self.shard_counts.get(name, 0) + 1
+        self.dirty.add(name)
+
+    def unplace(self, task_id, name):
+        del self.shard(name)[task_id]
+        self.locator(task_id).pop(task_id)
+        self.dirty_locators.add(task_id // IDS_PER_LOCATOR)
+        self.shard_counts[name] -= 1
+        self.dirty.add(name)
+
+    def apply_record(self, record):
+        """Applies a change record to the cached shards, moving a task to another
+        shard when its status or due month changed."""
+        self.load_manifest()
+        if record["op"] == "add":
+            task = Task.from_dict(record["task"])
+            # An add replaces a task stored under the same id, as import-json does.
+            name = self.locator(task.id).get(task.id)
+            if name is not None:
+                self.unindex_task(self.shard(name)[task.id])
+                self.unplace(task.id, name)
+            self.place(task, self.shard_name(task))
+            self.next_id = max(self.next_id, task.id + 1)
+            self.index_task(task)
+            return
+        name = self.locator(record["id"]).get(record["id"])
+        if name is None:
+            return
+        if record["op"] == "update":
+            task = self.shard(name)[record["id"]]
+            # The manager methods have usually changed the task already, between their
+            # own unindex and index; a rebase replays records on the task as read.
+            self.unindex_task(task)
+            for field, value in record["fields"].items():
+                setattr(task, field, value)
+            self.index_task(task)
+            if self.shard_name(task) != name:
+                self.unplace(task.id, name)
+                self.place(task, self.shard_name(task))
+            else:
+                self.dirty.add(name)
+        elif record["op"] == "delete":
+            self.unindex_task(self.shard(name)[record["id"]])
+            self.unplace(record["id"], name)
+
+    def commit(self, record):
+        self.version += 1
+        self.apply_record(record)
+        if self.pending is not None:
+            self.pending.append(record)
+        else:
+            self.flush([record])
+
+    def rebase(self, records):
+        """Re-reads the shards another process changed and re-applies our records,
+        renumbering added tasks as TaskManager.rebase does."""
+        ours = {
+            record["task"]["id"]: self.find_task(record["task"]["id"])
+            for record in records if record["op"] == "add"
+        }
+        self.drop_cache()
+        self.load_manifest()
+        renumbered = {}
+        for record in records:
+            if record["op"] == "add":
+                old_id = record["task"]["id"]
+                task = ours.get(old_id) or Task.from_dict(record["task"])
+                if old_id < self.next_id:
+                    task.id = record["task"]["id"] = renumbered[old_id] = self.next_id
+                self.place(task, self.shard_name(task))
+                self.index_task(task)
+                self.next_id = task.id + 1
+            else:
+                record["id"] = renumbered.get(record["id"], record["id"])
+                self.apply_record(record)
+        self.version += 1
+
+    def flush(self, records):
+        if not records:
+            return
+        with self.locked():
+            if self.read_disk_version() != self.disk_version:
+                self.rebase(records)
+            with self.updating_search_index(records):
                 self.save_tasks()
-                return
-        print("Task not found.")
+            self.bump_disk_version()
+
+    @measured("save_tasks")
+    def save_tasks(self):
+        """Writes the changed shards and id blocks, then the manifest."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in self.dirty:
+            tasks = sorted(self.shards[name].values(), key=attrgetter("id"))
+            if tasks:
+                replace_file(self.path(name), lambda f: json.dump([t.to_dict() for t in tasks], f, indent=4))
+            else:
+                del self.shard_counts[name]
+                if os.path.exists(self.path(name)):
+                    os.remove(self.path(name))
+        for block in self.dirty_locators:
+            replace_file(self.path(f"ids-{block}"), lambda f: json.dump(self.locators[block], f))
+        self.dirty_locators.clear()
+        manifest = {"next_id": self.next_id, "shards": self.shard_counts}
+        if self.counters is not None:
+            manifest["counters"] = self.counters.to_dict()
+        replace_file(self.path("manifest"), lambda f: json.dump(manifest, f, indent=4))
+        self.dirty.clear()
+
+    def discard_pending(self):
+        self.pending = None
+        self.drop_cache()
+
+    def files_stamp(self):
+        # Every write ends by replacing the manifest.
+        path = self.path("manifest")
+        if not os.path.exists(path):
+            return [None, None]
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def compact_tasks(self):
+        print(f"🗜️ Shards in {self.directory} are rewritten as they change; nothing to compact.")
+
+    def import_json(self, path=None):
+        path = path or TASKS_FILE
+        source = read_json_source(path)
+        if source is None:
+            print(f"⚠️ File not found: {path}")
+            return
+        tasks, next_id = source
+        with self.batch():
+            for task in tasks:
+                self.commit({"op": "add", "task": task.to_dict()})
+            self.next_id = max(self.next_id, next_id)
+        print(f"📥 Imported {len(tasks)} tasks from {path} into {self.directory}")
 
     def organize_tasks(self):
-        categorized_tasks = {
-            'Overdue': [],
-            'Due Today': [],
-            'Due This Week': [],
-            'Due Later': [],
-            'No Due Date': [],
-            'Invalid Dates': []
-        }
+        """Whole shards outside the current week go straight into a bucket; only the
+        months that contain today or the rest of the week are looked at task by task."""
+        categorized_tasks = {category: [] for category in DUE_CATEGORIES}
+        today = date.today()
+        today_ordinal = today.toordinal()
+        end_of_week = today_ordinal + (6 - today.weekday())
+        first_month = today.isoformat()[:7]
+        last_month = date.fromordinal(end_of_week).isoformat()[:7]
+        for name in sorted(self.shard_names(), key=lambda name: (name.split("-", 1)[1], name)):
+            month = name.split("-", 1)[1]
+            if month == "undated":
+                categorized_tasks['No Due Date'].extend(self.shard_tasks(name))
+            elif month == "invalid":
+                categorized_tasks['Invalid Dates'].extend(self.shard_tasks(name))
+            elif month == "recurring":
+                for task in self.expand_recurring(self.shard_tasks(name), None, *recurrence_window()):
+                    categorized_tasks[self.due_category(task, today_ordinal, end_of_week)].append(task)
+            elif month < first_month:
+                categorized_tasks['Overdue'].extend(self.shard_tasks(name))
+            elif month > last_month:
+                categorized_tasks['Due Later'].extend(self.shard_tasks(name))
+            else:
+                for task in self.shard_tasks(name):
+                    categorized_tasks[self.due_category(task, today_ordinal, end_of_week)].append(task)
+        return categorized_tasks
 
-        today = datetime.today()
-        end_of_week = today + timedelta(days=(6 - today.weekday()))
 
-        for task in self.tasks:
-            due_string = task.due_date.strip()
+class BinaryTaskManager(TaskManager):
+    """TaskManager that keeps its snapshot in tasks.bin instead of tasks.json. The
+    whole file is rewritten on every change, as in json mode, but lookups, counts
+    and streaming read it through mmap without parsing."""
 
-            try:
-                if due_string.upper() != 'N/A':
-                    parsed_date = datetime.strptime(due_string.replace('-', '/'), '%m/%d/%Y')
-                    if parsed_date.date() < today.date():
-                        categorized_tasks['Overdue'].append(task)
-                    elif parsed_date.date() == today.date():
-                        categorized_tasks['Due Today'].append(task)
-                    elif today.date() < parsed_date.date() <= end_of_week.date():
-                        categorized_tasks['Due This Week'].append(task)
-                    else:
-                        categorized_tasks['Due Later'].append(task)
+    def __init__(self, path=None):
+        super().__init__(storage="binary")
+        self.path = path or BINARY_FILE
+
+    def open_file(self):
+        return BinaryTaskFile(self.path) if os.path.exists(self.path) else None
+
+    @measured("load_tasks")
+    def load_tasks(self):
+        with self.locked(exclusive=False):
+            self.disk_version = self.read_disk_version()
+            self.tasks_by_id = {}
+            self.next_id = 1
+            view = self.open_file()
+            if view is not None:
+                with view:
+                    self.tasks = list(view)
+                    self.next_id = view.next_id
+                    counters = view.counters()
+            self.rebuild_indexes()
+            if view is not None:
+                self.counters = counters
+        return self.tasks
+
+    @measured("save_tasks")
+    def save_tasks(self):
+        self.ensure_loaded()
+        replace_file(self.path, lambda f: write_binary_tasks(f, self.tasks_by_id.values(), self.next_id,
+                                                                      self.task_counters()), mode='wb')
+        if self.pending:
+            self.pending.clear()
+
+    def files_stamp(self):
+        if not os.path.exists(self.path):
+            return [None, None]
+        stat = os.stat(self.path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def stream_tasks(self):
+        view = self.open_file()
+        if view is not None:
+            with view:
+                yield from view
+
+    def lookup_task(self, task_id):
+        if self.tasks_by_id is not None:
+            return self.tasks_by_id.get(task_id)
+        view = self.open_file()
+        if view is None:
+            return None
+        with view:
+            return view.find(task_id)
+
+    def count_tasks(self):
+        if self.tasks_by_id is not None:
+            return super().count_tasks()
+        view = self.open_file()
+        if view is None:
+            return {"pending": 0, "completed": 0}
+        with view:
+            return {"pending": view.count - view.completed, "completed": view.completed}
+
+    def stats(self):
+        if self.tasks_by_id is None:
+            view = self.open_file()
+            if view is None:
+                return TaskCounters().report()
+            with view:
+                return view.counters().report()
+        self.ensure_loaded()
+        return self.task_counters().report()
+
+    def compact_tasks(self):
+        print(f"🗜️ {self.path} is rewritten on every change; nothing to compact.")
+
+
+def migrate_tasks(path, output=None):
+    """Rewrites a task file in the current format, reading and writing one task at a
+    time so memory stays bounded. Legacy files also load as they are and are rewritten
+    by the first change, but that loads every task at once. The id counter and journal
+    position of a current-format file are kept, so deleted ids are not handed out again."""
+    output = output or TASKS_FILE
+    manager = TaskManager(storage="json")
+    with manager.locked():
+        header = read_snapshot_header(path)
+        written = []
+        replace_file(output, lambda f: written.append(write_tasks_snapshot(
+            f, iter_tasks_file(path), header.get("next_id"), header.get("journal_seq", 0))))
+        if output == TASKS_FILE:
+            manager.bump_disk_version()
+    print(f"🔁 Migrated {written[0]} tasks from {path} to {output}")
+    return written[0]
+
+
+def convert_tasks(to):
+    """Copies every task from tasks.json (and its journal) into tasks.bin, or back."""
+    if to == "binary":
+        source, target = TaskManager(storage="json"), BinaryTaskManager()
+    else:
+        source, target = BinaryTaskManager(), TaskManager(storage="json")
+    tasks = source.tasks
+    with target.locked():
+        target.tasks = tasks
+        target.next_id = source.next_id
+        target.save_tasks()
+        target.bump_disk_version()
+    names = {"binary": BINARY_FILE, "json": TASKS_FILE}
+    print(f"🔁 Converted {len(tasks)} tasks from {names['json' if to == 'binary' else 'binary']} to {names[to]}")
+
+
+class BatchAborted(Exception):
+    pass
+
+
+def check_text_fields(data):
+    """Raises ValueError unless data is an object whose title, due, priority, on and
+    repeat are strings, where given. Used on batch operations and API requests."""
+    if not isinstance(data, dict):
+        raise ValueError("not an object")
+    for field in ("title", "due", "priority", "on", "repeat"):
+        value = data.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{field} must be a string, not {json.dumps(value)}")
+
+
+def apply_operation(manager, operation):
+    """Applies one batch operation such as {"op": "complete", "id": 3}. Field names
+    follow the CLI flags. Returns the task it touched."""
+    check_text_fields(operation)
+    op = operation["op"]
+    if op == "add":
+        task = manager.add_task(operation["title"], operation.get("due", "N/A"), operation.get("priority", "Medium"),
+                                operation.get("repeat"))
+    elif op == "complete":
+        task = manager.complete_task(operation["id"], operation.get("on"))
+    elif op == "delete":
+        task = manager.delete_task(operation["id"])
+    elif op == "update":
+        task = manager.update_task(operation["id"], operation.get("title"), operation.get("due"),
+                                   operation.get("priority"), operation.get("on"))
+    else:
+        raise ValueError(f"unknown op: {op}")
+    if task is None:
+        raise LookupError(f"task not found: {operation['id']}")
+    return task
+
+
+def run_batch(manager, lines, transaction=False, out=None):
+    """Applies newline-delimited JSON operations in one session and writes once at the
+    end, printing one JSON result per operation. With transaction=True the first
+    failing operation cancels the whole batch."""
+    out = out or sys.stdout
+    results = []
+    applied = failed = 0
+    manager.quiet = True
+    try:
+        with manager.batch():
+            for line_number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    operation = json.loads(line)
+                    task = apply_operation(manager, operation)
+                    result = {"line": line_number, "op": operation["op"], "ok": True, "id": task.id}
+                    applied += 1
+                except (ValueError, KeyError, TypeError, LookupError) as e:
+                    result = {"line": line_number, "ok": False, "error": str(e)}
+                    failed += 1
+                if transaction:
+                    # Nothing is final until the batch commits, so hold results back.
+                    results.append(result)
+                    if not result["ok"]:
+                        raise BatchAborted()
                 else:
-                    categorized_tasks['No Due Date'].append(task)
-            except ValueError:
-                categorized_tasks['Invalid Dates'].append(task)
+                    out.write(json.dumps(result) + "\n")
+        committed = True
+    except BatchAborted:
+        committed = False
+    finally:
+        manager.quiet = False
+    for result in results:
+        out.write(json.dumps(result) + "\n")
+    out.write(json.dumps({"committed": committed, "applied": applied if committed else 0, "failed": failed}) + "\n")
+    return committed
 
-        return categorized_tasks
 
-    def progress_tracker(self, task_id):
-        for task in self.tasks:
-            if task.id == task_id:
-                response = input(f"Have you finished '{task.title}'? Yes/No: ").strip().lower()
-                if response == "yes":
-                    task.completed = True
-                elif response == "no":
-                    task.completed = False
-                self.save_tasks()
-                return
-        print("Task not found.")
+def create_manager(storage=None):
+    storage = storage or os.environ.get("TASKTRACKR_STORAGE", "json")
+    if storage == "sqlite":
+        return SqliteTaskManager()
+    if storage == "sharded":
+        return ShardedTaskManager()
+    if storage == "binary":
+        return BinaryTaskManager()
+    return TaskManager(storage=storage)
+
+
+def non_negative_int(value):
+    """argparse type for counts such as --limit and --offset."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {value}")
+    return number
 
-    def deadline_manager(self, task_id):
-        for task in self.tasks:
-            if task.id == task_id:
-                deadline_prompt = input(f"When is '{task.title}' due? (MM/DD/YYYY or MM-DD-YYYY): ")
-                if re.match(r"^\d{2}[-/]\d{2}[-/]\d{4}$", deadline_prompt):
-                    try:
-                        parsed_date = datetime.strptime(deadline_prompt.replace("-", "/"), "%m/%d/%Y")
-                        task.due_date = parsed_date.strftime("%m/%d/%Y")
-                        self.save_tasks()
-                        return
-                    except ValueError:
-                        pass
-        print("❌ Invalid input or task not found.")
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(description="TaskTrackr")
+    parser.add_argument("--storage", choices=STORAGE_MODES,
+                        default=os.environ.get("TASKTRACKR_STORAGE", "json"))
+    parser.add_argument("--metrics", action="store_true",
+                        help="report time and memory per phase as a JSON line on stderr")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="like --metrics, but append the JSON line to FILE")
+    parser.add_argument("--profile", metavar="FILE", help="write a cProfile dump of the command to FILE")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=os.environ.get("TASKTRACKR_FSYNC", "batch"),
+                        help="journal storage: sync after every change, once per write, or never")
     subparsers = parser.add_subparsers(dest="command")
 
     add_parser = subparsers.add_parser("add")
     add_parser.add_argument("--title", required=True)
     add_parser.add_argument("--due", required=True)
     add_parser.add_argument("--priority", default="Medium")
+    add_parser.add_argument("--repeat", metavar="RULE",
+                            help="daily, weekly, monthly or every N days/weeks/months, counted from --due")
+    add_parser.add_argument("--until", metavar="DATE", help="last date a --repeat task can fall on")
 
     list_parser = subparsers.add_parser("list")
     list_parser.add_argument("--status", choices=["pending", "completed"])
+    list_parser.add_argument("--limit", type=non_negative_int)
+    list_parser.add_argument("--offset", type=non_negative_int, default=0, help="skip this many tasks first")
+    list_parser.add_argument("--after-id", type=int, help="only tasks with a higher id (for paging in id order)")
+    list_parser.add_argument("--sort", choices=SORT_FIELDS, default="id")
+    list_parser.add_argument("--reverse", action="store_true")
+    list_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text")
+    list_parser.add_argument("--include-archive", action="store_true",
+                             help=f"also list the completed tasks moved to {ARCHIVE_FILE}")
+    list_parser.add_argument("--from", dest="start", metavar="DATE",
+                             help=f"recurring tasks: list occurrences from this date (default: "
+                                  f"{RECURRENCE_WINDOW_DAYS} days ago)")
+    list_parser.add_argument("--to", dest="end", metavar="DATE",
+                             help=f"... up to this date (default: in {RECURRENCE_WINDOW_DAYS} days)")
 
     complete_parser = subparsers.add_parser("complete")
     complete_parser.add_argument("--id", type=int, required=True)
+    complete_parser.add_argument("--on", metavar="DATE", help="recurring tasks: the occurrence due on this date")
 
     delete_parser = subparsers.add_parser("delete")
     delete_parser.add_argument("--id", type=int, required=True)
@@ -181,6 +2940,8 @@ def main():
     update_parser.add_argument("--title")
     update_parser.add_argument("--due")
     update_parser.add_argument("--priority")
+    update_parser.add_argument("--on", metavar="DATE",
+                               help="recurring tasks: change only the occurrence due on this date")
 
     progress_parser = subparsers.add_parser("progress")
     progress_parser.add_argument("--id", type=int, required=True)
@@ -190,19 +2951,96 @@ def main():
 
     organize_parser = subparsers.add_parser("organize")
 
-    args = parser.parse_args()
-    manager = TaskManager()
+    show_parser = subparsers.add_parser("show")
+    show_parser.add_argument("--id", type=int, required=True)
+
+    count_parser = subparsers.add_parser("count")
+
+    stats_parser = subparsers.add_parser("stats", help="totals by status, priority and due date, and completion rate")
+    stats_parser.add_argument("--format", choices=["text", "json"], default="text")
+
+    next_parser = subparsers.add_parser("next", help="the most urgent pending tasks")
+    next_parser.add_argument("--k", type=int, default=10, help="how many tasks to show")
+    next_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text")
+
+    search_parser = subparsers.add_parser("search")
+    search_parser.add_argument("query", nargs="+", help="words every title must contain; end a word with * to match a prefix")
+    search_parser.add_argument("--status", choices=["pending", "completed"])
+    search_parser.add_argument("--limit", type=non_negative_int)
+    search_parser.add_argument("--format", choices=OUTPUT_FORMATS, default="text")
+
+    compact_parser = subparsers.add_parser("compact")
+
+    archive_parser = subparsers.add_parser("archive", help=f"move completed tasks to {ARCHIVE_FILE}")
+    archive_parser.add_argument("--days", type=int, help="only tasks completed at least this many days ago")
+    archive_parser.add_argument("--keep", type=int, help="leave this many of the most recently completed tasks")
+
+    import_json_parser = subparsers.add_parser("import-json")
+    import_json_parser.add_argument("--file", default=TASKS_FILE)
+
+    import_parser = subparsers.add_parser("import", help="add the tasks in a CSV or NDJSON file")
+    import_parser.add_argument("--file", required=True)
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    import_parser.add_argument("--workers", type=int, help="processes checking rows (default: one per CPU)")
 
+    export_parser = subparsers.add_parser("export", help="write tasks to a CSV or NDJSON file")
+    export_parser.add_argument("--file", required=True)
+    export_parser.add_argument("--format", choices=IMPORT_FORMATS, help="default: from the file extension")
+    export_parser.add_argument("--status", choices=["pending", "completed"])
+    export_parser.add_argument("--include-archive", action="store_true")
+
+    migrate_parser = subparsers.add_parser("migrate", help="rewrite a legacy task file in the current format")
+    migrate_parser.add_argument("--file", default=TASKS_FILE)
+    migrate_parser.add_argument("--output", default=TASKS_FILE)
+
+    convert_parser = subparsers.add_parser("convert")
+    convert_parser.add_argument("--to", choices=["binary", "json"], required=True,
+                                help=f"binary: {TASKS_FILE} to {BINARY_FILE}; json: back again")
+
+    batch_parser = subparsers.add_parser("batch")
+    batch_parser.add_argument("--file", help="NDJSON operations to apply (default: stdin)")
+    batch_parser.add_argument("--transaction", action="store_true")
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                              help="seconds between background writes")
+
+    remind_parser = subparsers.add_parser("remind", help="serve, and remind about tasks as they fall due")
+    remind_parser.add_argument("--at", default=REMIND_AT, metavar="HH:MM",
+                               help="time of day to remind about the tasks due that day")
+    remind_parser.add_argument("--hook", metavar="COMMAND",
+                               help="also run this shell command per reminder, with the task as JSON on stdin")
+    remind_parser.add_argument("--notify-socket", metavar="PATH",
+                               help="also send each reminder as a JSON line to this Unix socket")
+    remind_parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                               help="seconds between background writes")
+
+    stop_parser = subparsers.add_parser("stop")
+
+    return parser
+
+
+def run_command(manager, args, stdin=None):
+    """Runs one parsed CLI command against a manager. stdin, when given, replaces
+    sys.stdin / --file as the batch input."""
     if args.command == "add":
-        manager.add_task(args.title, args.due, args.priority)
+        repeat = args.repeat
+        if repeat and args.until:
+            repeat += f" until {args.until}"
+        try:
+            manager.add_task(args.title, args.due, args.priority, repeat)
+        except ValueError as e:
+            print(f"❌ {e}")
     elif args.command == "list":
-        manager.list_tasks(status_filter=args.status)
+        manager.list_tasks(status_filter=args.status, limit=args.limit, offset=args.offset, after_id=args.after_id,
+                           sort=args.sort, reverse=args.reverse, output_format=args.format,
+                           include_archive=args.include_archive, window=(args.start, args.end))
     elif args.command == "complete":
-        manager.complete_task(args.id)
+        manager.complete_task(args.id, args.on)
     elif args.command == "delete":
         manager.delete_task(args.id)
     elif args.command == "update":
-        manager.update_task(args.id, args.title, args.due, args.priority)
+        manager.update_task(args.id, args.title, args.due, args.priority, args.on)
     elif args.command == "progress":
         manager.progress_tracker(args.id)
     elif args.command == "deadline":
@@ -214,8 +3052,454 @@ def main():
             for task in tasks:
                 status = "✓" if task.completed else "✗"
                 print(f"{status} {task.title} (Due: {task.due_date})")
-    else:
+    elif args.command == "show":
+        task = manager.lookup_task(args.id)
+        if task is None:
+            print("Task not found.")
+        else:
+            manager.print_tasks([task])
+    elif args.command == "next":
+        manager.print_tasks(manager.next_tasks(args.k), args.format)
+    elif args.command == "count":
+        counts = manager.count_tasks()
+        print(f"Pending: {counts['pending']}")
+        print(f"Completed: {counts['completed']}")
+    elif args.command == "stats":
+        stats = manager.stats()
+        if args.format == "json":
+            print(json.dumps(stats))
+        else:
+            print(f"Pending: {stats['pending']}")
+            print(f"Completed: {stats['completed']}")
+            print(f"Completion rate: {stats['completion_rate']:.1%}")
+            print("\nBy priority:")
+            for priority, counts in stats["priorities"].items():
+                print(f"  {priority}: {counts['pending']} pending, {counts['completed']} completed")
+            print("\nPending by due date:")
+            for category, count in stats["due"].items():
+                print(f"  {category}: {count}")
+    elif args.command == "search":
+        manager.search_tasks(" ".join(args.query), status_filter=args.status, limit=args.limit,
+                             output_format=args.format)
+    elif args.command == "compact":
+        manager.compact_tasks()
+    elif args.command == "import":
+        manager.import_tasks(args.file, args.format, args.workers)
+    elif args.command == "export":
+        manager.export_tasks(args.file, args.format, args.status, args.include_archive)
+    elif args.command == "archive":
+        manager.archive_tasks(days=args.days, keep=args.keep)
+    elif args.command == "batch":
+        if stdin is not None:
+            run_batch(manager, stdin, transaction=args.transaction)
+        elif args.file:
+            with open(args.file, 'r') as f:
+                run_batch(manager, f, transaction=args.transaction)
+        else:
+            run_batch(manager, sys.stdin, transaction=args.transaction)
+
+
+class ReminderScheduler:
+    """Reminds about pending tasks when they fall due, for the remind daemon. Holds a
+    heap of (reminder time, task id, due date ordinal), built once from the pending
+    tasks and then pushed to as changes are committed, and sleeps until the earliest
+    entry instead of polling. Like next_heap, entries are not removed when a task is
+    completed, deleted or rescheduled; each one is checked against the task when it
+    comes up and dropped if it no longer applies.
+
+    Reminders go to out, to a hook command (given the task as JSON on stdin and in
+    TASKTRACKR_TASK_* variables) and to a Unix socket (one JSON line per connection)."""
+
+    def __init__(self, manager, lock, at=REMIND_AT, hook=None, notify_socket=None, out=None):
+        self.manager = manager
+        # The daemon's lock, held while tasks are looked up.
+        self.lock = lock
+        self.at = datetime.strptime(at, "%H:%M").time()
+        self.hook = hook
+        self.notify_socket = notify_socket
+        # The daemon redirects sys.stdout while it runs a command, so keep the real one.
+        self.out = out or sys.stdout
+        self.heap = []
+        # (task id, due date ordinal) already reminded about, so a task re-indexed
+        # without changing its due date is not reminded about twice.
+        self.fired = set()
+        self.changed = threading.Condition()
+        self.stopped = False
+        self.thread = None
+
+    def remind_time(self, ordinal):
+        return datetime.combine(date.fromordinal(ordinal), self.at).timestamp()
+
+    def next_due(self, task):
+        """The ordinal of the date to remind about the task next: its due date, or
+        for a recurring task its earliest pending occurrence from today. None for
+        completed tasks and those due before today."""
+        if task.completed or task.due_ordinal is None:
+            return None
+        today = date.today().toordinal()
+        if task.repeat is None:
+            due = task.due_ordinal
+            return due if due >= today and (task.id, due) not in self.fired else None
+        return next((occurrence.due_ordinal for occurrence in task.occurrences(today, date.max.toordinal())
+                     if not occurrence.completed and (task.id, occurrence.due_ordinal) not in self.fired), None)
+
+    def load(self, tasks):
+        entries = []
+        for task in tasks:
+            due = self.next_due(task)
+            if due is not None:
+                entries.append((self.remind_time(due), task.id, due))
+        heapq.heapify(entries)
+        with self.changed:
+            self.heap = entries
+            self.changed.notify()
+
+    def push(self, task):
+        due = self.next_due(task)
+        if due is None:
+            return
+        entry = (self.remind_time(due), task.id, due)
+        with self.changed:
+            heapq.heappush(self.heap, entry)
+            # Only an entry that is now first changes how long to sleep.
+            if self.heap[0] == entry:
+                self.changed.notify()
+
+    def observe(self, commit):
+        """Wraps a manager's commit so every add, completion and reschedule reaches
+        the heap as it happens."""
+        def observed(record):
+            commit(record)
+            if record["op"] == "add":
+                self.push(Task.from_dict(record["task"]))
+            elif record["op"] == "update" and {"due_date", "completed", "exceptions"} & set(record["fields"]):
+                task = self.manager.lookup_task(record["id"])
+                if task is not None:
+                    self.push(task)
+        return observed
+
+    def start(self):
+        with self.lock:
+            self.manager.commit = self.observe(self.manager.commit)
+            self.load(self.manager.iter_tasks("pending"))
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.changed:
+            self.stopped = True
+            self.changed.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while True:
+            with self.changed:
+                while not self.stopped and (not self.heap or self.heap[0][0] > time.time()):
+                    wait = self.heap[0][0] - time.time() if self.heap else REMIND_MAX_SLEEP
+                    self.changed.wait(min(wait, REMIND_MAX_SLEEP))
+                if self.stopped:
+                    return
+                _, task_id, due = heapq.heappop(self.heap)
+            self.fire(task_id, due)
+
+    def fire(self, task_id, due):
+        """Reminds about one heap entry, if the task is still pending and due then."""
+        with self.lock:
+            task = self.manager.lookup_task(task_id)
+            if task is None or self.next_due(task) != due:
+                return
+            self.fired.add((task_id, due))
+            if task.repeat is not None:
+                occurrence = next(task.occurrences(due, due))
+                self.push(task)
+                task = occurrence
+        self.deliver(task)
+
+    def deliver(self, task):
+        self.out.write(f"⏰ Due {task.due_date}: [{task.id}] {task.title} (Priority: {task.priority})\n")
+        self.out.flush()
+        message = json.dumps(task.to_dict())
+        if self.hook:
+            env = dict(os.environ, TASKTRACKR_TASK_ID=str(task.id), TASKTRACKR_TASK_TITLE=task.title,
+                       TASKTRACKR_TASK_DUE=task.due_date, TASKTRACKR_TASK_PRIORITY=str(task.priority))
+            try:
+                subprocess.run(self.hook, shell=True, input=message, text=True, env=env, check=True)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"❌ Reminder hook failed: {e}", file=sys.stderr)
+        if self.notify_socket:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.notify_socket)
+                    sock.sendall(message.encode("utf-8") + b"\n")
+            except OSError as e:
+                print(f"❌ Could not send reminder to {self.notify_socket}: {e}", file=sys.stderr)
+
+
+class TaskDaemon:
+    """Keeps one TaskManager in memory and serves CLI commands over a Unix socket.
+    Commands run one at a time; their changes are written to disk by a background
+    thread every flush_interval seconds, and once more on shutdown. With reminders
+    set, it is the remind daemon too."""
+
+    def __init__(self, storage=None, flush_interval=FLUSH_INTERVAL, socket_file=None):
+        storage = storage or os.environ.get("TASKTRACKR_STORAGE", "json")
+        if storage == "sqlite":
+            # The flusher thread commits on the same connection; the lock keeps it safe.
+            self.manager = SqliteTaskManager(check_same_thread=False)
+        else:
+            self.manager = create_manager(storage)
+        self.manager.ensure_loaded()
+        self.manager.pending = []
+        self.flush_interval = flush_interval
+        self.socket_file = socket_file or SOCKET_FILE
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.server = None
+        # A ReminderScheduler, for the remind command.
+        self.reminders = None
+
+    def flush(self):
+        with self.lock:
+            records, self.manager.pending = self.manager.pending, []
+            try:
+                self.manager.flush(records)
+            except Exception:
+                # Keep the changes so the next flush tries again.
+                self.manager.pending[:0] = records
+                raise
+
+    def flush_loop(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"❌ Background save failed: {e}", file=sys.stderr)
+
+    def handle(self, rfile, wfile):
+        request = json.loads(rfile.readline())
+
+        def send(message):
+            wfile.write(json.dumps(message) + "\n")
+            wfile.flush()
+
+        output = io.StringIO()
+
+        def remote_input(prompt=""):
+            # Interactive commands ask their question on the client's terminal.
+            send({"output": output.getvalue(), "prompt": prompt})
+            output.seek(0)
+            output.truncate()
+            return json.loads(rfile.readline())["input"]
+
+        args = build_parser().parse_args(request["argv"])
+        mismatch = self.mismatch(request)
+        if mismatch and args.command != "stop":
+            send({"output": f"❌ {mismatch}\n", "done": True, "refused": True})
+            return
+        if args.command == "stop":
+            send({"output": "👋 Daemon stopping.\n", "done": True})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        with self.lock, contextlib.redirect_stdout(output):
+            self.manager.ask = remote_input
+            try:
+                self.refresh()
+                stdin = io.StringIO(request["stdin"]) if "stdin" in request else None
+                run_command(self.manager, args, stdin=stdin)
+            except Exception as e:
+                print(f"❌ {e}")
+            finally:
+                del self.manager.ask
+        send({"output": output.getvalue(), "done": True})
+
+    def refresh(self):
+        """Re-reads the tasks if another process (the HTTP API, migrate, convert) wrote
+        them since, unless changes of ours are waiting to be written; those rebase
+        onto the other writes when they are flushed. Call holding self.lock."""
+        seen = self.manager.disk_version
+        if self.manager.pending or self.manager.reload_if_changed() == seen:
+            return
+        self.manager.ensure_loaded()
+        if self.reminders is not None:
+            self.reminders.load(self.manager.iter_tasks("pending"))
+
+    def mismatch(self, request):
+        """Why a client's command must not run here, or None. Its changes would go to
+        this daemon's storage, not the one the client asked for."""
+        storage = request.get("storage", self.manager.storage)
+        if storage != self.manager.storage:
+            return (f"The daemon on {self.socket_file} serves {self.manager.storage} storage, not {storage}. "
+                    f"Stop it (tasktrackr stop) or run the command with --storage {self.manager.storage}.")
+        fsync = request.get("fsync", self.manager.fsync)
+        # The fsync policy only changes how the journal is written.
+        if storage == "journal" and fsync != self.manager.fsync:
+            return (f"The daemon on {self.socket_file} syncs the journal with --fsync {self.manager.fsync}, "
+                    f"not {fsync}. Stop it or run the command with --fsync {self.manager.fsync}.")
+        return None
+
+    def serve(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                rfile = io.TextIOWrapper(self.rfile, encoding="utf-8")
+                wfile = io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True)
+                daemon.handle(rfile, wfile)
+
+        if os.path.exists(self.socket_file):
+            os.remove(self.socket_file)
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_file, Handler)
+        flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        flusher.start()
+        if self.reminders is not None:
+            self.reminders.start()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=self.server.shutdown).start())
+        print(f"🛰️ Serving tasks on {self.socket_file}")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stopped.set()
+            if self.reminders is not None:
+                self.reminders.stop()
+            self.server.server_close()
+            self.flush()
+            if os.path.exists(self.socket_file):
+                os.remove(self.socket_file)
+
+
+def forward_to_daemon(argv, stdin=None, storage=None, fsync=None):
+    """Sends a command to a running daemon and prints its output. Returns False when
+    no daemon is listening, so the caller can work on the files directly. With a
+    storage mode and fsync policy the daemon refuses the command if it runs with
+    others, and this exits with status 1."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(SOCKET_FILE):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SOCKET_FILE)
+    except OSError:
+        # Socket file left behind by a daemon that did not shut down cleanly.
+        sock.close()
+        return False
+    with sock, sock.makefile('r', encoding="utf-8") as rfile, sock.makefile('w', encoding="utf-8") as wfile:
+        request = {"argv": argv}
+        if stdin is not None:
+            request["stdin"] = stdin
+        if storage is not None:
+            request["storage"] = storage
+        if fsync is not None:
+            request["fsync"] = fsync
+        wfile.write(json.dumps(request) + "\n")
+        wfile.flush()
+        for line in rfile:
+            message = json.loads(line)
+            if message.get("refused"):
+                print(message["output"], end="", file=sys.stderr)
+                sys.exit(1)
+            print(message["output"], end="")
+            if "prompt" in message:
+                wfile.write(json.dumps({"input": input(message["prompt"])}) + "\n")
+                wfile.flush()
+            if message.get("done"):
+                break
+    return True
+
+
+def execute(parser, args, argv, metrics=None):
+    if args.command is None:
         parser.print_help()
+        return
+    if args.command == "import-json":
+        # Imports into sharded storage when that is selected, and into SQLite otherwise.
+        target = ShardedTaskManager() if args.storage == "sharded" else SqliteTaskManager()
+        target.import_json(args.file)
+        return
+    if args.command == "convert":
+        convert_tasks(args.to)
+        return
+    if args.command == "migrate":
+        migrate_tasks(args.file, args.output)
+        return
+    if args.command in ("serve", "remind"):
+        daemon = TaskDaemon(args.storage, flush_interval=args.flush_interval)
+        daemon.manager.fsync = args.fsync
+        if args.command == "remind":
+            daemon.reminders = ReminderScheduler(daemon.manager, daemon.lock, args.at, args.hook, args.notify_socket)
+        daemon.serve()
+        return
+
+    stdin = None
+    if args.command == "batch" and os.path.exists(SOCKET_FILE):
+        # The daemon may run elsewhere, so it is sent the operations themselves.
+        if args.file:
+            with open(args.file, 'r') as f:
+                stdin = f.read()
+        else:
+            stdin = sys.stdin.read()
+    if forward_to_daemon(argv, stdin=stdin, storage=args.storage, fsync=args.fsync):
+        return
+    if args.command == "stop":
+        print("No daemon running.")
+        return
+
+    manager = create_manager(args.storage)
+    manager.metrics = metrics
+    manager.fsync = args.fsync
+    try:
+        run_command(manager, args, stdin=io.StringIO(stdin) if stdin is not None else None)
+    except LockTimeout as e:
+        print(f"⚠️ Another TaskTrackr process is busy writing ({e}). Try again.", file=sys.stderr)
+        sys.exit(1)
+    except BrokenPipeError:
+        # The reader went away (list | head); stop quietly instead of with a traceback.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    argv = sys.argv[1:] if argv is None else argv
+    # Allocation tracking has to be on before argparse runs for argparse to be measured,
+    # so look for the flag ahead of the parser.
+    metrics = Metrics() if any(arg.startswith("--metrics") for arg in argv) else None
+    with measure(metrics, "argparse"):
+        parser = build_parser()
+        args = parser.parse_args(argv)
+    if metrics is None and args.profile is None:
+        execute(parser, args, argv)
+        return
+
+    profiler = cProfile.Profile() if args.profile else None
+    stdout = sys.stdout
+    if metrics is not None:
+        metrics.record("import", started - IMPORT_STARTED, None)
+        sys.stdout = MeteredOutput(metrics, stdout)
+    try:
+        with measure(metrics, "operation"):
+            if profiler:
+                profiler.enable()
+            try:
+                execute(parser, args, argv, metrics)
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        sys.stdout = stdout
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"📈 Profile written to {args.profile} (view it with: python -m pstats {args.profile})", file=sys.stderr)
+    if metrics is not None:
+        metrics.report({
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "command": args.command,
+            "argv": argv,
+            "storage": args.storage
+        }, args.metrics_file)
+        tracemalloc.stop()
 
 if __name__ == "__main__":
     main()
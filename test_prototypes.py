@@ -0,0 +1,126 @@
+import unittest
+import os
+import json
+import io
+import time
+import contextlib
+import importlib.util
+from unittest.mock import patch
+
+import autosave
+from test_tasktrackr_final import TempDirTestCase
+
+
+def load_prototype(filename):
+    # ari's_part.py is not a valid module name, so the prototypes are loaded from their paths.
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].replace("'", ""), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AutosaveCases:#Background saving, run against each interactive prototype
+    module = None
+
+    def setUp(self):
+        super().setUp()
+        self.manager = self.module.TaskManager()
+
+    def tearDown(self):
+        self.manager.close()
+
+    def saved(self):
+        with open(self.module.TaskManager.TASKS_FILE) as f:
+            return [task["description"] for task in json.load(f)]
+
+    def test_burst_costs_one_write(self):
+        writes = []
+        write_tasks = self.manager.write_tasks
+        self.manager.write_tasks = lambda data: (writes.append(data), write_tasks(data))
+        self.manager.start_autosave()
+        for i in range(5):
+            self.manager.add_task(f"Task {i}")
+        deadline = time.monotonic() + 5
+        while not writes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.saved(), [f"Task {i}" for i in range(5)])
+
+    def test_many_changes_are_written_without_waiting(self):
+        with patch.object(autosave, "AUTOSAVE_DELAY", 60):
+            self.manager.start_autosave()
+            for i in range(autosave.AUTOSAVE_CHANGES):
+                self.manager.add_task(f"Task {i}")
+            deadline = time.monotonic() + 5
+            while not os.path.exists(self.module.TaskManager.TASKS_FILE) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.saved()), autosave.AUTOSAVE_CHANGES)
+
+    def test_close_writes_what_is_left(self):
+        with patch.object(autosave, "AUTOSAVE_DELAY", 60):
+            self.manager.start_autosave()
+            self.manager.add_task("Last one")
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.manager.close()
+        self.assertEqual(self.saved(), ["Last one"])
+
+    def test_interrupted_session_is_saved(self):
+        with open(self.module.TaskManager.TASKS_FILE, "w") as f:
+            json.dump([{"description": "Old", "status": "incomplete", "due_date": "N/A"}], f)
+        answers = iter(["add", "New", ""])
+
+        def fake_input(prompt=""):
+            answer = next(answers, None)
+            if answer is None:
+                raise KeyboardInterrupt
+            return answer
+
+        with patch("builtins.input", fake_input), contextlib.redirect_stdout(io.StringIO()):
+            self.module.main()
+        self.assertEqual(self.saved(), ["Old", "New"])
+
+    def test_exit_leaves_saving_to_close(self):
+        answers = iter(["add", "New", "", "exit"])
+        writes = []
+        write_tasks = self.module.TaskManager.write_tasks
+        with patch("builtins.input", lambda prompt="": next(answers)), contextlib.redirect_stdout(io.StringIO()), \
+                patch.object(self.module.TaskManager, "write_tasks",
+                             lambda manager, data: (writes.append(data), write_tasks(manager, data))), \
+                patch.object(self.module.TaskManager, "load_tasks", lambda manager: None):
+            self.module.main()
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(self.saved(), ["New"])
+
+
+class TestEyobsAutosave(AutosaveCases, TempDirTestCase):#eyobs_part.py
+    module = load_prototype("eyobs_part.py")
+
+
+class TestArisAutosave(AutosaveCases, TempDirTestCase):#ari's_part.py
+    module = load_prototype("ari's_part.py")
+
+
+class TestDunyasIds(TempDirTestCase):#dunyas_part.py keeps its id counter in tasks.json
+    def setUp(self):
+        super().setUp()
+        self.module = load_prototype("dunyas_part.py")
+
+    def test_deleted_newest_id_is_not_reused(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager = self.module.TaskManager()
+            manager.add_task("First", "N/A", "Low")
+            manager.add_task("Second", "N/A", "Low")
+            manager.delete_task(2)
+            manager = self.module.TaskManager()
+            manager.add_task("Third", "N/A", "Low")
+        self.assertEqual([task.id for task in self.module.TaskManager().tasks], [1, 3])
+
+    def test_bare_list_counts_on_from_the_highest_id(self):
+        with open(self.module.TASKS_FILE, "w") as f:
+            json.dump([self.module.Task(4, "Old", "N/A", "Low").to_dict()], f)
+        self.assertEqual(self.module.TaskManager().next_id, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
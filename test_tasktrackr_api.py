@@ -0,0 +1,66 @@
+import unittest
+import json
+import asyncio
+import threading
+import http.client
+
+from tasktrackr_api import TaskApi
+from test_tasktrackr_final import TempDirTestCase
+
+
+class TestTaskApi(TempDirTestCase):#Runs the API on a free localhost port for each test
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.api = TaskApi("json")
+        self.server = self.loop.run_until_complete(self.api.start("127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+        self.api.writer.shutdown()
+
+    def request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        return response.status, json.loads(data) if data else None, response.getheader("ETag")
+
+    def test_crud(self):
+        status, task, _ = self.request("POST", "/tasks", {"title": "Write report", "due": "2025-05-01"})
+        self.assertEqual((status, task["id"]), (201, 1))
+        self.request("POST", "/tasks", {"title": "Email team"})
+        self.assertEqual(self.request("POST", "/tasks/1/complete")[1]["completed"], True)
+        self.assertEqual(self.request("PATCH", "/tasks/2", {"priority": "High"})[1]["priority"], "High")
+        status, tasks, _ = self.request("GET", "/tasks?status=pending")
+        self.assertEqual([t["title"] for t in tasks], ["Email team"])
+        self.assertEqual(self.request("DELETE", "/tasks/2")[0], 200)
+        self.assertEqual(self.request("GET", "/tasks/2")[0], 404)
+        status, organized, _ = self.request("GET", "/organize")
+        self.assertEqual([t["title"] for t in organized["Overdue"]], ["Write report"])
+
+    def test_conditional_get(self):
+        self.request("POST", "/tasks", {"title": "Write report"})
+        status, _, etag = self.request("GET", "/tasks")
+        self.assertEqual(self.request("GET", "/tasks", headers={"If-None-Match": etag})[0], 304)
+        self.request("POST", "/tasks/1/complete")
+        status, tasks, new_etag = self.request("GET", "/tasks", headers={"If-None-Match": etag})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(new_etag, etag)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.request("POST", "/tasks", {})[0], 400)
+        self.assertEqual(self.request("POST", "/tasks/9/complete")[0], 404)
+        self.assertEqual(self.request("PUT", "/tasks/1", {})[0], 405)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1275 @@
+import unittest
+import os
+import json
+import tempfile
+from datetime import date, timedelta
+import io
+import time
+import threading
+import contextlib
+import fcntl
+import multiprocessing
+import shutil
+import socket
+from unittest.mock import patch
+
+from tasktrackr_final import Task, Priority, TaskManager, TaskDaemon, iter_tasks_file, run_batch, forward_to_daemon, main, create_manager, SqliteTaskManager, ShardedTaskManager, BinaryTaskManager, BinaryTaskFile, convert_tasks, TASKS_FILE, JOURNAL_FILE, DB_FILE, SEARCH_INDEX_FILE, LOCK_FILE, SHARD_DIR, BINARY_FILE, ARCHIVE_FILE, LockTimeout, append_archive, iter_archive, read_tasks_file, map_chunks, parse_import_chunk, migrate_tasks, parse_recurrence, ReminderScheduler, SearchIndex
+
+
+class TestTask(unittest.TestCase):
+    def test_dict_round_trip(self):
+        data = {"id": 1, "title": "Write report", "due_date": "2025-05-01", "priority": "High", "completed": True}
+        task = Task.from_dict(data)
+        self.assertEqual(task.to_dict(), data)
+        self.assertFalse(hasattr(task, "__dict__"))
+
+    def test_priorities_share_one_string(self):
+        first = Task.from_dict(json.loads('{"id": 1, "title": "a", "due_date": "N/A", "priority": "High", "completed": false}'))
+        second = Task.from_dict(json.loads('{"id": 2, "title": "b", "due_date": "N/A", "priority": "High", "completed": false}'))
+        self.assertIs(first.priority, second.priority)
+
+    def test_due_dates_are_normalized(self):
+        for typed in ["2025-04-27", "04/27/2025", "04-27-2025", "2025/04/27"]:
+            task = Task(1, "Finish project", typed, "High")
+            self.assertEqual(task.due_date, "2025-04-27")
+            self.assertEqual(task.due_ordinal, date(2025, 4, 27).toordinal())
+        self.assertEqual(Task(1, "a", "", "Low").due_date, "N/A")
+        self.assertIsNone(Task(1, "a", "32/13/9999", "Low").due_ordinal)
+
+
+class TempDirTestCase(unittest.TestCase):#Every test runs in its own empty directory
+    def setUp(self):
+        old_cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        # Cleanups run after the subclass tearDown, once it has closed what it opened.
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(os.chdir, old_cwd)
+
+
+class TestTaskManager(TempDirTestCase):#Add, complete and delete, saved to tasks.json
+    def setUp(self):
+        super().setUp()
+        self.manager = TaskManager()
+
+    def test_add_task(self):
+        self.manager.add_task("finish quiz", "05/01/2025", "Medium")
+        self.assertEqual(len(self.manager.tasks), 1)
+        self.assertEqual(TaskManager().tasks[0].title, "finish quiz")
+
+    def test_complete_task(self):
+        self.manager.add_task("Review Python notes", "05/02/2025", "High")
+        self.manager.complete_task(1)
+        self.assertTrue(TaskManager().tasks[0].completed)
+
+    def test_delete_task(self):
+        self.manager.add_task("Delete old math homework", "04/29/2025", "Low")
+        self.manager.delete_task(1)
+        self.assertEqual(len(TaskManager().tasks), 0)
+
+    def test_ids_are_not_reused(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.add_task("Email team", "05/02/2025", "Low")
+        self.manager.delete_task(2)
+        manager = TaskManager()
+        manager.add_task("Book room", "05/03/2025", "Low")
+        self.assertEqual([t.id for t in manager.tasks], [1, 3])
+        self.assertIs(manager.find_task(3), manager.tasks[1])
+
+    def test_loads_plain_list_snapshot(self):
+        with open(TASKS_FILE, "w") as f:
+            json.dump([{"id": 4, "title": "Old", "due_date": "N/A", "priority": "Low", "completed": False}], f)
+        manager = TaskManager()
+        self.assertEqual(manager.find_task(4).title, "Old")
+        self.assertEqual(manager.generate_task_id(), 5)
+
+
+def add_from_process(storage, count):
+    manager = create_manager(storage)
+    manager.quiet = True
+    for i in range(count):
+        manager.add_task(f"Task {os.getpid()}-{i}", "N/A", "Low")
+        # Loading again on every add keeps this manager's copy stale most of the time.
+        manager.tasks_by_id = None
+
+
+class TestConcurrentWriters(TempDirTestCase):#Several processes writing the same files
+    def remove_files(self):
+        for path in (TASKS_FILE, JOURNAL_FILE, LOCK_FILE, BINARY_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(SHARD_DIR, ignore_errors=True)
+
+    def test_stale_manager_rebases_its_changes(self):
+        for storage in ("json", "journal", "sharded", "binary"):
+            with self.subTest(storage=storage):
+                self.remove_files()
+                create_manager(storage).add_task("Shared", "N/A", "Low")
+                stale = create_manager(storage)
+                stale.ensure_loaded()
+                stale.find_task(1)
+                other = create_manager(storage)
+                other.add_task("Theirs", "N/A", "Low")
+                other.update_task(1, priority="High")
+                with stale.batch():
+                    mine = stale.add_task("Mine", "N/A", "Low")
+                    stale.update_task(mine.id, title="Mine, renamed")
+                    stale.complete_task(1)
+                self.assertEqual(mine.id, 3)
+                tasks = {t.id: t for t in create_manager(storage).tasks}
+                self.assertEqual([tasks[i].title for i in sorted(tasks)], ["Shared", "Theirs", "Mine, renamed"])
+                self.assertTrue(tasks[1].completed)
+                self.assertEqual(tasks[1].priority, "High")
+
+    def test_reader_sees_other_processes_writes(self):
+        for storage in ("json", "journal", "sharded", "binary", "sqlite"):
+            with self.subTest(storage=storage):
+                self.remove_files()
+                if os.path.exists(DB_FILE):
+                    os.remove(DB_FILE)
+                reader = create_manager(storage)
+                reader.add_task("Mine", "N/A", "Low")
+                before = reader.reload_if_changed()
+                self.assertEqual([t.title for t in reader.iter_tasks()], ["Mine"])
+                self.assertEqual(reader.reload_if_changed(), before)
+                create_manager(storage).add_task("Theirs", "N/A", "Low")
+                self.assertNotEqual(reader.reload_if_changed(), before)
+                self.assertEqual([t.title for t in reader.iter_tasks()], ["Mine", "Theirs"])
+
+    def test_failed_write_leaves_old_file(self):
+        manager = TaskManager()
+        manager.add_task("Keep me", "N/A", "Low")
+        # Fails after the snapshot header is written, leaving a partial temp file.
+        with patch("tasktrackr_final.write_lines", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                manager.add_task("Lost", "N/A", "Low")
+        self.assertEqual([t.title for t in TaskManager().tasks], ["Keep me"])
+        self.assertEqual([name for name in os.listdir() if name.endswith(".tmp")], [])
+
+    def test_lock_wait_is_bounded(self):
+        manager = TaskManager()
+        manager.ensure_loaded()
+        with open(LOCK_FILE, 'a') as held:
+            fcntl.flock(held, fcntl.LOCK_EX)
+            with patch("tasktrackr_final.LOCK_TIMEOUT", 0.05):
+                with self.assertRaises(LockTimeout):
+                    manager.add_task("Blocked", "N/A", "Low")
+
+    def test_processes_do_not_lose_adds(self):
+        context = multiprocessing.get_context("fork")
+        for storage in ("json", "journal", "sqlite", "sharded", "binary"):
+            with self.subTest(storage=storage):
+                self.remove_files()
+                workers = [context.Process(target=add_from_process, args=(storage, 10)) for _ in range(4)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                self.assertEqual([worker.exitcode for worker in workers], [0] * len(workers))
+                ids = [t.id for t in create_manager(storage).tasks]
+                self.assertEqual(sorted(ids), list(range(1, 41)))
+
+
+class TestOrganize(TempDirTestCase):#Buckets come from the sorted due-date index
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        self.manager = TaskManager()
+        self.manager.add_task("Later", (today + timedelta(days=10)).isoformat(), "Low")
+        self.manager.add_task("Overdue", (today - timedelta(days=1)).strftime("%m/%d/%Y"), "Low")
+        self.manager.add_task("Today", today.strftime("%m-%d-%Y"), "Low")
+        self.manager.add_task("None", "N/A", "Low")
+        self.manager.add_task("Invalid", "32/13/9999", "Low")
+        self.manager.add_task("Moved", "N/A", "Low")
+
+    def titles(self, organized):
+        return {category: [t.title for t in tasks] for category, tasks in organized.items()}
+
+    def test_buckets(self):
+        self.manager.update_task(6, due_date=(date.today() - timedelta(days=5)).isoformat())
+        self.manager.delete_task(1)
+        organized = self.titles(self.manager.organize_tasks())
+        self.assertEqual(organized["Overdue"], ["Moved", "Overdue"])
+        self.assertEqual(organized["Due Today"], ["Today"])
+        self.assertEqual(organized["Due Later"], [])
+        self.assertEqual(organized["No Due Date"], ["None"])
+        self.assertEqual(organized["Invalid Dates"], ["Invalid"])
+
+    def test_streamed_and_indexed_buckets_agree(self):
+        streamed = {c: sorted(t) for c, t in self.titles(TaskManager().organize_tasks()).items()}
+        indexed = {c: sorted(t) for c, t in self.titles(self.manager.organize_tasks()).items()}
+        self.assertEqual(streamed, indexed)
+
+
+class TestStreaming(TempDirTestCase):#Read-only commands stream tasks.json instead of loading it
+    def setUp(self):
+        super().setUp()
+        manager = TaskManager()
+        for i in range(1, 51):
+            manager.add_task(f"Task {i} with a \"quoted\" title, [brackets]", "05/01/2025", "Low")
+        manager.complete_task(7)
+
+    def test_stream_matches_full_load(self):
+        streamed = [t.to_dict() for t in iter_tasks_file(TASKS_FILE, chunk_size=16)]
+        self.assertEqual(streamed, [t.to_dict() for t in TaskManager().tasks])
+
+    def test_stream_reads_plain_list_snapshot(self):
+        with open(TASKS_FILE, "w") as f:
+            json.dump([{"id": 4, "title": "Old", "due_date": "N/A", "priority": "Low", "completed": False}], f)
+        self.assertEqual([t.id for t in iter_tasks_file(TASKS_FILE, chunk_size=4)], [4])
+
+    def test_read_only_commands_do_not_load(self):
+        manager = TaskManager()
+        completed = [t.id for t in manager.iter_tasks("completed")]
+        manager.organize_tasks()
+        self.assertEqual(completed, [7])
+        self.assertIsNone(manager.tasks_by_id)
+
+    def test_stream_applies_journal(self):
+        manager = TaskManager(storage="journal")
+        manager.delete_task(1)
+        manager.update_task(2, title="Renamed")
+        manager.add_task("Added", "05/02/2025", "High")
+        streamed = [t.to_dict() for t in TaskManager(storage="journal").iter_tasks()]
+        self.assertEqual(streamed, [t.to_dict() for t in TaskManager(storage="journal").tasks])
+        self.assertEqual(streamed[0]["title"], "Renamed")
+
+
+class TestBatch(TempDirTestCase):#Many operations, one load and one save
+    def run_lines(self, manager, lines, transaction=False):
+        out = io.StringIO()
+        committed = run_batch(manager, lines, transaction=transaction, out=out)
+        return committed, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_saves_once(self):
+        manager = TaskManager()
+        lines = [json.dumps({"op": "add", "title": f"Task {i}", "due": "05/01/2025"}) for i in range(100)]
+        lines.append('{"op": "complete", "id": 100}')
+        with patch.object(manager, "save_tasks", wraps=manager.save_tasks) as save:
+            committed, results = self.run_lines(manager, lines)
+        self.assertTrue(committed)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(results[-1], {"committed": True, "applied": 101, "failed": 0})
+        self.assertTrue(TaskManager().find_task(100).completed)
+
+    def test_failed_op_is_reported_and_others_commit(self):
+        committed, results = self.run_lines(TaskManager(), [
+            '{"op": "add", "title": "Write report"}',
+            '{"op": "delete", "id": 42}',
+            'not json',
+        ])
+        self.assertEqual([r.get("ok") for r in results[:3]], [True, False, False])
+        self.assertEqual(len(TaskManager().tasks), 1)
+
+    def test_wrong_field_types_are_reported(self):
+        committed, results = self.run_lines(TaskManager(), [
+            '{"op": "add", "title": "Write report", "due": 5}',
+            '{"op": "add", "title": 5}',
+            '[1, 2]',
+            '{"op": "add", "title": "Email team"}',
+        ])
+        self.assertTrue(committed)
+        self.assertEqual([r.get("ok") for r in results[:4]], [False, False, False, True])
+        self.assertEqual(results[0]["error"], "due must be a string, not 5")
+        self.assertEqual([t.title for t in TaskManager().tasks], ["Email team"])
+
+    def test_transaction_rolls_back(self):
+        TaskManager().add_task("Keep me", "05/01/2025", "High")
+        manager = TaskManager(storage="journal")
+        committed, results = self.run_lines(manager, [
+            '{"op": "complete", "id": 1}',
+            '{"op": "add", "title": "Write report"}',
+            '{"op": "update", "id": 9, "title": "Missing"}',
+        ], transaction=True)
+        self.assertFalse(committed)
+        self.assertEqual(results[-1]["committed"], False)
+        self.assertFalse(os.path.exists(JOURNAL_FILE))
+        self.assertEqual([t.completed for t in manager.tasks], [False])
+
+    def test_sqlite_batch_sees_its_own_changes(self):
+        manager = SqliteTaskManager()
+        committed, results = self.run_lines(manager, [
+            '{"op": "add", "title": "Write report"}',
+            '{"op": "complete", "id": 1}',
+        ], transaction=True)
+        self.assertTrue(committed)
+        self.assertTrue(manager.find_task(1).completed)
+        committed, results = self.run_lines(manager, [
+            '{"op": "delete", "id": 1}',
+            '{"op": "delete", "id": 1}',
+        ], transaction=True)
+        self.assertFalse(committed)
+        self.assertIsNotNone(manager.find_task(1))
+        manager.conn.close()
+
+
+class TestListing(TempDirTestCase):#Pages, sort orders and output formats for list
+    def setUp(self):
+        super().setUp()
+        manager = TaskManager()
+        manager.quiet = True
+        with manager.batch():
+            for i, (due, priority) in enumerate([("05/03/2025", "Low"), ("N/A", "High"), ("05/01/2025", "Medium"),
+                                                 ("05/02/2025", "High"), ("someday", "Low")]):
+                manager.add_task(f"Task {i + 1}, part \"{i}\"", due, priority)
+            manager.complete_task(2)
+
+    def ids(self, manager, **options):
+        return [task.id for task in manager.page_tasks(**options)]
+
+    def test_pages_and_sorts(self):
+        SqliteTaskManager().import_json()
+        for manager in (TaskManager(), SqliteTaskManager()):
+            with self.subTest(storage=manager.storage):
+                self.assertEqual(self.ids(manager, offset=1, limit=2), [2, 3])
+                self.assertEqual(self.ids(manager, after_id=3), [4, 5])
+                self.assertEqual(self.ids(manager, status_filter="pending", after_id=1, limit=2), [3, 4])
+                self.assertEqual(self.ids(manager, reverse=True, limit=2), [5, 4])
+                self.assertEqual(self.ids(manager, sort="due"), [3, 4, 1, 2, 5])
+                self.assertEqual(self.ids(manager, sort="due", limit=2, offset=1), [4, 1])
+                self.assertEqual(self.ids(manager, sort="priority", reverse=True), [5, 1, 3, 4, 2])
+
+    def test_formats(self):
+        manager = TaskManager()
+        out = io.StringIO()
+        manager.list_tasks(limit=2, output_format="ndjson", out=out)
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()], [1, 2])
+        out = io.StringIO()
+        manager.list_tasks(status_filter="completed", output_format="csv", out=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            "id,title,due_date,priority,completed",
+            '2,"Task 2, part ""1""",N/A,High,True',
+        ])
+        out = io.StringIO()
+        manager.list_tasks(after_id=4, output_format="table", out=out)
+        self.assertEqual(out.getvalue().splitlines()[1].split(), ["5", "no", "someday", "Low", "Task", "5,", 'part', '"4"'])
+        out = io.StringIO()
+        manager.list_tasks(after_id=5, out=out)
+        self.assertEqual(out.getvalue(), "No tasks found.\n")
+
+    def test_negative_counts_are_refused(self):
+        for argv in (["list", "--limit", "-1"], ["list", "--offset", "-1"], ["search", "task", "--limit", "-1"]):
+            with self.subTest(argv=argv), contextlib.redirect_stderr(io.StringIO()) as err, \
+                    self.assertRaises(SystemExit):
+                main(argv)
+            self.assertIn("must be 0 or more", err.getvalue())
+
+
+class TestNext(TempDirTestCase):#Most urgent pending tasks by priority, then due date
+    def setUp(self):
+        super().setUp()
+        self.manager = TaskManager()
+        self.manager.quiet = True
+        with self.manager.batch():
+            for due, priority in [("05/03/2025", "low"), ("N/A", "High"), ("05/02/2025", "h"),
+                                  ("05/01/2025", "Medium"), ("05/01/2025", "Urgent"), ("05/01/2025", "HIGH")]:
+                self.manager.add_task("Task", due, priority)
+
+    def test_priorities_are_normalized(self):
+        self.assertIs(self.manager.find_task(3).priority, Priority.HIGH)
+        self.assertIs(self.manager.find_task(1).priority, Priority.LOW)
+        self.assertEqual(self.manager.find_task(5).priority, "Urgent")
+        with open(TASKS_FILE) as f:
+            self.assertEqual([t["priority"] for t in json.load(f)["tasks"]][:3], ["Low", "High", "High"])
+
+    def test_order_matches_streaming(self):
+        self.assertEqual([t.id for t in self.manager.next_tasks(10)], [6, 3, 2, 4, 1, 5])
+        self.assertEqual([t.id for t in TaskManager().next_tasks(3)], [6, 3, 2])
+
+    def test_heap_follows_changes(self):
+        self.assertEqual([t.id for t in self.manager.next_tasks(2)], [6, 3])
+        self.manager.complete_task(6)
+        self.manager.update_task(3, priority="Low")
+        self.manager.add_task("Task", "04/30/2025", "High")
+        self.manager.delete_task(2)
+        self.assertEqual([t.id for t in self.manager.next_tasks(3)], [7, 4, 3])
+        self.assertEqual([t.id for t in self.manager.next_tasks(3)], [7, 4, 3])
+
+    def test_cli(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(["next", "--k", "2", "--format", "ndjson"])
+        self.assertEqual([json.loads(line)["id"] for line in out.getvalue().splitlines()], [6, 3])
+
+
+class TestArchive(TempDirTestCase):#Completed tasks move to the gzip archive
+    def setUp(self):
+        super().setUp()
+        self.manager = TaskManager()
+        self.manager.quiet = True
+        with self.manager.batch():
+            for i in range(5):
+                self.manager.add_task(f"Task {i + 1}", "N/A", "Low")
+            for task_id in (1, 2, 3):
+                self.manager.complete_task(task_id)
+            # Completed long ago, and before completion dates were recorded.
+            self.manager.find_task(1).completed_at = (date.today() - timedelta(days=40)).isoformat()
+            self.manager.find_task(2).completed_at = None
+
+    def listed(self, *options):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(["list", "--format", "ndjson", *options])
+        return [json.loads(line)["id"] for line in out.getvalue().splitlines()]
+
+    def test_complete_records_the_date(self):
+        self.assertEqual(TaskManager().find_task(3).completed_at, date.today().isoformat())
+        self.assertIsNone(TaskManager().find_task(4).completed_at)
+
+    def test_archive_by_age_and_count(self):
+        self.assertEqual([t.id for t in self.manager.archive_tasks(days=30)], [2, 1])
+        self.assertEqual([t.id for t in TaskManager().tasks], [3, 4, 5])
+        self.assertEqual([t.id for t in TaskManager().archive_tasks(keep=0)], [3])
+        self.assertEqual([t.id for t in iter_archive()], [2, 1, 3])
+        self.assertEqual(self.listed("--status", "completed"), [])
+        self.assertEqual(self.listed("--status", "completed", "--include-archive"), [2, 1, 3])
+        self.assertEqual(self.listed("--include-archive", "--status", "pending"), [4, 5])
+
+    def test_keep_leaves_the_most_recent(self):
+        self.assertEqual([t.id for t in self.manager.archive_tasks(keep=1)], [2, 1])
+
+    def test_auto_archive_on_save(self):
+        with patch.dict(os.environ, {"TASKTRACKR_ARCHIVE_DAYS": "30"}):
+            TaskManager().add_task("Another", "N/A", "Low")
+        self.assertEqual([t.id for t in TaskManager().tasks], [3, 4, 5, 6])
+        self.assertEqual(self.listed("--include-archive"), [3, 4, 5, 6, 2, 1])
+
+    def test_interrupted_archive_is_not_listed_twice(self):
+        # The archive was written but the process died before deleting the tasks.
+        append_archive([self.manager.find_task(3)])
+        self.assertEqual(self.listed("--include-archive", "--status", "completed"), [1, 2, 3])
+
+    def test_torn_last_member_is_ignored(self):
+        TaskManager().archive_tasks()
+        with open(ARCHIVE_FILE, "ab") as f:
+            f.write(b"\x1f\x8b\x08")
+        self.assertEqual([t.id for t in iter_archive()], [2, 1, 3])
+
+    def test_sqlite(self):
+        SqliteTaskManager().import_json()
+        manager = SqliteTaskManager()
+        manager.quiet = True
+        self.assertEqual([t.id for t in manager.archive_tasks(days=30)], [2, 1])
+        self.assertEqual([t.id for t in manager.iter_tasks("completed")], [3])
+        self.assertEqual(manager.find_task(3).completed_at, date.today().isoformat())
+        self.assertEqual([t.id for t in manager.page_tasks(include_archive=True)], [3, 4, 5, 2, 1])
+        manager.conn.close()
+
+
+class TestImportExport(TempDirTestCase):#Bulk CSV / NDJSON import and export
+    def setUp(self):
+        super().setUp()
+        TaskManager().add_task("Existing", "N/A", "Low")
+        with open("tasks.csv", "w") as f:
+            f.write("title,due_date,priority,completed\n"
+                    "Write report,05/01/2025,high,yes\n"
+                    "Email team,2025-05-02,,\n"
+                    ",2025-05-03,Low,no\n"
+                    "Book room,someday,Low,no\n"
+                    "Plan trip,N/A,Urgent,false\n")
+
+    def run_main(self, argv):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            main(argv)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv_in_one_write(self):
+        with open(LOCK_FILE) as f:
+            writes = int(f.read())
+        out, err = self.run_main(["import", "--file", "tasks.csv"])
+        self.assertIn("Imported 3 tasks", out)
+        self.assertIn("Line 4: missing title", err)
+        self.assertIn("Line 5: invalid due date: someday", err)
+        with open(LOCK_FILE) as f:
+            self.assertEqual(int(f.read()), writes + 1)
+        tasks = TaskManager().tasks
+        self.assertEqual([(t.id, t.title, t.due_date, t.priority, t.completed) for t in tasks[1:]], [
+            (2, "Write report", "2025-05-01", "High", True),
+            (3, "Email team", "2025-05-02", "Medium", False),
+            (4, "Plan trip", "N/A", "Urgent", False),
+        ])
+
+    def test_export_and_import_ndjson(self):
+        self.run_main(["import", "--file", "tasks.csv"])
+        TaskManager().complete_task(3)
+        out, _ = self.run_main(["export", "--file", "all.ndjson"])
+        self.assertIn("Exported 4 tasks", out)
+        os.mkdir("other")
+        os.chdir("other")
+        self.run_main(["--storage", "sqlite", "import", "--file", "../all.ndjson"])
+        manager = SqliteTaskManager()
+        imported = [t.to_dict() for t in manager.iter_tasks()]
+        manager.conn.close()
+        os.chdir("..")
+        self.assertEqual(imported, [t.to_dict() for t in TaskManager().tasks])
+
+    def test_export_csv(self):
+        self.run_main(["export", "--file", "pending.csv", "--status", "pending"])
+        with open("pending.csv") as f:
+            self.assertEqual(f.read(), "id,title,due_date,priority,completed,completed_at,repeat,exceptions\n"
+                                       "1,Existing,N/A,Low,False,,,\n")
+
+    def test_recurring_tasks_round_trip(self):
+        manager = TaskManager()
+        manager.add_task("Standup", "2025-05-05", "High", repeat="daily until 2025-06-30")
+        manager.complete_task(2, on="2025-05-06")
+        expected = [t.to_dict() for t in TaskManager().tasks]
+        for name in ("all.csv", "all.ndjson"):
+            with self.subTest(name=name):
+                out, _ = self.run_main(["export", "--file", name])
+                self.assertIn("Exported 2 tasks", out)
+                os.mkdir(name + ".d")
+                os.chdir(name + ".d")
+                self.run_main(["import", "--file", "../" + name])
+                imported = [t.to_dict() for t in TaskManager().tasks]
+                os.chdir("..")
+                self.assertEqual(imported, expected)
+
+    def test_chunks_in_worker_processes(self):
+        rows = [(n, json.dumps({"title": f"Task {n}", "due": f"05/{n:02d}/2025"})) for n in range(1, 11)]
+        rows.append((11, "{not json"))
+        serial = list(map_chunks(parse_import_chunk, rows, workers=1, chunk_rows=3))
+        parallel = list(map_chunks(parse_import_chunk, rows, workers=2, chunk_rows=3))
+        self.assertEqual(parallel, serial)
+        self.assertEqual([row[1] for rows, _ in parallel for row in rows][:2], ["2025-05-01", "2025-05-02"])
+        self.assertEqual(parallel[-1][1][0][0], 11)
+
+
+class TestLegacyFormat(TempDirTestCase):#Task files written by the first prototypes
+    def setUp(self):
+        super().setUp()
+        with open(TASKS_FILE, "w") as f:
+            json.dump([
+                {"description": "Write report", "status": "complete", "due_date": "05/01/2025"},
+                {"description": "Email team", "status": "incomplete", "due_date": "05-02-2025"},
+                {"description": "Book room", "status": "incomplete", "due_date": "N/A"},
+                {"description": "Plan trip", "status": "incomplete", "due_date": "someday"},
+            ], f, indent=4)
+
+    def expected(self):
+        return [
+            (1, "Write report", "2025-05-01", "Medium", True),
+            (2, "Email team", "2025-05-02", "Medium", False),
+            (3, "Book room", "N/A", "Medium", False),
+            (4, "Plan trip", "someday", "Medium", False),
+        ]
+
+    def fields(self, tasks):
+        return [(t.id, t.title, t.due_date, t.priority, t.completed) for t in tasks]
+
+    def test_loads_and_streams(self):
+        self.assertEqual(self.fields(TaskManager().tasks), self.expected())
+        self.assertEqual(self.fields(TaskManager().iter_tasks()), self.expected())
+
+    def test_first_change_rewrites_in_current_format(self):
+        TaskManager().complete_task(2)
+        with open(TASKS_FILE) as f:
+            data = json.load(f)
+        self.assertEqual([t["id"] for t in data["tasks"]], [1, 2, 3, 4])
+        self.assertTrue(data["tasks"][1]["completed"])
+
+    def test_migrate(self):
+        self.assertEqual(migrate_tasks(TASKS_FILE, "new.json"), 4)
+        self.assertEqual(self.fields(read_tasks_file("new.json")[0]), self.expected())
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["migrate"])
+        with open(TASKS_FILE) as f:
+            self.assertEqual(json.load(f)["next_id"], 5)
+        manager = TaskManager()
+        manager.quiet = True
+        self.assertEqual(manager.add_task("Another", "N/A", "Low").id, 5)
+
+    def test_mixed_file_keeps_ids_apart(self):
+        with open(TASKS_FILE, "w") as f:
+            json.dump([
+                {"description": "Old", "status": "incomplete", "due_date": "N/A"},
+                {"id": 1, "title": "Current", "due_date": "N/A", "priority": "Low", "completed": False},
+                {"id": 7, "title": "Later", "due_date": "N/A", "priority": "Low", "completed": False},
+                {"description": "Older", "status": "incomplete", "due_date": "N/A"},
+            ], f)
+        expected = [(8, "Old"), (1, "Current"), (7, "Later"), (9, "Older")]
+        self.assertEqual([(t.id, t.title) for t in TaskManager().tasks], expected)
+        self.assertEqual([(t.id, t.title) for t in TaskManager().iter_tasks()], expected)
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["migrate"])
+        self.assertEqual([(t.id, t.title) for t in read_tasks_file(TASKS_FILE)[0]], expected)
+
+    def test_migrate_in_place_keeps_next_id(self):
+        manager = TaskManager()
+        manager.quiet = True
+        manager.complete_task(1)
+        manager.delete_task(4)
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(["migrate"])
+        with open(TASKS_FILE) as f:
+            self.assertEqual(json.load(f)["next_id"], 5)
+        manager = TaskManager()
+        manager.quiet = True
+        self.assertEqual(manager.add_task("Another", "N/A", "Low").id, 5)
+
+
+class TestStats(TempDirTestCase):#Counters kept current by every change and saved with the tasks
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+
+    def day(self, offset):
+        return (self.today + timedelta(days=offset)).isoformat()
+
+    def make_changes(self, manager):
+        manager.quiet = True
+        manager.add_task("Overdue", self.day(-2), "High")
+        manager.add_task("Today", self.day(0), "low")
+        manager.add_task("Undated", "N/A", "Medium")
+        manager.add_task("Someday", "someday", "Urgent")
+        manager.add_task("Standup", self.day(-1), "Medium", "daily")
+        manager.complete_task(2)
+        manager.update_task(3, due_date=self.day(400), priority="High")
+        manager.delete_task(4)
+
+    def test_every_storage_agrees_with_a_recount(self):
+        expected = {
+            "pending": 3, "completed": 1, "completion_rate": 0.25,
+            "priorities": {"High": {"pending": 2, "completed": 0}, "Medium": {"pending": 1, "completed": 0},
+                           "Low": {"pending": 0, "completed": 1}},
+            "due": {"Overdue": 1, "Due Today": 0, "Due This Week": 0, "Due Later": 1, "No Due Date": 0,
+                    "Invalid Dates": 0, "Recurring": 1},
+        }
+        for storage in ("json", "journal", "sqlite", "sharded", "binary"):
+            with self.subTest(storage=storage):
+                for name in os.listdir():
+                    shutil.rmtree(name) if os.path.isdir(name) else os.remove(name)
+                manager = create_manager(storage)
+                self.make_changes(manager)
+                self.assertEqual(manager.stats(), expected)
+                self.assertEqual(create_manager(storage).stats(), expected)
+
+    def test_read_from_the_end_of_tasks_json(self):
+        self.make_changes(TaskManager())
+        with patch("tasktrackr_final.iter_tasks_file", side_effect=AssertionError), \
+                patch("tasktrackr_final.read_tasks_file", side_effect=AssertionError):
+            self.assertEqual(TaskManager().stats()["pending"], 3)
+        # A file saved without counters, such as a migrated one, is counted instead.
+        migrate_tasks(TASKS_FILE, "plain.json")
+        os.replace("plain.json", TASKS_FILE)
+        manager = TaskManager()
+        self.assertEqual(manager.stats()["pending"], 3)
+        manager.complete_task(1)
+        with open(TASKS_FILE) as f:
+            self.assertEqual(json.load(f)["counters"]["priorities"]["High"], [1, 1])
+
+    def test_sqlite_and_binary_read_no_task(self):
+        expected = {"High": {"pending": 2, "completed": 0}, "Medium": {"pending": 1, "completed": 0},
+                    "Low": {"pending": 0, "completed": 1}}
+        manager = create_manager("sqlite")
+        self.make_changes(manager)
+        # Rows changed behind the manager's back leave the counters in meta as they were.
+        manager.conn.execute("UPDATE tasks SET priority = 'Low'")
+        self.assertEqual(manager.stats()["priorities"], expected)
+        manager.conn.rollback()
+        self.make_changes(BinaryTaskManager())
+        with patch.object(BinaryTaskFile, "task_at", side_effect=AssertionError):
+            self.assertEqual(BinaryTaskManager().stats()["priorities"], expected)
+
+    def test_sqlite_import_recounts(self):
+        json_manager = TaskManager()
+        self.make_changes(json_manager)
+        manager = create_manager("sqlite")
+        manager.quiet = True
+        manager.add_task("Replaced by the import", "N/A", "Low")
+        manager.import_json(TASKS_FILE)
+        self.assertEqual(manager.stats(), json_manager.stats())
+
+    def test_buckets_are_summed_once_a_day(self):
+        manager = TaskManager()
+        self.make_changes(manager)
+        counters = manager.task_counters()
+        self.assertEqual(counters.due_buckets()["Overdue"], 1)
+        manager.add_task("Yesterday", self.day(-1), "Low")
+        self.assertEqual(counters.due_buckets()["Overdue"], 2)
+        counters.due[self.day(1)] = 5
+        self.assertEqual(counters.due_buckets()["Overdue"], 2)
+        # The next day the dates are bucketed again.
+        counters.day -= 1
+        buckets = counters.due_buckets()
+        self.assertEqual(buckets["Due Later"] + buckets["Due This Week"], 6)
+
+    def test_cli(self):
+        self.make_changes(TaskManager())
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            main(["stats"])
+            main(["stats", "--format", "json"])
+        lines = out.getvalue().splitlines()
+        self.assertIn("Completion rate: 25.0%", lines)
+        self.assertIn("  High: 2 pending, 0 completed", lines)
+        self.assertEqual(json.loads(lines[-1])["due"]["Recurring"], 1)
+
+
+class TestRecurring(TempDirTestCase):#Rules stored once, occurrences generated for the dates asked about
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+
+    def day(self, offset):
+        return (self.today + timedelta(days=offset)).isoformat()
+
+    def add_standup(self, manager):
+        manager.quiet = True
+        manager.add_task("Standup", self.day(-3), "Medium", "daily")
+        manager.add_task("Release", self.day(1), "High")
+
+    def test_rules(self):
+        self.assertEqual(str(parse_recurrence("Every 2 weeks until 2025-06-30")), "every 2 weeks until 2025-06-30")
+        self.assertEqual(str(parse_recurrence("every 1 day")), "daily")
+        with self.assertRaises(ValueError):
+            parse_recurrence("fortnightly")
+        start = date(2025, 1, 31).toordinal()
+        months = parse_recurrence("monthly").ordinals(start, start, date(2025, 4, 30).toordinal())
+        self.assertEqual([date.fromordinal(o).isoformat() for o in months],
+                         ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"])
+        days = parse_recurrence("every 3 days until 2025-01-10").ordinals(date(2025, 1, 1).toordinal(),
+                                                                          date(2025, 1, 5).toordinal(), start)
+        self.assertEqual([date.fromordinal(o).day for o in days], [7, 10])
+
+    def test_needs_due_date(self):
+        with self.assertRaises(ValueError):
+            TaskManager().add_task("Standup", "N/A", "Medium", "daily")
+
+    def test_completing_stores_only_an_exception(self):
+        manager = TaskManager()
+        self.add_standup(manager)
+        self.assertEqual(manager.complete_task(1).due_date, self.day(-3))
+        manager.update_task(1, title="Standup (offsite)", on=self.day(0))
+        with open(TASKS_FILE) as f:
+            stored = json.load(f)["tasks"]
+        self.assertEqual(len(stored), 2)
+        self.assertEqual(stored[0]["repeat"], "daily")
+        self.assertEqual(set(stored[0]["exceptions"]), {self.day(-3), self.day(0)})
+
+        for reopened in (TaskManager(), create_manager("sqlite"), create_manager("sharded"), create_manager("binary")):
+            with self.subTest(storage=reopened.storage):
+                if reopened.storage != "json":
+                    reopened.import_json() if reopened.storage != "binary" else convert_tasks("binary")
+                occurrences = [t for t in reopened.page_tasks() if t.id == 1]
+                self.assertEqual(len(occurrences), 11)
+                self.assertEqual([t.due_date for t in occurrences if t.completed], [self.day(-3)])
+                self.assertEqual(occurrences[3].title, "Standup (offsite)")
+                self.assertEqual([t.due_date for t in reopened.page_tasks("completed")], [self.day(-3)])
+                self.assertEqual(reopened.lookup_task(1).exceptions, stored[0]["exceptions"])
+
+    def test_next_and_organize_include_occurrences(self):
+        manager = TaskManager()
+        self.add_standup(manager)
+        manager.complete_task(1, on=self.day(-3))
+        for current in (manager, TaskManager()):
+            self.assertEqual([(t.id, t.due_date) for t in current.next_tasks(3)],
+                             [(2, self.day(1)), (1, self.day(-2)), (1, self.day(-1))])
+            organized = current.organize_tasks()
+            self.assertEqual([t.due_date for t in organized["Overdue"]], [self.day(-3), self.day(-2), self.day(-1)])
+            self.assertEqual([t.id for t in organized["Due Today"]], [1])
+        window = [t.due_date for t in manager.page_tasks(window=(self.day(30), self.day(32)))]
+        self.assertEqual(window, [self.day(30), self.day(31), self.day(32), self.day(1)])
+
+    def test_cli(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(["add", "--title", "Review", "--due", self.day(0), "--repeat", "weekly", "--until", self.day(14)])
+            main(["add", "--title", "Review", "--due", "someday", "--repeat", "weekly"])
+            main(["complete", "--id", "1", "--on", self.day(7)])
+            main(["list", "--status", "completed", "--to", self.day(30)])
+        lines = out.getvalue().splitlines()
+        self.assertIn("❌", lines[1])
+        self.assertEqual(lines[-1], f"[1] ✓ Review (Due: {self.day(7)}, Priority: Medium)")
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            main(["show", "--id", "1"])
+        self.assertIn(f"Repeats: weekly until {self.day(14)}", out.getvalue())
+
+
+class TestSearch(TempDirTestCase):#Word index over task titles
+    def add_tasks(self, manager):
+        with manager.batch():
+            manager.add_task("Write quarterly report", "05/01/2025", "High")
+            manager.add_task("Review report draft", "05/02/2025", "Medium")
+            manager.add_task("Water the plants", "N/A", "Low")
+
+    def ids(self, manager, query):
+        return [task.id for task in manager.search(query)]
+
+    def test_words_prefixes_and_and(self):
+        manager = TaskManager()
+        self.add_tasks(manager)
+        self.assertEqual(self.ids(manager, "report"), [1, 2])
+        self.assertEqual(self.ids(manager, "REPORT review"), [2])
+        self.assertEqual(self.ids(manager, "wr*"), [1])
+        self.assertEqual(self.ids(manager, "w* report"), [1])
+        self.assertEqual(self.ids(manager, "rep"), [])
+        self.assertEqual(self.ids(manager, ""), [])
+
+    def test_index_is_saved_and_kept_current(self):
+        for storage in ("json", "journal"):
+            with self.subTest(storage=storage):
+                for path in (TASKS_FILE, JOURNAL_FILE, SEARCH_INDEX_FILE):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self.add_tasks(TaskManager(storage=storage))
+                self.assertEqual(self.ids(TaskManager(storage=storage), "report"), [1, 2])
+                self.assertTrue(os.path.exists(SEARCH_INDEX_FILE))
+                manager = TaskManager(storage=storage)
+                manager.update_task(2, title="Review slides")
+                manager.delete_task(1)
+                manager.add_task("Print report", "N/A", "Low")
+                manager = TaskManager(storage=storage)
+                with patch.object(manager, "stream_tasks", wraps=manager.stream_tasks) as stream:
+                    self.assertEqual([t.title for t in manager.search("report")], ["Print report"])
+                self.assertEqual(stream.call_count, 0)
+                self.assertEqual(self.ids(manager, "slides"), [2])
+
+    def test_outdated_tasks_are_reread(self):
+        self.add_tasks(TaskManager())
+        stale = TaskManager()
+        stale.ensure_loaded()
+        TaskManager().add_task("Print report", "N/A", "Low")
+        self.assertEqual(self.ids(stale, "report"), [1, 2, 4])
+        self.assertEqual(self.ids(TaskManager(), "report"), [1, 2, 4])
+
+    def test_writes_update_only_changed_tasks(self):
+        for storage in ("json", "journal", "sharded", "binary"):
+            with self.subTest(storage=storage):
+                os.mkdir(storage)
+                os.chdir(storage)
+                self.add_tasks(create_manager(storage))
+                self.assertEqual(self.ids(create_manager(storage), "report"), [1, 2])
+                manager = create_manager(storage)
+                manager.quiet = True
+                with patch.object(SearchIndex, "put", autospec=True, side_effect=SearchIndex.put) as put:
+                    manager.update_task(2, title="Review slides")
+                    manager.delete_task(1)
+                self.assertEqual([call.args[1] for call in put.call_args_list], [2, 1])
+                with patch.object(SearchIndex, "rebuild") as rebuild:
+                    self.assertEqual([t.title for t in create_manager(storage).search("rev* sl*")], ["Review slides"])
+                    self.assertEqual(self.ids(create_manager(storage), "report"), [])
+                rebuild.assert_not_called()
+                os.chdir("..")
+
+    def test_stale_index_is_rebuilt(self):
+        self.add_tasks(TaskManager())
+        self.assertEqual(self.ids(TaskManager(), "plants"), [3])
+        with open(TASKS_FILE, 'w') as f:
+            json.dump([{"id": 7, "title": "Repot the plants", "due_date": "N/A", "priority": "Low", "completed": False}], f)
+        self.assertEqual(self.ids(TaskManager(), "plants"), [7])
+
+    def test_sqlite_search(self):
+        self.add_tasks(TaskManager())
+        manager = SqliteTaskManager()
+        manager.import_json()
+        self.assertEqual(self.ids(manager, "rep* r*"), [1, 2])
+        manager.update_task(1, title="Write summary")
+        manager.delete_task(2)
+        self.assertEqual(self.ids(manager, "report"), [])
+        self.assertEqual(self.ids(manager, "summ*"), [1])
+        manager.conn.close()
+
+
+class TestMetrics(TempDirTestCase):#--metrics reports each phase of a CLI run
+    def setUp(self):
+        super().setUp()
+        manager = TaskManager()
+        with manager.batch():
+            for i in range(20):
+                manager.add_task(f"Task {i}", "05/01/2025", "Medium")
+
+    def run_main(self, argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(argv)
+        return out.getvalue()
+
+    def test_writes_one_line_per_run(self):
+        self.run_main(["--metrics-file", "metrics.jsonl", "complete", "--id", "3"])
+        output = self.run_main(["--metrics-file", "metrics.jsonl", "list"])
+        self.assertIn("Task 19", output)
+        with open("metrics.jsonl") as f:
+            complete, listed = [json.loads(line) for line in f]
+        self.assertEqual(complete["command"], "complete")
+        for phase in ("import", "argparse", "load_tasks", "operation", "save_tasks"):
+            self.assertIn(phase, complete["phases"])
+        # The 20 tasks go out in one buffered write.
+        self.assertEqual(listed["phases"]["output"]["calls"], 1)
+        self.assertAlmostEqual(listed["total_seconds"], sum(p["seconds"] for p in listed["phases"].values()), places=4)
+
+    def test_metrics_go_to_stderr(self):
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            self.run_main(["--metrics", "--storage", "journal", "delete", "--id", "1"])
+        self.assertEqual(json.loads(err.getvalue())["storage"], "journal")
+
+    def test_profile_dump(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.run_main(["--profile", "list.prof", "list", "--limit", "1"])
+        self.assertGreater(os.path.getsize("list.prof"), 0)
+
+
+class TestDaemon(TempDirTestCase):#CLI commands forwarded to a resident TaskManager
+    def setUp(self):
+        super().setUp()
+        TaskManager().add_task("Write report", "05/01/2025", "High")
+        self.daemon = TaskDaemon(flush_interval=60)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.thread = threading.Thread(target=self.daemon.serve)
+            self.thread.start()
+            while self.daemon.server is None:
+                time.sleep(0.01)
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.send(["stop"])
+            self.thread.join()
+
+    def send(self, argv, stdin=None):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertTrue(forward_to_daemon(argv, stdin=stdin))
+        return output.getvalue()
+
+    def test_commands_run_in_the_daemon_and_flush_on_stop(self):
+        self.assertIn("Task added", self.send(["add", "--title", "Email team", "--due", "N/A"]))
+        self.send(["complete", "--id", "1"])
+        self.assertIn("[1] ✓ Write report", self.send(["list"]))
+        self.assertFalse(TaskManager().find_task(1).completed)
+        self.send(["stop"])
+        self.thread.join()
+        self.assertTrue(TaskManager().find_task(1).completed)
+        self.assertFalse(forward_to_daemon(["list"]))
+
+    def test_other_storage_is_refused(self):
+        with contextlib.redirect_stderr(io.StringIO()) as err, self.assertRaises(SystemExit):
+            main(["--storage", "sqlite", "add", "--title", "Email team", "--due", "N/A"])
+        self.assertIn("serves json storage", err.getvalue())
+        self.assertNotIn("Email team", self.send(["list"]))
+        self.assertFalse(os.path.exists(DB_FILE))
+
+    def test_other_writers_are_picked_up(self):
+        self.assertIn("Write report", self.send(["list"]))
+        with contextlib.redirect_stdout(io.StringIO()):
+            TaskManager().add_task("Email team", "N/A", "Low")
+        self.assertIn("[2] ✗ Email team", self.send(["list"]))
+        self.send(["add", "--title", "Book room", "--due", "N/A"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            TaskManager().add_task("Plan trip", "N/A", "Low")
+        # Our own change is still waiting, so it is rebased on the flush instead.
+        self.assertNotIn("Plan trip", self.send(["list"]))
+        self.daemon.flush()
+        self.assertEqual([t.title for t in TaskManager().tasks], ["Write report", "Email team", "Plan trip", "Book room"])
+        self.assertIn("Plan trip", self.send(["list"]))
+
+    def test_batch_and_prompts_are_relayed(self):
+        output = self.send(["batch"], stdin='{"op": "add", "title": "Email team"}\n')
+        self.assertIn('"committed": true', output)
+        with patch("builtins.input", return_value="yes") as prompt:
+            self.send(["progress", "--id", "2"])
+        self.assertIn("Email team", prompt.call_args[0][0])
+        self.daemon.flush()
+        self.assertTrue(TaskManager().find_task(2).completed)
+
+
+class TestReminders(TempDirTestCase):#A heap of due times kept current by each commit, no polling
+    def setUp(self):
+        super().setUp()
+        self.today = date.today()
+        self.manager = TaskManager()
+        self.manager.quiet = True
+        self.manager.add_task("Later", self.day(1), "Low")
+        self.manager.add_task("Overdue", self.day(-1), "Low")
+        self.out = io.StringIO()
+        # Reminding at midnight makes everything due today due now.
+        self.reminders = ReminderScheduler(self.manager, threading.Lock(), at="00:00", out=self.out)
+
+    def tearDown(self):
+        self.reminders.stop()
+
+    def day(self, offset):
+        return (self.today + timedelta(days=offset)).isoformat()
+
+    def wait_for(self, text):
+        deadline = time.monotonic() + 5
+        while text not in self.out.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.out.getvalue()
+
+    def test_changes_reach_the_heap(self):
+        self.reminders.start()
+        self.assertEqual([entry[1] for entry in self.reminders.heap], [1])
+        # Commands run under the daemon's lock, so a reminder cannot fire in between.
+        with self.reminders.lock:
+            self.manager.add_task("Skipped", self.day(0), "Low")
+            self.manager.complete_task(3)
+            self.manager.update_task(1, due_date=self.day(0))
+        self.assertIn("[1] Later", self.wait_for("[1] Later"))
+        self.manager.add_task("Standup", self.day(-2), "High", "daily")
+        output = self.wait_for(f"Due {self.day(0)}: [4] Standup")
+        self.assertNotIn("Skipped", output)
+        self.assertNotIn("Overdue", output)
+        # The next occurrence is queued once today's has been reminded about.
+        self.assertIn((4, self.today.toordinal() + 1), [entry[1:] for entry in self.reminders.heap])
+        self.manager.update_task(1, title="Later, renamed")
+        self.assertEqual(self.out.getvalue().count("Later"), 1)
+
+    def test_hook_and_socket(self):
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind("notify.sock")
+        listener.listen()
+        self.reminders.hook = "cat > hook.json"
+        self.reminders.notify_socket = "notify.sock"
+        self.reminders.deliver(self.manager.find_task(1))
+        with listener, listener.accept()[0] as conn:
+            self.assertEqual(json.loads(conn.makefile().readline())["title"], "Later")
+        with open("hook.json") as f:
+            self.assertEqual(json.load(f)["id"], 1)
+
+
+class TestShardedStorage(TempDirTestCase):#One file per status and due month under tasks.d
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        self.dues = [today - timedelta(days=40), today, today + timedelta(days=60), "N/A", "someday"]
+        manager = TaskManager()
+        manager.quiet = True
+        with manager.batch():
+            for i, due in enumerate(self.dues * 4):
+                manager.add_task(f"Task {i + 1}", str(due), "Medium")
+            for task_id in (1, 2, 3):
+                manager.complete_task(task_id)
+        manager = ShardedTaskManager()
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.import_json()
+
+    def test_import_matches_json(self):
+        sharded = [t.to_dict() for t in ShardedTaskManager().tasks]
+        self.assertEqual(sharded, [t.to_dict() for t in TaskManager().tasks])
+        # Three dated months plus undated and invalid for pending tasks, the three
+        # dated months again for completed ones, one id block and the manifest.
+        self.assertEqual(len(os.listdir(SHARD_DIR)), 10)
+        self.assertIn("pending-undated.json", os.listdir(SHARD_DIR))
+
+    def test_import_again_replaces_tasks(self):
+        TaskManager().complete_task(5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ShardedTaskManager().import_json()
+        manager = ShardedTaskManager()
+        self.assertEqual(manager.count_tasks(), {"pending": 16, "completed": 4})
+        self.assertEqual(manager.stats()["pending"], 16)
+        self.assertEqual([t.to_dict() for t in manager.tasks], [t.to_dict() for t in TaskManager().tasks])
+
+    def test_pending_list_reads_only_pending_shards(self):
+        with patch("tasktrackr_final.iter_tasks_file", wraps=iter_tasks_file) as stream:
+            pending = list(ShardedTaskManager().iter_tasks("pending"))
+        self.assertEqual(len(pending), 17)
+        self.assertTrue(all(os.path.basename(call.args[0]).startswith("pending-") for call in stream.call_args_list))
+
+    def test_complete_rewrites_only_two_shards(self):
+        before = {name: os.stat(os.path.join(SHARD_DIR, name)).st_mtime_ns for name in os.listdir(SHARD_DIR)}
+        time.sleep(0.01)
+        manager = ShardedTaskManager()
+        task = manager.complete_task(20)
+        after = {name: os.stat(os.path.join(SHARD_DIR, name)).st_mtime_ns for name in os.listdir(SHARD_DIR)}
+        changed = sorted(name for name in after if before.get(name) != after[name])
+        self.assertEqual(changed, ["completed-invalid.json", "ids-0.json", "manifest.json", "pending-invalid.json"])
+        self.assertTrue(ShardedTaskManager().find_task(20).completed)
+        self.assertEqual(task.id, 20)
+
+    def test_crud_and_organize(self):
+        manager = ShardedTaskManager()
+        task = manager.add_task("Added", "N/A", "High")
+        manager.update_task(task.id, due_date=date.today().isoformat())
+        manager.delete_task(5)
+        expected = TaskManager()
+        expected.add_task("Added", date.today().isoformat(), "High")
+        expected.delete_task(5)
+        organized = ShardedTaskManager().organize_tasks()
+        for category, tasks in expected.organize_tasks().items():
+            self.assertEqual(sorted(t.id for t in organized[category]), sorted(t.id for t in tasks), category)
+
+
+class TestBinaryStorage(TempDirTestCase):#Fixed-width records in tasks.bin, read through mmap
+    def setUp(self):
+        super().setUp()
+        manager = TaskManager()
+        manager.quiet = True
+        with manager.batch():
+            manager.add_task("Write report", "05/01/2025", "High")
+            manager.add_task("Café ☕ run", "N/A", "Urgent")
+            manager.add_task("Someday", "after exams", "Low")
+            manager.add_task("Gone", "N/A", "Low")
+            manager.complete_task(1)
+            manager.delete_task(4)
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_tasks("binary")
+
+    def test_round_trip(self):
+        expected = [t.to_dict() for t in TaskManager().tasks]
+        self.assertEqual([t.to_dict() for t in BinaryTaskManager().tasks], expected)
+        os.remove(TASKS_FILE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_tasks("json")
+        manager = TaskManager()
+        self.assertEqual([t.to_dict() for t in manager.tasks], expected)
+        self.assertEqual(manager.next_id, 5)
+        self.assertLess(os.path.getsize(BINARY_FILE), os.path.getsize(TASKS_FILE))
+
+    def test_lookup_and_count_do_not_load(self):
+        manager = BinaryTaskManager()
+        with patch.object(manager, "load_tasks") as load:
+            self.assertEqual(manager.lookup_task(2).title, "Café ☕ run")
+            self.assertIsNone(manager.lookup_task(4))
+            self.assertEqual(manager.count_tasks(), {"pending": 2, "completed": 1})
+        load.assert_not_called()
+        with BinaryTaskFile(BINARY_FILE) as view:
+            self.assertEqual([view.ids[i] for i in range(len(view))], [1, 2, 3])
+
+    def test_changes_are_saved(self):
+        manager = BinaryTaskManager()
+        task = manager.add_task("New", "2025-06-01", "Medium")
+        manager.update_task(3, due_date="06/02/2025")
+        manager.complete_task(2)
+        self.assertEqual(task.id, 5)
+        reloaded = BinaryTaskManager()
+        self.assertEqual(reloaded.lookup_task(3).due_date, "2025-06-02")
+        self.assertEqual(reloaded.count_tasks(), {"pending": 2, "completed": 2})
+
+
+class TestJournalStorage(TempDirTestCase):#Changes are appended to the journal instead of rewriting tasks.json
+    def setUp(self):
+        super().setUp()
+        self.manager = TaskManager(storage="journal")
+
+    def test_mutations_only_append(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.add_task("Email team", "05/02/2025", "Low")
+        self.manager.complete_task(1)
+        self.manager.update_task(2, title="Email whole team")
+        self.assertFalse(os.path.exists(TASKS_FILE))
+        with open(JOURNAL_FILE) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+    def test_load_replays_journal_on_snapshot(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.compact_tasks()
+        self.manager.add_task("Email team", "05/02/2025", "Low")
+        self.manager.complete_task(1)
+        self.manager.delete_task(2)
+        tasks = TaskManager(storage="journal").tasks
+        self.assertEqual([t.id for t in tasks], [1])
+        self.assertTrue(tasks[0].completed)
+
+    def test_compact_folds_journal_into_snapshot(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.compact_tasks()
+        self.assertFalse(os.path.exists(JOURNAL_FILE))
+        with open(TASKS_FILE) as f:
+            self.assertEqual(json.load(f)["tasks"][0]["title"], "Write report")
+
+    def test_torn_last_line_is_ignored(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        with open(JOURNAL_FILE, "a") as f:
+            f.write('{"op": "delete", "id"')
+        manager = TaskManager(storage="journal")
+        self.assertEqual(len(manager.tasks), 1)
+        manager.add_task("Email team", "05/02/2025", "Low")
+        self.assertEqual(len(TaskManager(storage="journal").tasks), 2)
+
+    def test_records_are_checksummed(self):
+        for title in ("Write report", "Email team", "Book room"):
+            self.manager.add_task(title, "N/A", "Low")
+        with open(JOURNAL_FILE, "rb") as f:
+            lines = f.readlines()
+        lines[1] = lines[1].replace(b"Email", b"Emall")
+        with open(JOURNAL_FILE, "wb") as f:
+            f.writelines(lines)
+        # Replay stops at the damaged record and cuts it and what follows off.
+        self.assertEqual([t.id for t in TaskManager(storage="journal").iter_tasks()], [1])
+        self.assertEqual([t.id for t in TaskManager(storage="journal").tasks], [1])
+        self.assertEqual(os.path.getsize(JOURNAL_FILE), len(lines[0]))
+
+    def test_journal_before_the_snapshot_is_skipped(self):
+        self.manager.add_task("Write report", "N/A", "Low")
+        self.manager.complete_task(1)
+        shutil.copyfile(JOURNAL_FILE, "journal.copy")
+        self.manager.archive_keep = 0
+        self.manager.compact_tasks()
+        # As if the process died after writing tasks.json but before removing the journal.
+        shutil.copyfile("journal.copy", JOURNAL_FILE)
+        self.assertEqual(TaskManager(storage="journal").tasks, [])
+        self.assertEqual(list(TaskManager(storage="journal").iter_tasks()), [])
+        manager = TaskManager(storage="journal")
+        manager.add_task("Email team", "N/A", "Low")
+        self.assertEqual([t.id for t in TaskManager(storage="journal").tasks], [2])
+
+    def test_fsync_policies(self):
+        for policy, syncs in (("always", 3), ("batch", 1), ("none", 0)):
+            with self.subTest(policy=policy), patch("tasktrackr_final.os.fsync") as fsync:
+                manager = TaskManager(storage="journal")
+                manager.quiet = True
+                manager.fsync = policy
+                with manager.batch():
+                    for _ in range(3):
+                        manager.add_task("Task", "N/A", "Low")
+                self.assertEqual(fsync.call_count, syncs)
+
+    def test_large_journal_is_snapshotted(self):
+        self.manager.snapshot_bytes = 0
+        self.manager.add_task("Write report", "N/A", "Low")
+        self.assertFalse(os.path.exists(JOURNAL_FILE))
+        self.assertEqual(read_tasks_file(TASKS_FILE)[0][0].title, "Write report")
+
+
+class TestSqliteStorage(TempDirTestCase):#Same TaskManager API, stored in tasks.db
+    def setUp(self):
+        super().setUp()
+        self.manager = SqliteTaskManager()
+
+    def tearDown(self):
+        self.manager.conn.close()
+
+    def test_crud_round_trip(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.add_task("Email team", "05/02/2025", "Low")
+        self.manager.complete_task(1)
+        self.manager.update_task(2, priority="Medium")
+        self.manager.add_task("Book room", "05/03/2025", "Low")
+        self.manager.delete_task(3)
+        self.assertEqual([t.id for t in self.manager.iter_tasks("pending")], [2])
+        self.assertTrue(self.manager.find_task(1).completed)
+        self.assertEqual(self.manager.find_task(2).priority, "Medium")
+        self.assertIsNone(self.manager.find_task(3))
+        self.assertFalse(os.path.exists(TASKS_FILE))
+
+    def test_settings_match_the_base_manager(self):
+        with patch.dict(os.environ, {"TASKTRACKR_ARCHIVE_DAYS": "30", "TASKTRACKR_FSYNC": "always"}):
+            managers = (TaskManager(), SqliteTaskManager(), ShardedTaskManager())
+        for manager in managers:
+            with self.subTest(storage=manager.storage):
+                self.assertEqual((manager.archive_days, manager.archive_keep, manager.fsync), (30, None, "always"))
+                self.assertIsNone(manager.counters)
+                self.assertIsNone(manager.next_heap)
+        managers[1].conn.close()
+
+    def test_organize(self):
+        self.manager.add_task("Write report", "N/A", "High")
+        self.assertEqual([t.id for t in self.manager.organize_tasks()["No Due Date"]], [1])
+
+    def test_import_json(self):
+        TaskManager().add_task("Write report", "05/01/2025", "High")
+        self.manager.import_json()
+        self.assertEqual(self.manager.find_task(1).title, "Write report")
+        self.assertEqual(self.manager.generate_task_id(), 2)
+
+    def test_ids_are_not_reused(self):
+        self.manager.add_task("Write report", "05/01/2025", "High")
+        self.manager.delete_task(1)
+        self.manager.add_task("Email team", "05/02/2025", "Low")
+        self.assertEqual([t.id for t in self.manager.iter_tasks()], [2])
+
+
+if __name__ == "__main__":
+    unittest.main()